@@ -0,0 +1,111 @@
+import logging
+import sys
+import time
+
+import numpy as np
+import pyro
+
+from full_irt_service import FullIRT3PL
+
+# Item banks to benchmark (number of items); every simulated member answers half of them
+BANK_SIZES = (50, 200, 1000)
+N_MEMBERS = 500
+TIMED_EPOCHS = 30
+
+
+def print_section(title):
+    print("\n" + "="*70)
+    print(f"  {title}")
+    print("="*70)
+
+def simulate_bank(n_items, n_members=N_MEMBERS, seed=0):
+    """
+    3PL responses for one item bank, as long-format triplets
+
+    Returns:
+        (subject_idx, item_idx, responses, true_b)
+    """
+    rng = np.random.default_rng(seed)
+    theta = rng.normal(size=n_members)
+    a = rng.lognormal(0, 0.3, n_items)
+    b = rng.normal(size=n_items)
+    c = np.full(n_items, 0.2)
+
+    # Each member answers a random half of the bank
+    answered = rng.random((n_members, n_items)) < 0.5
+    subject_idx, item_idx = np.nonzero(answered)
+    p = c[item_idx] + (1 - c[item_idx]) / (1 + np.exp(-a[item_idx] * (theta[subject_idx] - b[item_idx])))
+    responses = (rng.random(len(p)) < p).astype(np.float32)
+
+    return subject_idx, item_idx, responses, b
+
+def time_epochs(elbo, bank, n_items):
+    """Mean wall time per SVI epoch (full batch, early stopping disabled)"""
+    subject_idx, item_idx, responses, _ = bank
+    model = FullIRT3PL(max_iter=TIMED_EPOCHS, patience=TIMED_EPOCHS + 1, elbo=elbo)
+    start = time.perf_counter()
+    model.fit_sparse(subject_idx, item_idx, responses, N_MEMBERS, n_items)
+    return (time.perf_counter() - start) / model.iterations
+
+def fit_difficulties(elbo, bank, n_items, seed):
+    """Item difficulties of a complete (early-stopped) fit"""
+    subject_idx, item_idx, responses, _ = bank
+    pyro.set_rng_seed(seed)
+    model = FullIRT3PL(elbo=elbo)
+    model.fit_sparse(subject_idx, item_idx, responses, N_MEMBERS, n_items)
+    return model.b, model.iterations
+
+def run_elbo_benchmark(bank_sizes=BANK_SIZES):
+    """
+    Per-epoch time of the Trace_ELBO and analytic ELBO paths, and agreement of the fitted
+    difficulties (b) between the two paths and with the simulated truth
+
+    The RMSD between two Trace_ELBO fits with different seeds is the reference tolerance
+    for the RMSD between the two paths.
+    """
+    # Warm up torch/Pyro (first-call allocations) so it is not charged to the first bank
+    warm_up = simulate_bank(20, n_members=50)
+    for elbo in ('trace', 'analytic'):
+        FullIRT3PL(max_iter=5, elbo=elbo).fit_sparse(*warm_up[:3], 50, 20)
+
+    rows = []
+    for n_items in bank_sizes:
+        bank = simulate_bank(n_items)
+        true_b = bank[3]
+
+        trace_ms = time_epochs('trace', bank, n_items) * 1000
+        analytic_ms = time_epochs('analytic', bank, n_items) * 1000
+
+        b_trace, iters_trace = fit_difficulties('trace', bank, n_items, seed=1)
+        b_reseeded, _ = fit_difficulties('trace', bank, n_items, seed=2)
+        b_analytic, iters_analytic = fit_difficulties('analytic', bank, n_items, seed=1)
+
+        rows.append({
+            'items': n_items,
+            'trace_ms': trace_ms,
+            'analytic_ms': analytic_ms,
+            'speedup': trace_ms / analytic_ms,
+            'b_diff': float(np.sqrt(np.mean((b_trace - b_analytic) ** 2))),
+            'b_seed_diff': float(np.sqrt(np.mean((b_trace - b_reseeded) ** 2))),
+            'b_rmse_trace': float(np.sqrt(np.mean((b_trace - true_b) ** 2))),
+            'b_rmse_analytic': float(np.sqrt(np.mean((b_analytic - true_b) ** 2))),
+            'epochs': (iters_trace, iters_analytic)
+        })
+
+    print_section(f"ELBO BENCHMARK ({N_MEMBERS} members, sparse engine, full batch)")
+    print(f"{'Items':>5} | {'trace ms/ep':>11} | {'analytic ms/ep':>14} | {'Speedup':>7} | "
+          f"{'RMSD b':>6} | {'(seeds)':>7} | {'RMSE b (trace/analytic)':>23} | Epochs")
+    print("-" * 106)
+    for row in rows:
+        print(f"{row['items']:>5} | {row['trace_ms']:>11.2f} | {row['analytic_ms']:>14.2f} | "
+              f"{row['speedup']:>6.2f}x | {row['b_diff']:>6.3f} | {row['b_seed_diff']:>7.3f} | "
+              f"{row['b_rmse_trace']:>11.3f} / {row['b_rmse_analytic']:<9.3f} | "
+              f"{row['epochs'][0]} / {row['epochs'][1]}")
+
+    return rows
+
+if __name__ == "__main__":
+    # python benchmark_elbo.py [ITEMS ...]
+    logging.getLogger().setLevel(logging.WARNING)
+    sizes = tuple(int(arg) for arg in sys.argv[1:]) or BANK_SIZES
+    run_elbo_benchmark(sizes)
@@ -0,0 +1,142 @@
+import gc
+import io
+import json
+import logging
+import sys
+import time
+
+import numpy as np
+
+from full_irt_service import app, read_analysis_request, read_stream_request, StageTimer
+
+# Upload sizes to benchmark (number of response rows)
+ROW_COUNTS = (100_000, 1_000_000, 5_000_000)
+N_MEMBERS = 50_000
+N_QUESTIONS = 1_000
+
+# JSON / NDJSON text above this many rows is skipped: the JSON path alone needs
+# several GB for a 5M-row body
+MAX_TEXT_ROWS = 2_000_000
+
+# Body formats: name -> Content-Type ("ndjson" goes to /analyze/stream)
+FORMATS = {
+    'json': 'application/json',
+    'ndjson': 'application/x-ndjson',
+    'arrow': 'application/vnd.apache.arrow.stream',
+    'parquet': 'application/vnd.apache.parquet',
+    'npz': 'application/x-npz'
+}
+
+
+def print_section(title):
+    print("\n" + "="*70)
+    print(f"  {title}")
+    print("="*70)
+
+def simulate_columns(n_rows, seed=0):
+    """
+    memberKey / questionKey GUID strings and isCorrect flags, as exported from SQL Server
+
+    Returns:
+        (member_keys, question_keys, is_correct) arrays of length n_rows
+    """
+    rng = np.random.default_rng(seed)
+    members = np.array([f"{k:08x}-7d2c-4a1e-9b3f-{k:012x}" for k in range(N_MEMBERS)], dtype=object)
+    questions = np.array([f"{k:08x}-51e0-4c6d-8f2a-{k:012x}" for k in range(N_QUESTIONS)], dtype=object)
+    return (members[rng.integers(0, N_MEMBERS, n_rows)],
+            questions[rng.integers(0, N_QUESTIONS, n_rows)],
+            rng.integers(0, 2, n_rows).astype(np.int8))
+
+def encode_body(fmt, member_keys, question_keys, is_correct):
+    """Serialise the three columns as a request body of the given format"""
+    if fmt in ('json', 'ndjson'):
+        lines = (json.dumps({"memberKey": m, "questionKey": q, "isCorrect": int(y)})
+                 for m, q, y in zip(member_keys, question_keys, is_correct))
+        if fmt == 'ndjson':
+            return ("\n".join(lines) + "\n").encode()
+        return ('{"data": [' + ", ".join(lines) + ']}').encode()
+
+    if fmt == 'npz':
+        buffer = io.BytesIO()
+        np.savez(buffer, memberKey=member_keys.astype('S'), questionKey=question_keys.astype('S'),
+                 isCorrect=is_correct)
+        return buffer.getvalue()
+
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    table = pa.table({'memberKey': member_keys, 'questionKey': question_keys, 'isCorrect': is_correct})
+    if fmt == 'parquet':
+        buffer = io.BytesIO()
+        pq.write_table(table, buffer)
+        return buffer.getvalue()
+
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+def decode_body(fmt, body):
+    """Server-side decode of a body into a ResponseSet, as /analyze (/analyze/stream) does"""
+    path = '/analyze/stream' if fmt == 'ndjson' else '/analyze'
+    reader = read_stream_request if fmt == 'ndjson' else read_analysis_request
+    with app.test_request_context(path, method='POST', data=body, content_type=FORMATS[fmt]):
+        responses, _ = reader(StageTimer())
+    return responses
+
+def run_ingest_benchmark(row_counts=ROW_COUNTS, formats=tuple(FORMATS)):
+    """
+    Body size, client encode time and server decode time per upload format
+
+    Every format must decode to the same responses as the JSON body.
+    """
+    rows = []
+    for n_rows in row_counts:
+        columns = simulate_columns(n_rows)
+        for fmt in formats:
+            if fmt in ('json', 'ndjson') and n_rows > MAX_TEXT_ROWS:
+                rows.append({'rows': n_rows, 'format': fmt, 'skipped': True})
+                continue
+
+            start = time.perf_counter()
+            body = encode_body(fmt, *columns)
+            encode_seconds = time.perf_counter() - start
+
+            start = time.perf_counter()
+            responses = decode_body(fmt, body)
+            decode_seconds = time.perf_counter() - start
+
+            assert np.array_equal(responses.member_keys[responses.member_codes], columns[0])
+            assert np.array_equal(responses.responses, columns[2])
+
+            rows.append({
+                'rows': n_rows,
+                'format': fmt,
+                'mb': len(body) / 1e6,
+                'encode_s': encode_seconds,
+                'decode_s': decode_seconds,
+                'rows_per_s': n_rows / decode_seconds
+            })
+            del body, responses
+            gc.collect()
+
+    print_section(f"INGEST BENCHMARK ({N_MEMBERS} members, {N_QUESTIONS} questions)")
+    print(f"{'Rows':>9} | {'Format':>7} | {'Body MB':>8} | {'Encode s':>8} | {'Decode s':>8} | "
+          f"{'Rows/s':>10} | vs JSON")
+    print("-" * 76)
+    for row in rows:
+        if row.get('skipped'):
+            print(f"{row['rows']:>9} | {row['format']:>7} | skipped (> {MAX_TEXT_ROWS} rows of JSON text)")
+            continue
+        baseline = next((r for r in rows if r['rows'] == row['rows'] and r['format'] == 'json'
+                         and not r.get('skipped')), None)
+        ratio = f"{baseline['decode_s'] / row['decode_s']:.1f}x" if baseline else "-"
+        print(f"{row['rows']:>9} | {row['format']:>7} | {row['mb']:>8.1f} | {row['encode_s']:>8.2f} | "
+              f"{row['decode_s']:>8.3f} | {row['rows_per_s']:>10.0f} | {ratio:>7}")
+
+    return rows
+
+if __name__ == "__main__":
+    # python benchmark_ingest.py [ROWS ...]
+    logging.getLogger().setLevel(logging.WARNING)
+    counts = tuple(int(arg) for arg in sys.argv[1:]) or ROW_COUNTS
+    run_ingest_benchmark(counts)
@@ -0,0 +1,303 @@
+import argparse
+import io
+import json
+import logging
+import multiprocessing
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+import numpy as np
+
+# Sweep: total responses x item bank size (cases with fewer than MIN_RESPONSES_PER_ITEM
+# responses per item are skipped)
+RESPONSE_COUNTS = (1_000, 10_000, 100_000, 1_000_000)
+BANK_SIZES = (20, 200, 2_000)
+ENGINES = ('dense', 'sparse', 'mml', 'map', 'fast')
+MIN_RESPONSES_PER_ITEM = 25
+
+# Items answered by every simulated member: at least this many, and at least a fifth of
+# the bank (the service drops subjects with responses to under 10% of the items)
+ITEMS_PER_MEMBER = 40
+
+# Largest dataset per engine: the dense engine imputes a members x items matrix
+MAX_RESPONSES = {'dense': 100_000}
+
+# Default comparison tolerances: relative for time / memory, absolute for RMSE
+TIME_TOLERANCE = 0.25
+MEMORY_TOLERANCE = 0.25
+RMSE_TOLERANCE = 0.05
+
+# Changes below these are noise however large they are relatively (seconds, MB)
+MIN_TIME_DELTA = 0.05
+MIN_MEMORY_DELTA = 16
+
+DEFAULT_OUTPUT = 'benchmark_results.json'
+
+
+def print_section(title):
+    print("\n" + "="*70)
+    print(f"  {title}")
+    print("="*70)
+
+def simulate_dataset(n_responses, n_items, seed=0):
+    """
+    3PL responses with known parameters; every member answers the same number of items
+
+    Returns:
+        (columns, truth): memberKey / questionKey / isCorrect arrays of length n_responses,
+        and {'a', 'b', 'c', 'theta'} keyed by question / member key
+    """
+    rng = np.random.default_rng(seed)
+    per_member = min(max(ITEMS_PER_MEMBER, n_items // 5), n_items)
+    n_members = -(-n_responses // per_member)
+
+    theta = rng.normal(size=n_members)
+    a = rng.lognormal(0, 0.3, n_items)
+    b = rng.normal(size=n_items)
+    c = rng.uniform(0.1, 0.25, n_items)
+
+    # A random subset of the bank per member, trimmed to exactly n_responses rows
+    item_idx = np.argsort(rng.random((n_members, n_items)), axis=1)[:, :per_member].ravel()[:n_responses]
+    member_idx = np.repeat(np.arange(n_members), per_member)[:n_responses]
+    p = c[item_idx] + (1 - c[item_idx]) / (1 + np.exp(-a[item_idx] * (theta[member_idx] - b[item_idx])))
+    is_correct = (rng.random(n_responses) < p).astype(np.int8)
+
+    columns = (member_idx.astype(np.int64), item_idx.astype(np.int64), is_correct)
+    truth = {
+        'a': dict(zip(map(str, range(n_items)), a)),
+        'b': dict(zip(map(str, range(n_items)), b)),
+        'c': dict(zip(map(str, range(n_items)), c)),
+        'theta': dict(zip(map(str, range(n_members)), theta))
+    }
+    return columns, truth
+
+def rmse(estimates, truth):
+    """RMSE over the keys present in both mappings"""
+    keys = [key for key in estimates if key in truth]
+    if not keys:
+        return None
+    diff = np.array([estimates[key] for key in keys]) - np.array([truth[key] for key in keys])
+    return float(np.sqrt(np.mean(diff ** 2)))
+
+def peak_rss_mb():
+    """Peak resident set size of this process (ru_maxrss is KiB on Linux, bytes on macOS)"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024 if sys.platform == 'darwin' else 1024)
+
+def run_case(engine, n_responses, n_items, seed=0):
+    """
+    One calibration through /analyze (Flask test client, NPZ body) in this process
+
+    Meant to run in a fresh worker process (see run_suite), so the peak RSS belongs to
+    this case alone.
+    """
+    from full_irt_service import app
+    logging.getLogger().setLevel(logging.WARNING)
+
+    columns, truth = simulate_dataset(n_responses, n_items, seed)
+    buffer = io.BytesIO()
+    np.savez(buffer, memberKey=columns[0], questionKey=columns[1], isCorrect=columns[2])
+    body = buffer.getvalue()
+
+    client = app.test_client()
+    baseline_rss = peak_rss_mb()
+    start = time.perf_counter()
+    response = client.post(f'/analyze?engine={engine}&cache=false', data=body, content_type='application/x-npz')
+    wall = time.perf_counter() - start
+
+    result = response.get_json()
+    case = {
+        'engine': engine,
+        'responses': n_responses,
+        'items': n_items,
+        'status': response.status_code,
+        'wallSeconds': round(wall, 3),
+        'peakRssMb': round(peak_rss_mb(), 1),
+        'baselineRssMb': round(baseline_rss, 1)
+    }
+    if response.status_code != 200:
+        case['error'] = result.get('message', result.get('error'))
+        return case
+
+    metadata = result['metadata']
+    params = result['questionParams']
+    case.update({
+        'fitSeconds': metadata['stageTimings'].get('fit'),
+        'stageTimings': metadata['stageTimings'],
+        'iterations': metadata['iterations'],
+        'converged': metadata['converged'],
+        'rmseA': rmse({key: p['discrimination'] for key, p in params.items()}, truth['a']),
+        'rmseB': rmse({key: p['difficulty'] for key, p in params.items()}, truth['b']),
+        'rmseC': rmse({key: p['guessing'] for key, p in params.items()}, truth['c']),
+        'rmseTheta': rmse(result['memberAbilities'], truth['theta'])
+    })
+    return case
+
+def sweep(response_counts=RESPONSE_COUNTS, bank_sizes=BANK_SIZES, engines=ENGINES):
+    """(engine, responses, items) cases of the sweep, smallest first"""
+    return [
+        (engine, n_responses, n_items)
+        for n_responses in response_counts
+        for n_items in bank_sizes
+        if n_responses >= MIN_RESPONSES_PER_ITEM * n_items
+        for engine in engines
+        if n_responses <= MAX_RESPONSES.get(engine, n_responses)
+    ]
+
+def run_suite(cases, seed=0):
+    """
+    Run every case in its own spawned process, with the service's on-disk state
+    (parameter store, item bank, result cache) in a throwaway directory
+
+    Returns:
+        results document: {'environment', 'cases'}
+    """
+    data_dir = tempfile.mkdtemp(prefix='irt_benchmark_')
+    os.environ.update({
+        'IRT_DATA_DIR': data_dir,
+        'IRT_FIT_WORKERS': '0',
+        'IRT_RESULT_CACHE_MAX_MB': '0'
+    })
+
+    results = []
+    context = multiprocessing.get_context('spawn')
+    for engine, n_responses, n_items in cases:
+        print(f"  {engine:<6} {n_responses:>9} responses x {n_items:>5} items ...", end=' ', flush=True)
+        with ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+            try:
+                case = executor.submit(run_case, engine, n_responses, n_items, seed).result()
+            except Exception as e:
+                case = {'engine': engine, 'responses': n_responses, 'items': n_items,
+                        'status': None, 'error': repr(e)}
+        results.append(case)
+        print(f"{case.get('fitSeconds', '-')}s fit, {case.get('peakRssMb', '-')} MB" if case['status'] == 200
+              else f"failed: {case.get('error')}")
+
+    return {'environment': environment(), 'cases': results}
+
+def environment():
+    """Versions and machine details stored with the results"""
+    import pandas
+    import pyro
+    import scipy
+    import torch
+
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                                text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+
+    return {
+        'timestamp': datetime.utcnow().isoformat(),
+        'commit': commit,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+        'numpy': np.__version__,
+        'scipy': scipy.__version__,
+        'pandas': pandas.__version__,
+        'torch': torch.__version__,
+        'pyro': pyro.__version__
+    }
+
+def print_results(document):
+    print_section(f"CALIBRATION BENCHMARK ({document['environment']['commit'] or 'no commit'})")
+    print(f"{'Engine':<6} | {'Responses':>9} | {'Items':>5} | {'Fit s':>8} | {'Wall s':>8} | "
+          f"{'Peak MB':>8} | {'Iter':>4} | {'RMSE b':>6} | {'RMSE a':>6} | {'RMSE θ':>6}")
+    print("-" * 96)
+    for case in document['cases']:
+        if case['status'] != 200:
+            print(f"{case['engine']:<6} | {case['responses']:>9} | {case['items']:>5} | failed: {case.get('error')}")
+            continue
+        print(f"{case['engine']:<6} | {case['responses']:>9} | {case['items']:>5} | {case['fitSeconds']:>8.2f} | "
+              f"{case['wallSeconds']:>8.2f} | {case['peakRssMb']:>8.0f} | {case['iterations']:>4} | "
+              f"{case['rmseB']:>6.3f} | {case['rmseA']:>6.3f} | {case['rmseTheta']:>6.3f}")
+
+def compare(current, baseline, time_tolerance=TIME_TOLERANCE, memory_tolerance=MEMORY_TOLERANCE,
+            rmse_tolerance=RMSE_TOLERANCE):
+    """
+    Regressions of current against baseline, matching cases by (engine, responses, items)
+
+    A case regresses when it fails where it used to succeed, its fit time or peak RSS
+    grows by more than the relative tolerance (and by more than MIN_TIME_DELTA /
+    MIN_MEMORY_DELTA), or a recovery RMSE grows by more than rmse_tolerance.
+
+    Returns:
+        list of human-readable regression descriptions (empty: no regressions)
+    """
+    def key(case):
+        return case['engine'], case['responses'], case['items']
+
+    reference = {key(case): case for case in baseline['cases']}
+    regressions = []
+    for case in current['cases']:
+        old = reference.get(key(case))
+        if old is None or old['status'] != 200:
+            continue
+        name = f"{case['engine']} {case['responses']}x{case['items']}"
+        if case['status'] != 200:
+            regressions.append(f"{name}: now fails ({case.get('error')})")
+            continue
+
+        for field, tolerance, floor in (('fitSeconds', time_tolerance, MIN_TIME_DELTA),
+                                        ('peakRssMb', memory_tolerance, MIN_MEMORY_DELTA)):
+            if old.get(field) and case[field] > old[field] * (1 + tolerance) and \
+                    case[field] - old[field] > floor:
+                regressions.append(f"{name}: {field} {old[field]} -> {case[field]} "
+                                   f"(+{(case[field] / old[field] - 1) * 100:.0f}%)")
+        for field in ('rmseA', 'rmseB', 'rmseC', 'rmseTheta'):
+            if old.get(field) is not None and case.get(field) is not None and \
+                    case[field] > old[field] + rmse_tolerance:
+                regressions.append(f"{name}: {field} {old[field]:.3f} -> {case[field]:.3f}")
+    return regressions
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Calibration benchmark: fit time, peak RSS and "
+                                                 "parameter recovery across data sizes and engines")
+    parser.add_argument('--responses', type=int, nargs='+', default=RESPONSE_COUNTS)
+    parser.add_argument('--items', type=int, nargs='+', default=BANK_SIZES)
+    parser.add_argument('--engines', nargs='+', default=ENGINES, choices=ENGINES)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', default=DEFAULT_OUTPUT, help="results file (JSON)")
+    parser.add_argument('--compare', metavar='BASELINE',
+                        help="results file to compare against; exit status 1 on regressions")
+    parser.add_argument('--time-tolerance', type=float, default=TIME_TOLERANCE)
+    parser.add_argument('--memory-tolerance', type=float, default=MEMORY_TOLERANCE)
+    parser.add_argument('--rmse-tolerance', type=float, default=RMSE_TOLERANCE)
+    args = parser.parse_args(argv)
+
+    logging.getLogger().setLevel(logging.WARNING)
+    cases = sweep(args.responses, args.items, args.engines)
+    print_section(f"RUNNING {len(cases)} CASES")
+    document = run_suite(cases, args.seed)
+    print_results(document)
+
+    with open(args.output, 'w') as f:
+        json.dump(document, f, indent=2)
+    print(f"\nResults written to {args.output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(document, baseline, args.time_tolerance, args.memory_tolerance,
+                              args.rmse_tolerance)
+        print_section(f"COMPARISON WITH {args.compare} ({baseline['environment'].get('commit')})")
+        for regression in regressions:
+            print(f"  REGRESSION {regression}")
+        if regressions:
+            return 1
+        print("  No regressions")
+    return 0
+
+if __name__ == "__main__":
+    # python benchmark_suite.py [--responses N ...] [--items N ...] [--engines E ...]
+    #                           [--output FILE] [--compare BASELINE]
+    sys.exit(main())
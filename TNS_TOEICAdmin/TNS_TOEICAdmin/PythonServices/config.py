@@ -0,0 +1,57 @@
+import os
+
+# ============================================================
+# FULL IRT SERVICE SETTINGS (override with environment variables)
+# ============================================================
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Local state written by the service (parameter store, caches, item bank)
+DATA_DIR = os.environ.get('IRT_DATA_DIR', os.path.join(BASE_DIR, 'data'))
+
+# Fitted variational parameters per questionKey / memberKey, used for warm starts
+PARAM_STORE_PATH = os.environ.get('IRT_PARAM_STORE_PATH', os.path.join(DATA_DIR, 'irt_params.db'))
+
+# Default epoch budget for warm-started SVI fits (cold fits use 300); they train at the
+# learning-rate floor and typically converge after 80-100 epochs
+WARM_START_MAX_ITER = int(os.environ.get('IRT_WARM_START_MAX_ITER', 150))
+
+# Calibration worker processes; each has its own Pyro runtime and parameter store, so
+# this many independent calibrations can run at once (0 = fit inline, one at a time)
+FIT_WORKERS = int(os.environ.get('IRT_FIT_WORKERS', min(4, os.cpu_count() or 1)))
+
+# Torch intra-op threads per worker process (avoids oversubscribing the cores)
+FIT_WORKER_THREADS = int(os.environ.get('IRT_FIT_WORKER_THREADS', max(1, (os.cpu_count() or 1) // max(1, FIT_WORKERS))))
+
+# How long finished /analyze/jobs results stay retrievable
+JOB_RETENTION_SECONDS = int(os.environ.get('IRT_JOB_RETENTION_SECONDS', 24 * 3600))
+
+# Content-addressed cache of /analyze results for repeated identical requests
+RESULT_CACHE_DIR = os.environ.get('IRT_RESULT_CACHE_DIR', os.path.join(DATA_DIR, 'result_cache'))
+
+# Size budget of the result cache; least recently used entries are evicted first (0 disables it)
+RESULT_CACHE_MAX_BYTES = int(os.environ.get('IRT_RESULT_CACHE_MAX_MB', 512)) * 1024 * 1024
+
+# Versioned history of calibrated item parameters (one snapshot per successful /analyze)
+ITEM_BANK_PATH = os.environ.get('IRT_ITEM_BANK_PATH', os.path.join(DATA_DIR, 'irt_bank.db'))
+
+# Adaptive testing sessions (/cat): idle timeout and how many may be open at once
+CAT_SESSION_TTL_SECONDS = int(os.environ.get('IRT_CAT_SESSION_TTL_SECONDS', 2 * 3600))
+CAT_MAX_SESSIONS = int(os.environ.get('IRT_CAT_MAX_SESSIONS', 100_000))
+
+# CAT exposure control: next item drawn among this many most informative eligible items,
+# and items shown in more than this share of a bank version's sessions are skipped
+CAT_RANDOMESQUE = int(os.environ.get('IRT_CAT_RANDOMESQUE', 5))
+CAT_MAX_EXPOSURE = float(os.environ.get('IRT_CAT_MAX_EXPOSURE', 0.25))
+
+# cProfile dumps of calibrations requested with ?profile=true
+PROFILE_DIR = os.environ.get('IRT_PROFILE_DIR', os.path.join(DATA_DIR, 'profiles'))
+
+# Online parameter updates (/observe): pending updates are written to the parameter store
+# by a background thread this many seconds after the first one, or by the request that
+# makes this many responses pending
+ONLINE_FLUSH_SECONDS = int(os.environ.get('IRT_ONLINE_FLUSH_SECONDS', 30))
+ONLINE_FLUSH_UPDATES = int(os.environ.get('IRT_ONLINE_FLUSH_UPDATES', 10_000))
+
+# Largest request body accepted once a gzip / zstd Content-Encoding is decoded
+MAX_DECODED_BODY_BYTES = int(os.environ.get('IRT_MAX_DECODED_BODY_MB', 2048)) * 1024 * 1024
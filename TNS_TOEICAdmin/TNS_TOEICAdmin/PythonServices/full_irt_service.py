@@ -5,12 +5,44 @@ import numpy as np
 import torch
 import pyro
 import pyro.distributions as dist
+import pyro.poutine as poutine
 from pyro.infer import SVI, Trace_ELBO
 from pyro.optim import Adam
 import traceback
+import atexit
+from werkzeug.exceptions import HTTPException
+import cProfile
 from datetime import datetime
+import io
 import logging
+import multiprocessing
 import os
+import pstats
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from irt_bank import ItemBank
+from irt_cache import ResultCache, result_cache_key
+from irt_cat import CATEngine
+from irt_compression import DecompressingMiddleware, compress_response, supported_encodings
+from irt_ctt import CTTPreview
+from irt_elbo import dense_elbo_loss, sparse_elbo_loss
+from irt_ingest import ResponseSet, CalibrationData, COLUMNAR_CONTENT_TYPES, RESPONSE_COLUMNS
+from irt_jobs import JobManager
+from irt_metrics import StageTimer, ServiceMetrics, Counter, Gauge
+from irt_online import OnlineCalibrator
+from irt_map import MAP3PL
+from irt_mml import MML3PL
+from irt_scoring import eap_scores, map_scores, item_information, INFORMATION_GRID
+from irt_store import ParameterStore, ITEM_PARAM_DEFAULTS
+from config import PARAM_STORE_PATH, WARM_START_MAX_ITER, FIT_WORKERS, FIT_WORKER_THREADS, JOB_RETENTION_SECONDS
+from config import RESULT_CACHE_DIR, RESULT_CACHE_MAX_BYTES, ITEM_BANK_PATH
+from config import CAT_SESSION_TTL_SECONDS, CAT_MAX_SESSIONS, CAT_RANDOMESQUE, CAT_MAX_EXPOSURE
+from config import PROFILE_DIR
+from config import ONLINE_FLUSH_SECONDS, ONLINE_FLUSH_UPDATES
+from config import MAX_DECODED_BODY_BYTES
 
 # Configure logging
 if not os.path.exists('logs'):
@@ -28,6 +60,66 @@ logging.basicConfig(
 app = Flask(__name__)
 CORS(app)
 
+# Latest fitted variational parameters per questionKey / memberKey (warm starts)
+PARAM_STORE = ParameterStore(PARAM_STORE_PATH)
+
+# Per-response updates of the stored parameters between calibrations (/observe);
+# pending updates are written back periodically and at exit
+ONLINE = OnlineCalibrator(PARAM_STORE, ONLINE_FLUSH_SECONDS, ONLINE_FLUSH_UPDATES)
+atexit.register(ONLINE.close)
+
+# Versioned snapshot of the item parameters of every successful calibration
+ITEM_BANK = ItemBank(ITEM_BANK_PATH)
+
+# Adaptive testing sessions over the item bank (/cat)
+CAT_ENGINE = CATEngine(ITEM_BANK, CAT_SESSION_TTL_SECONDS, CAT_MAX_SESSIONS,
+                       randomesque=CAT_RANDOMESQUE, max_exposure=CAT_MAX_EXPOSURE)
+
+# Result bodies of earlier calibrations, keyed by dataset + options content hash
+RESULT_CACHE = ResultCache(RESULT_CACHE_DIR, RESULT_CACHE_MAX_BYTES)
+
+# Stage latency / memory, iteration and dataset-size histograms for /metrics
+METRICS = ServiceMetrics()
+
+# gzip / zstd request bodies (Content-Encoding) are decoded while the endpoints read them
+app.wsgi_app = DecompressingMiddleware(
+    app.wsgi_app, MAX_DECODED_BODY_BYTES,
+    on_decoded=lambda encoding, wire, decoded: METRICS.record_compression('request', encoding, wire, decoded))
+
+@app.after_request
+def negotiate_compression(response):
+    """Compress JSON / text responses with the best coding in the client's Accept-Encoding"""
+    return compress_response(
+        request, response,
+        on_encoded=lambda encoding, wire, decoded: METRICS.record_compression('response', encoding, wire, decoded))
+
+# Functions listed in metadata.profile of a profiled (?profile=true) calibration
+PROFILE_TOP_FUNCTIONS = 20
+
+# Calibration worker pool (see get_fit_executor)
+_FIT_EXECUTOR = None
+_INLINE_EXECUTOR = None
+_FIT_EXECUTOR_LOCK = threading.Lock()
+
+# Asynchronous calibrations submitted to /analyze/jobs
+JOBS = JobManager(JOB_RETENTION_SECONDS, use_processes=FIT_WORKERS > 0)
+
+# Pyro's effect-handler stack and param store are process-global, so SVI fits inside one
+# process are serialized; parallel calibrations run in separate worker processes
+PYRO_LOCK = threading.Lock()
+
+# Calibration engines selectable on /analyze (?engine=... or "engine" in the JSON body)
+IRT_ENGINES = ('dense', 'sparse', 'mml', 'map', 'fast')
+
+# Ability units (?subjects=...): one θ per member attempt, or one per real member
+ABILITY_SUBJECTS = ('attempt', 'member')
+
+# Read buffer for NDJSON request bodies (/analyze/stream)
+STREAM_BUFFER_SIZE = 1 << 16
+
+# ELBO implementations for the SVI engines (?elbo=...), see FullIRT3PL
+SVI_ELBOS = ('trace', 'analytic')
+
 class FullIRT3PL:
     """
     Full IRT 3-Parameter Logistic Model using Pyro (Probabilistic Programming)
@@ -41,20 +133,58 @@ class FullIRT3PL:
     Based on: Lord, F. M. (1980). Applications of Item Response Theory
     """
     
-    def __init__(self, max_iter=300, tolerance=0.0001):
+    # Variational parameters of the guide and their constraints
+    PARAM_CONSTRAINTS = {
+        'a_loc': dist.constraints.real,
+        'a_scale': dist.constraints.positive,
+        'b_loc': dist.constraints.real,
+        'b_scale': dist.constraints.positive,
+        'c_alpha': dist.constraints.positive,
+        'c_beta': dist.constraints.positive,
+        'theta_loc': dist.constraints.real,
+        'theta_scale': dist.constraints.positive
+    }
+    
+    def __init__(self, max_iter=300, tolerance=0.0003, batch_size=None, initial_params=None,
+                 progress_callback=None, learning_rate=0.2, patience=10, lr_factor=0.5,
+                 min_learning_rate=0.05, smoothing=0.1, elbo='trace'):
         """
         Args:
-            max_iter: Maximum number of training iterations
-            tolerance: Convergence tolerance for loss
+            max_iter: Maximum number of training iterations (epochs)
+            tolerance: Relative improvement of the smoothed loss that counts as progress
+            batch_size: Subjects per mini-batch; None (default) uses every subject in every step
+            initial_params: Optional dict of variational parameter name -> full-length array
+                used instead of the guide's default initial values (warm start)
+            progress_callback: Optional callable(epoch, loss, max_iter) called after every epoch
+            learning_rate: Initial Adam learning rate (warm starts begin at min_learning_rate)
+            patience: Epochs without progress before the learning rate is reduced
+                (or, once it is at min_learning_rate, before training stops)
+            lr_factor: Multiplier applied to the learning rate on a plateau
+            min_learning_rate: Learning rate floor; a plateau at the floor ends training
+            smoothing: Weight of the newest epoch in the exponential moving average of the loss
+            elbo: "trace" (Pyro Trace_ELBO over model/guide) or "analytic" (hand-written
+                torch ELBO from irt_elbo with exact KL terms; no per-step Pyro tracing)
         """
         self.max_iter = max_iter
         self.tolerance = tolerance
+        self.batch_size = batch_size
+        self.initial_params = initial_params
+        self.progress_callback = progress_callback
+        self.learning_rate = learning_rate
+        self.patience = patience
+        self.lr_factor = lr_factor
+        self.min_learning_rate = min_learning_rate
+        self.smoothing = smoothing
+        self.elbo = elbo
+        self.iterations = 0
+        self.converged = False
+        self.variational_params = None
         self.theta = None
         self.a = None
         self.b = None
         self.c = None
         
-    def model(self, responses, n_subjects, n_items):
+    def model(self, responses, n_subjects, n_items, subsample=None):
         """
         Probabilistic model for 3PL IRT
         
@@ -64,29 +194,44 @@ class FullIRT3PL:
             responses: Tensor of shape (n_subjects, n_items)
             n_subjects: Number of subjects
             n_items: Number of items
+            subsample: Optional LongTensor of subject indices for a mini-batch step
         """
-        # Priors for item parameters
+        # Priors for item parameters (shared by every mini-batch)
         a = pyro.sample("a", dist.LogNormal(0., 1.).expand([n_items]).to_event(1))
         b = pyro.sample("b", dist.Normal(0., 1.).expand([n_items]).to_event(1))
         c = pyro.sample("c", dist.Beta(5, 17).expand([n_items]).to_event(1))  # Mean ≈ 0.25
         
-        # Priors for subject abilities
-        theta = pyro.sample("theta", dist.Normal(0., 1.).expand([n_subjects]).to_event(1))
-        
-        # Likelihood
-        with pyro.plate("data", n_subjects):
-            for j in range(n_items):
-                # 3PL probability
-                z = a[j] * (theta - b[j])
-                p = c[j] + (1 - c[j]) * torch.sigmoid(z)
+        # Subject abilities are local to the (optionally subsampled) subject plate;
+        # Pyro rescales the batch's log-likelihood by n_subjects / batch size
+        with pyro.plate("subjects", n_subjects, subsample=subsample, dim=-2) as idx:
+            theta = pyro.sample("theta", dist.Normal(0., 1.))
+            
+            # Likelihood: one 2-D plated site (subjects x items) instead of one site per item
+            with pyro.plate("items", n_items, dim=-1):
+                # 3PL probability, broadcast to shape (batch, n_items)
+                z = a * (theta - b)
+                p = c + (1 - c) * torch.sigmoid(z)
                 
                 # Observe responses
-                pyro.sample(f"obs_{j}", dist.Bernoulli(p), obs=responses[:, j])
+                obs = responses if subsample is None else responses[idx]
+                pyro.sample("obs", dist.Bernoulli(p), obs=obs)
     
-    def guide(self, responses, n_subjects, n_items):
+    def guide(self, responses, n_subjects, n_items, subsample=None):
         """
         Variational guide for approximate posterior (Q distribution)
         """
+        self._item_guide(n_items)
+        
+        # Subject abilities (only the batch rows are read, so only they receive gradients)
+        theta_loc = pyro.param("theta_loc", torch.zeros(n_subjects))
+        theta_scale = pyro.param("theta_scale", torch.ones(n_subjects), constraint=dist.constraints.positive)
+        with pyro.plate("subjects", n_subjects, subsample=subsample, dim=-2) as idx:
+            pyro.sample("theta", dist.Normal(theta_loc[idx].unsqueeze(-1), theta_scale[idx].unsqueeze(-1)))
+    
+    def _item_guide(self, n_items):
+        """
+        Variational factors for the item parameters a, b, c
+        """
         # Item parameters (variational parameters)
         a_loc = pyro.param("a_loc", torch.ones(n_items))
         a_scale = pyro.param("a_scale", torch.ones(n_items), constraint=dist.constraints.positive)
@@ -99,12 +244,51 @@ class FullIRT3PL:
         c_alpha = pyro.param("c_alpha", torch.ones(n_items) * 5, constraint=dist.constraints.positive)
         c_beta = pyro.param("c_beta", torch.ones(n_items) * 17, constraint=dist.constraints.positive)
         pyro.sample("c", dist.Beta(c_alpha, c_beta).to_event(1))
+    
+    def sparse_model(self, subject_idx, item_idx, responses, n_subjects, n_items, subsample=None):
+        """
+        Probabilistic model for 3PL IRT on long-format (subject, item, response) triplets
+
+        Only observed responses enter the likelihood; missing cells are simply absent.
+
+        Args:
+            subject_idx: LongTensor of shape (n_obs,) with subject positions; global indices,
+                or positions within `subsample` for a mini-batch step
+            item_idx: LongTensor of shape (n_obs,) with item indices
+            responses: Tensor of shape (n_obs,) with values 0/1
+            n_subjects: Number of subjects
+            n_items: Number of items
+            subsample: Optional LongTensor of subject indices for a mini-batch step
+        """
+        # Same priors as the dense model
+        a = pyro.sample("a", dist.LogNormal(0., 1.).expand([n_items]).to_event(1))
+        b = pyro.sample("b", dist.Normal(0., 1.).expand([n_items]).to_event(1))
+        c = pyro.sample("c", dist.Beta(5, 17).expand([n_items]).to_event(1))
+        
+        with pyro.plate("subjects", n_subjects, subsample=subsample) as idx:
+            theta = pyro.sample("theta", dist.Normal(0., 1.))
+        
+        # Likelihood: gather parameters by index for each observed response
+        with pyro.plate("responses", responses.shape[0]), poutine.scale(scale=n_subjects / len(idx)):
+            a_obs = a[item_idx]
+            b_obs = b[item_idx]
+            c_obs = c[item_idx]
+            z = a_obs * (theta[subject_idx] - b_obs)
+            p = c_obs + (1 - c_obs) * torch.sigmoid(z)
+
+            pyro.sample("obs", dist.Bernoulli(p), obs=responses)
+
+    def sparse_guide(self, subject_idx, item_idx, responses, n_subjects, n_items, subsample=None):
+        """
+        Variational guide for the sparse model (same variational family as the dense guide)
+        """
+        self._item_guide(n_items)
         
-        # Subject abilities
         theta_loc = pyro.param("theta_loc", torch.zeros(n_subjects))
         theta_scale = pyro.param("theta_scale", torch.ones(n_subjects), constraint=dist.constraints.positive)
-        pyro.sample("theta", dist.Normal(theta_loc, theta_scale).to_event(1))
-    
+        with pyro.plate("subjects", n_subjects, subsample=subsample) as idx:
+            pyro.sample("theta", dist.Normal(theta_loc[idx], theta_scale[idx]))
+
     def fit(self, response_matrix):
         """
         Fit the 3PL model using Stochastic Variational Inference (EM-like algorithm)
@@ -121,29 +305,147 @@ class FullIRT3PL:
         
         logging.info(f"Starting Full IRT training: {n_subjects} subjects, {n_items} items")
         
-        # Clear parameter store
-        pyro.clear_param_store()
+        def step_args(subsample):
+            return responses, n_subjects, n_items, subsample
         
-        # Setup SVI with increased learning rate
-        optimizer = Adam({"lr": 0.05})
-        svi = SVI(self.model, self.guide, optimizer, loss=Trace_ELBO())
+        return self._run_svi(self.model, self.guide, n_subjects, step_args, dense_elbo_loss)
+
+    def fit_sparse(self, subject_idx, item_idx, responses, n_subjects, n_items):
+        """
+        Fit the 3PL model on long-format triplets without building a dense matrix
+
+        Args:
+            subject_idx: integer array of shape (n_obs,) with subject indices in [0, n_subjects)
+            item_idx: integer array of shape (n_obs,) with item indices in [0, n_items)
+            responses: array of shape (n_obs,) with values 0/1
+            n_subjects: Number of subjects
+            n_items: Number of items
+
+        Returns:
+            self (fitted model)
+        """
+        subject_idx = torch.as_tensor(subject_idx, dtype=torch.long)
+        item_idx = torch.as_tensor(item_idx, dtype=torch.long)
+        responses = torch.as_tensor(responses, dtype=torch.float32)
+
+        density = responses.shape[0] / max(1, n_subjects * n_items)
+        logging.info(f"Starting sparse Full IRT training: {n_subjects} subjects, {n_items} items, "
+                     f"{responses.shape[0]} observed responses (density {density:.2%})")
+
+        # Group observations by subject (CSR layout) so a mini-batch gathers only its rows
+        order = torch.argsort(subject_idx, stable=True)
+        subject_idx, item_idx, responses = subject_idx[order], item_idx[order], responses[order]
+        counts = torch.bincount(subject_idx, minlength=n_subjects)
+        offsets = torch.cumsum(counts, 0) - counts
+
+        def step_args(subsample):
+            if subsample is None:
+                return subject_idx, item_idx, responses, n_subjects, n_items, None
+            lengths = counts[subsample]
+            local_subject = torch.repeat_interleave(torch.arange(len(subsample)), lengths)
+            within = torch.arange(int(lengths.sum())) - torch.repeat_interleave(torch.cumsum(lengths, 0) - lengths, lengths)
+            rows = torch.repeat_interleave(offsets[subsample], lengths) + within
+            return local_subject, item_idx[rows], responses[rows], n_subjects, n_items, subsample
+
+        return self._run_svi(self.sparse_model, self.sparse_guide, n_subjects, step_args, sparse_elbo_loss)
+
+    def _run_svi(self, model, guide, n_subjects, step_args, analytic_loss):
+        """
+        Run the SVI training loop for the given model/guide pair and extract point estimates
+        
+        The fit runs in its own, initially empty parameter store (restored afterwards), so
+        it never reads or wipes parameters of another fit; PYRO_LOCK serializes fits that
+        share a process because Pyro's handler stack is global.
+        
+        Args:
+            model, guide: Pyro model/guide taking step_args(subsample) as arguments
+            n_subjects: Number of subjects (size of the subject plate)
+            step_args: callable mapping a subject subsample (or None) to model arguments
+            analytic_loss: irt_elbo loss equivalent to model/guide, used when elbo="analytic"
+        """
+        with PYRO_LOCK, pyro.get_param_store().scope():
+            return self._train_svi(model, guide, n_subjects, step_args, analytic_loss)
+    
+    def _train_svi(self, model, guide, n_subjects, step_args, analytic_loss):
+        """
+        SVI loop body of _run_svi (runs inside the fit's isolated parameter store)
+        """
+        # Warm start: register stored values before the guide creates its defaults
+        for name, value in (self.initial_params or {}).items():
+            pyro.param(name, torch.as_tensor(value, dtype=torch.float32).clone(),
+                       constraint=self.PARAM_CONSTRAINTS[name])
+        
+        batch_size = self.batch_size if self.batch_size and self.batch_size < n_subjects else None
+        
+        # A warm start is already near the optimum: skip the high-learning-rate phase and
+        # refine at the floor, so the first plateau ends training instead of restarting
+        # the whole step-down schedule (and overshooting) from fresh Adam state
+        learning_rate = self.min_learning_rate if self.initial_params else self.learning_rate
+        
+        # Setup SVI with increased learning rate; in mini-batch mode theta rows outside the
+        # batch get zero gradient, and beta1=0 keeps Adam momentum from moving them anyway
+        def optim_args(param_name):
+            if batch_size and param_name.startswith("theta_"):
+                return {"lr": learning_rate, "betas": (0.0, 0.999)}
+            return {"lr": learning_rate}
+        
+        optimizer = Adam(optim_args)
+        svi = SVI(model, guide, optimizer, loss=analytic_loss if self.elbo == 'analytic' else Trace_ELBO())
+        
+        if batch_size:
+            logging.info(f"Mini-batch SVI: {batch_size} subjects per step, "
+                         f"{-(-n_subjects // batch_size)} steps per epoch")
+        
+        # Training loop (EM-like iterations); one epoch is one pass over all subjects.
+        # The single-sample ELBO is noisy, so progress is judged on its moving average:
+        # a plateau of `patience` epochs lowers the learning rate, a plateau at the
+        # floor ends training.
+        smoothed_loss, best_loss, stale_epochs = None, None, 0
+        self.converged = False
         
-        # Training loop (EM-like iterations)
-        losses = []
         for epoch in range(self.max_iter):
-            loss = svi.step(responses, n_subjects, n_items)
-            losses.append(loss)
+            if batch_size:
+                batches = torch.randperm(n_subjects).split(batch_size)
+                loss = sum(svi.step(*step_args(batch)) for batch in batches) / len(batches)
+            else:
+                loss = svi.step(*step_args(None))
+            self.iterations = epoch + 1
+            
+            if self.progress_callback:
+                self.progress_callback(epoch, loss, self.max_iter)
             
             if epoch % 50 == 0:
-                logging.info(f"Epoch {epoch}/{self.max_iter}, Loss: {loss:.2f}")
+                logging.info(f"Epoch {epoch}/{self.max_iter}, Loss: {loss:.2f}, lr: {learning_rate:.4f}")
+            
+            smoothed_loss = loss if smoothed_loss is None else \
+                self.smoothing * loss + (1 - self.smoothing) * smoothed_loss
+            
+            if best_loss is None or smoothed_loss < best_loss - self.tolerance * abs(best_loss):
+                best_loss, stale_epochs = smoothed_loss, 0
+                continue
+            
+            stale_epochs += 1
+            if stale_epochs < self.patience:
+                continue
             
-            # Check convergence
-            if epoch > 20 and abs(losses[-1] - losses[-20]) < self.tolerance:
-                logging.info(f"Converged at epoch {epoch}")
+            if learning_rate <= self.min_learning_rate:
+                self.converged = True
+                logging.info(f"Converged at epoch {epoch} (smoothed loss {smoothed_loss:.2f})")
                 break
+            
+            learning_rate = max(learning_rate * self.lr_factor, self.min_learning_rate)
+            self._set_learning_rate(optimizer, learning_rate)
+            best_loss, stale_epochs = smoothed_loss, 0
+            logging.info(f"Loss plateau at epoch {epoch}, learning rate lowered to {learning_rate:.4f}")
+        
+        # Keep the raw (unclipped) variational parameters for warm starts
+        self.variational_params = {
+            name: pyro.param(name).detach().numpy().copy() for name in self.PARAM_CONSTRAINTS
+        }
         
-        # Extract final parameters
-        self.a = pyro.param("a_loc").detach().numpy()
+        # Extract final parameters; a_loc is the location of log a (LogNormal guide), so
+        # the slope is its median exp(a_loc), as in MML3PL and the parameter store
+        self.a = np.exp(pyro.param("a_loc").detach().numpy())
         self.b = pyro.param("b_loc").detach().numpy()
         self.c_alpha = pyro.param("c_alpha").detach().numpy()
         self.c_beta = pyro.param("c_beta").detach().numpy()
@@ -163,6 +465,13 @@ class FullIRT3PL:
         
         return self
     
+    @staticmethod
+    def _set_learning_rate(optimizer, learning_rate):
+        """Change the learning rate of every per-parameter Adam instance of a Pyro optimizer"""
+        for optim in optimizer.optim_objs.values():
+            for group in optim.param_groups:
+                group['lr'] = learning_rate
+    
     def get_item_parameters(self):
         """Return item parameters as dict"""
         return {
@@ -184,9 +493,39 @@ def health_check():
         "service": "Full IRT Analysis Service (3PL + EM Algorithm)",
         "timestamp": datetime.utcnow().isoformat(),
         "version": "2.1.0-REPEATED-MEASURES",
-        "method": "Pyro Probabilistic Programming + SVI"
+        "method": "Pyro Probabilistic Programming + SVI",
+        "fitWorkers": FIT_WORKERS,
+        "jobs": JOBS.counts(),
+        "resultCache": RESULT_CACHE.stats(),
+        "cat": CAT_ENGINE.stats(),
+        "online": ONLINE.stats(),
+        "contentEncodings": supported_encodings()
     })
 
+@app.route('/metrics', methods=['GET'])
+def prometheus_metrics():
+    """
+    Prometheus text exposition: stage latency and peak memory histograms, fit
+    iterations, dataset sizes, active calibrations, jobs, CAT sessions, result cache
+    """
+    jobs, cache, cat, online = JOBS.counts(), RESULT_CACHE.stats(), CAT_ENGINE.stats(), ONLINE.stats()
+    extra = []
+    for kind, name, documentation, value in (
+            (Gauge, 'irt_jobs_active', 'Asynchronous calibration jobs queued or running', jobs['active']),
+            (Gauge, 'irt_jobs_retained', 'Finished jobs whose results are still retrievable', jobs['retained']),
+            (Counter, 'irt_result_cache_hits_total', 'Result cache hits since start', cache['hits']),
+            (Counter, 'irt_result_cache_misses_total', 'Result cache misses since start', cache['misses']),
+            (Gauge, 'irt_result_cache_bytes', 'Size of the stored result cache entries', cache['bytes']),
+            (Gauge, 'irt_cat_sessions_active', 'Open adaptive testing sessions', cat['activeSessions']),
+            (Counter, 'irt_online_observations_total', 'Responses applied by /observe', online['observations']),
+            (Gauge, 'irt_online_pending_observations', 'Online updates not yet written to the parameter store',
+             online['pendingObservations'])):
+        metric = kind(name, documentation)
+        metric.inc(value)
+        extra.append(metric)
+    
+    return METRICS.exposition(extra), 200, {'Content-Type': 'text/plain; version=0.0.4; charset=utf-8'}
+
 @app.route('/analyze', methods=['POST'])
 def analyze_irt():
     """
@@ -200,9 +539,31 @@ def analyze_irt():
         "data": [
             {"memberKey": "guid", "questionKey": "guid", "isCorrect": 0 or 1},
             ...
-        ]
+        ],
+        "engine": "dense" | "sparse" | "mml" | "map"   (optional, also ?engine=...)
+        "batchSize": 512               (optional mini-batch SVI, also ?batchSize=...)
+        "warmStart": true              (optional, start from stored parameters)
+        "maxIter": 100                 (optional epoch / EM cycle / L-BFGS iteration budget)
+        "patience": 10                 (optional SVI plateau patience in epochs)
+        "elbo": "trace" | "analytic"   (optional SVI objective implementation)
+        "cache": false                 (optional, bypass the result cache)
+        "subjects": "attempt" | "member"   (optional, one ability per attempt / per member)
+        "groupBy": "part"              (optional, calibrate each part / test form separately)
+        "profile": true                (optional, cProfile dump of the calibration)
     }
     
+    With groupBy every response carries that field too (e.g. {"memberKey": ..., "part": 5});
+    each question must belong to one group. Groups are fitted in parallel in the worker
+    pool, questionParams gain a "group" field and memberAbilities average a member's
+    group abilities weighted by their responses; metadata.groups has per-group wall times.
+    
+    Columnar bodies (options in the query string), selected by Content-Type:
+        application/vnd.apache.arrow.stream   Arrow IPC stream (needs pyarrow)
+        application/vnd.apache.parquet        Parquet file (needs pyarrow)
+        application/x-npz                     numpy .npz archive
+    with columns/arrays memberKey, questionKey (string or integer, may be
+    dictionary-encoded) and isCorrect (0/1 or boolean), plus the groupBy column if set.
+    
     Returns:
     {
         "status": "OK",
@@ -213,116 +574,1174 @@ def analyze_irt():
     """
     try:
         logging.info("=== Full IRT Analysis Request Started (REPEATED MEASURES MODE) ===")
+        timer = StageTimer()
         
-        if not request.json or 'data' not in request.json:
-            logging.error("Missing 'data' field")
-            return jsonify({"error": "Missing 'data' field"}), 400
-        
-        raw_data = request.json['data']
-        logging.info(f"Received {len(raw_data)} responses")
-        
-        if len(raw_data) < 50:
-            logging.warning(f"Insufficient data: {len(raw_data)} responses")
-            return jsonify({
-                "error": "Insufficient data",
-                "message": f"Need at least 50 responses, got {len(raw_data)}"
-            }), 400
+        try:
+            responses, options = read_analysis_request(timer)
+        except AnalysisRequestError as e:
+            return jsonify(e.body), e.status
         
-        # Prepare DataFrame
-        df = pd.DataFrame(raw_data)
-        df = df.rename(columns={
-            'memberKey': 'subject_id',
-            'questionKey': 'item_id',
-            'isCorrect': 'response'
-        })
+        body, status = execute_calibration(responses, options, timer)
+        return jsonify(body), status
         
-        # ✅ KEY CHANGE: CREATE UNIQUE ID FOR EACH ATTEMPT
-        # Instead of aggregating, treat each row as a separate "virtual subject"
-        # Member A doing Q1 three times = 3 different "subjects" in IRT model
-        df['attempt_id'] = df.groupby(['subject_id', 'item_id']).cumcount()
-        df['virtual_subject_id'] = df['subject_id'].astype(str) + '_attempt_' + df['attempt_id'].astype(str)
+    except Exception as e:
+        error_trace = traceback.format_exc()
+        logging.error(f"ERROR: {error_trace}")
+        return jsonify({"error": str(e), "trace": error_trace}), 500
+
+@app.route('/analyze/stream', methods=['POST'])
+def analyze_irt_stream():
+    """
+    /analyze for NDJSON bodies: one response object per line, parsed incrementally
+    
+    Body (Content-Type: application/x-ndjson):
+        {"memberKey": "guid", "questionKey": "guid", "isCorrect": 0 or 1}
+        {"memberKey": "guid", "questionKey": "guid", "isCorrect": 0 or 1}
+        ...
+    
+    Options are taken from the query string only (?engine=sparse&maxIter=200 ...),
+    with the same names and defaults as /analyze. Keys are encoded into integer codes
+    line by line, so peak memory follows the encoded arrays rather than the body size.
+    
+    Returns: same as /analyze
+    """
+    try:
+        logging.info("=== Full IRT Analysis Request Started (NDJSON STREAM) ===")
+        timer = StageTimer()
         
-        logging.info(f"Created {df['virtual_subject_id'].nunique()} virtual subjects from {df['subject_id'].nunique()} real members")
-        logging.info(f"Processing all {len(df)} responses (including retakes)")
+        try:
+            responses, options = read_stream_request(timer)
+        except AnalysisRequestError as e:
+            return jsonify(e.body), e.status
         
-        df['response'] = df['response'].astype(int)
+        body, status = execute_calibration(responses, options, timer)
+        return jsonify(body), status
         
-        # Count responses per question (now ALL responses count)
-        question_counts = df.groupby('item_id').size()
-        min_responses_per_question = 3
-        valid_questions = question_counts[question_counts >= min_responses_per_question].index.tolist()
+    except Exception as e:
+        error_trace = traceback.format_exc()
+        logging.error(f"ERROR: {error_trace}")
+        return jsonify({"error": str(e), "trace": error_trace}), 500
+
+@app.route('/analyze/jobs', methods=['POST'])
+def submit_analysis_job():
+    """
+    Asynchronous /analyze: queue the calibration and return a job id immediately
+    
+    Accepts exactly the /analyze body and options. Poll GET /analyze/jobs/<jobId> for
+    status and progress (epoch, loss, ETA) and fetch GET /analyze/jobs/<jobId>/result
+    once it completes. Results are kept for JOB_RETENTION_SECONDS.
+    
+    Returns (202):
+    {
+        "jobId": "...",
+        "status": "queued",
+        "statusUrl": "/analyze/jobs/<jobId>",
+        "resultUrl": "/analyze/jobs/<jobId>/result"
+    }
+    """
+    try:
+        timer = StageTimer()
         
-        logging.info(f"Questions with >= {min_responses_per_question} responses: {len(valid_questions)}")
-        logging.info(f"Response distribution: min={question_counts.min()}, max={question_counts.max()}, mean={question_counts.mean():.1f}")
+        try:
+            responses, options = read_analysis_request(timer)
+        except AnalysisRequestError as e:
+            return jsonify(e.body), e.status
         
-        if len(valid_questions) == 0:
-            logging.error("No questions with sufficient data")
-            return jsonify({
-                "error": "No questions with sufficient data",
-                "message": f"Each question needs at least {min_responses_per_question} responses"
-            }), 400
+        description = {**options, 'totalResponses': len(responses)}
+        job_id = JOBS.submit(
+            lambda progress: submit_calibration(responses, options, timer, progress), description)
+        logging.info(f"Queued calibration job {job_id}: {description}")
         
-        df_filtered = df[df['item_id'].isin(valid_questions)]
-        logging.info(f"Filtered dataset: {len(df_filtered)} responses")
+        return jsonify({
+            "jobId": job_id,
+            "status": "queued",
+            "statusUrl": f"/analyze/jobs/{job_id}",
+            "resultUrl": f"/analyze/jobs/{job_id}/result"
+        }), 202
         
-        # Create response matrix using VIRTUAL SUBJECTS
-        subjects = df_filtered['virtual_subject_id'].unique()
-        items = df_filtered['item_id'].unique()
+    except Exception as e:
+        error_trace = traceback.format_exc()
+        logging.error(f"ERROR: {error_trace}")
+        return jsonify({"error": str(e), "trace": error_trace}), 500
+
+@app.route('/analyze/jobs/<job_id>', methods=['GET'])
+def analysis_job_status(job_id):
+    """
+    Status of an asynchronous calibration: queued | running | completed | failed,
+    with the current epoch (EM cycle for MML), loss and estimated seconds remaining
+    """
+    status = JOBS.status(job_id)
+    if status is None:
+        return jsonify({"error": "Unknown job", "message": f"No job '{job_id}' (it may have expired)"}), 404
+    return jsonify(status)
+
+@app.route('/analyze/jobs/<job_id>/result', methods=['GET'])
+def analysis_job_result(job_id):
+    """
+    Result of a finished calibration job: the same body and status code /analyze returns
+    (202 with the job status while it is still queued or running)
+    """
+    result = JOBS.result(job_id)
+    if result is None:
+        return jsonify({"error": "Unknown job", "message": f"No job '{job_id}' (it may have expired)"}), 404
+    if result is False:
+        return jsonify(JOBS.status(job_id)), 202
+    
+    body, status = result
+    return jsonify(body), status
+
+@app.route('/score', methods=['POST'])
+def score_members():
+    """
+    Fixed-item scoring endpoint: member abilities against frozen item parameters
+    
+    No recalibration: every member's θ is estimated at once (vectorized EAP or MAP)
+    with the 3PL formula of FullIRT3PL.model. All responses of a member, retakes
+    included, are pooled into one ability.
+    
+    Expected JSON:
+    {
+        "data": [
+            {"memberKey": "guid", "questionKey": "guid", "isCorrect": 0 or 1},
+            ...
+        ],
+        "itemParams": {                (optional; default: parameter store)
+            "questionKey": {"discrimination": a, "difficulty": b, "guessing": c},
+            ...
+        },
+        "method": "eap" | "map"        (optional, default "eap")
+    }
+    
+    Returns:
+    {
+        "status": "OK",
+        "memberAbilities": {...},
+        "standardErrors": {...},
+        "metadata": {...}
+    }
+    """
+    try:
+        timer = StageTimer()
+        payload = request.get_json(silent=True)
         
-        subject_map = {subj: idx for idx, subj in enumerate(subjects)}
-        item_map = {item: idx for idx, item in enumerate(items)}
+        if not payload or 'data' not in payload:
+            logging.error("Missing 'data' field")
+            return jsonify({"error": "Missing 'data' field"}), 400
         
-        response_matrix = np.full((len(subjects), len(items)), -1.0)
+        method = request.args.get('method') or payload.get('method', 'eap')
+        if method not in ('eap', 'map'):
+            return jsonify({"error": "Invalid options", "message": f"method must be 'eap' or 'map', got '{method}'"}), 400
         
-        # Map to original member keys for ability tracking
-        virtual_to_real_member = df_filtered.set_index('virtual_subject_id')['subject_id'].to_dict()
+        if len(payload['data']) == 0:
+            return jsonify({"error": "Insufficient data", "message": "No responses to score"}), 400
         
-        for _, row in df_filtered.iterrows():
-            subj_idx = subject_map[row['virtual_subject_id']]
-            item_idx = item_map[row['item_id']]
-            response_matrix[subj_idx, item_idx] = row['response']
+        with timer.stage('encode'):
+            try:
+                responses = ResponseSet.from_records(payload['data'])
+            except ValueError as e:
+                return jsonify({"error": "Invalid data", "message": str(e)}), 400
         
-        # Filter subjects with minimum responses
-        response_counts_per_subject = (response_matrix >= 0).sum(axis=1)
-        min_responses = max(2, int(len(items) * 0.1))
-        valid_subject_mask = response_counts_per_subject >= min_responses
+        # Frozen item parameters: supplied in the request, or the latest stored calibration
+        with timer.stage('items'):
+            if payload.get('itemParams'):
+                try:
+                    a, b, c, known = supplied_item_parameters(responses.item_keys, payload['itemParams'])
+                except ValueError as e:
+                    return jsonify({"error": "Invalid itemParams", "message": str(e)}), 400
+                source = 'request'
+            else:
+                ONLINE.flush()
+                a, b, c, known = stored_item_parameters(responses.item_keys)
+                source = 'store'
         
-        response_matrix = response_matrix[valid_subject_mask, :]
-        valid_subjects = subjects[valid_subject_mask]
+        scorable = known[responses.item_codes]
+        if not scorable.any():
+            return jsonify({
+                "error": "No item parameters",
+                "message": f"None of the {responses.n_items} questions has parameters ({source})"
+            }), 400
         
-        logging.info(f"Kept {len(valid_subjects)} virtual subjects with >= {min_responses} responses")
+        # Members are scored from the responses whose item has parameters
+        with timer.stage('score'):
+            member_idx, members = pd.factorize(responses.member_codes[scorable])
+            item_idx = responses.item_codes[scorable]
+            observed = responses.responses[scorable]
+            
+            scorer = map_scores if method == 'map' else eap_scores
+            theta, standard_error = scorer(member_idx, item_idx, observed, len(members), a, b, c)
+            theta = np.clip(theta, -3, 3)
         
-        # Filter items with minimum responses
-        response_counts_per_item = (response_matrix >= 0).sum(axis=0)
-        min_item_responses = max(2, int(len(valid_subjects) * 0.05))
-        valid_item_mask = response_counts_per_item >= min_item_responses
+        with timer.stage('format'):
+            member_keys = [str(key) for key in responses.member_keys[members]]
+            member_abilities = dict(zip(member_keys, theta.tolist()))
+            standard_errors = dict(zip(member_keys, standard_error.tolist()))
         
-        response_matrix = response_matrix[:, valid_item_mask]
-        valid_items = items[valid_item_mask]
+        logging.info(f"Scored {len(member_abilities)} members ({method.upper()}, items from {source}) "
+                     f"in {sum(timer.timings.values()) * 1000:.1f} ms")
         
-        logging.info(f"Final matrix shape: {response_matrix.shape}")
+        return jsonify({
+            "status": "OK",
+            "memberAbilities": member_abilities,
+            "standardErrors": standard_errors,
+            "metadata": {
+                "totalMembers": len(member_abilities),
+                "totalResponses": int(scorable.sum()),
+                "unscoredResponses": int((~scorable).sum()),
+                "unknownQuestions": int((~known).sum()),
+                "method": method.upper(),
+                "itemSource": source,
+                "timestamp": datetime.utcnow().isoformat(),
+                "stageTimings": timer.summary(),
+                "stageMemory": timer.memory_summary()
+            }
+        })
         
-        if response_matrix.shape[0] < 2 or response_matrix.shape[1] < 2:
+    except Exception as e:
+        error_trace = traceback.format_exc()
+        logging.error(f"ERROR: {error_trace}")
+        return jsonify({"error": str(e), "trace": error_trace}), 500
+
+@app.route('/bank/latest', methods=['GET'])
+def item_bank_latest():
+    """
+    Item parameters of the most recent successful calibration
+    
+    Returns:
+    {
+        "version": 12,
+        "createdAt": "...",
+        "engine": "sparse",
+        "totalQuestions": ..., "totalMembers": ..., "totalResponses": ...,
+        "metadata": {...},             (metadata of the /analyze result)
+        "questionParams": {...}        (same layout as /analyze)
+    }
+    """
+    version = ITEM_BANK.latest_version()
+    if version is None:
+        return jsonify({"error": "Empty item bank", "message": "No calibration has been stored yet"}), 404
+    return jsonify(ITEM_BANK.load(version))
+
+@app.route('/bank/versions', methods=['GET'])
+def item_bank_versions():
+    """
+    Newest-first version summaries without item rows (?limit=..., default 50)
+    """
+    try:
+        limit = int(request.args.get('limit', 50))
+    except ValueError:
+        return jsonify({"error": "Invalid options", "message": "limit must be an integer"}), 400
+    return jsonify({"versions": ITEM_BANK.versions(limit)})
+
+@app.route('/bank/versions/<int:version>', methods=['GET'])
+def item_bank_version(version):
+    """
+    Item parameters of one calibration, as returned by /bank/latest
+    """
+    snapshot = ITEM_BANK.load(version)
+    if snapshot is None:
+        return jsonify({"error": "Unknown version", "message": f"No item bank version {version}"}), 404
+    return jsonify(snapshot)
+
+@app.route('/bank/information', methods=['POST'])
+def item_bank_information():
+    """
+    Test information curve of a set of questions, from the precomputed item tables
+    
+    Expected JSON (all optional):
+    {
+        "questionKeys": ["guid", ...],   (default: every question of the version)
+        "version": 12,                   (default: latest)
+        "items": true                    (also return each question's own curve)
+    }
+    
+    Returns:
+    {
+        "version": 12,
+        "thetaGrid": [-4.0, ..., 4.0],
+        "testInformation": [...],        (sum of the selected items' information)
+        "standardError": [...],          (1 / sqrt(test information))
+        "questionCount": 40,
+        "missingKeys": [...],            (requested keys not in the version)
+        "itemInformation": {"guid": [...], ...}   (only with "items": true)
+    }
+    """
+    payload = request.get_json(silent=True) or {}
+    
+    version = payload.get('version')
+    if version is None:
+        version = ITEM_BANK.latest_version()
+        if version is None:
+            return jsonify({"error": "Empty item bank", "message": "No calibration has been stored yet"}), 404
+    try:
+        version = int(version)
+    except (TypeError, ValueError):
+        return jsonify({"error": "Invalid options", "message": "version must be an integer"}), 400
+    
+    information = ITEM_BANK.load_information(version)
+    if information is None:
+        return jsonify({
+            "error": "No information table",
+            "message": f"Item bank version {version} does not exist or predates information tables"
+        }), 404
+    theta_grid, question_keys, key_index, table = information
+    
+    requested = payload.get('questionKeys')
+    if requested is None:
+        rows, missing = np.arange(len(question_keys)), []
+    else:
+        found = [key_index.get(str(key)) for key in requested]
+        rows = np.array([row for row in found if row is not None], dtype=np.int64)
+        missing = [str(key) for key, row in zip(requested, found) if row is None]
+    
+    # Test information = column sums of the selected rows (float64 accumulation)
+    test_information = table[rows].sum(axis=0, dtype=np.float64)
+    # SE = 1/sqrt(information), NaN (null in the response) where nothing is measured
+    standard_error = np.divide(1.0, np.sqrt(test_information), out=np.full_like(test_information, np.nan),
+                               where=test_information > 0)
+    
+    result = {
+        "version": version,
+        "thetaGrid": theta_grid.round(6).tolist(),
+        "testInformation": test_information.tolist(),
+        "standardError": [None if np.isnan(value) else value for value in standard_error.tolist()],
+        "questionCount": len(rows),
+        "missingKeys": missing
+    }
+    if parse_bool(payload.get('items', False)):
+        result["itemInformation"] = {question_keys[row]: table[row].tolist() for row in rows}
+    return jsonify(result)
+
+@app.route('/cat/sessions', methods=['POST'])
+def start_cat_session():
+    """
+    Start an adaptive test and return its first item
+    
+    Expected JSON (all optional):
+    {
+        "version": 12,                         (item bank version, default: latest)
+        "maxItems": 30,                        (stop after this many responses)
+        "seTarget": 0.3,                       (stop once SE(θ) <= seTarget)
+        "contentTargets": {"5": 0.4, "7": 0.6},   (share of items per part / group)
+        "exclude": ["guid", ...]               (questionKeys not to present)
+    }
+    
+    Returns (201):
+    {
+        "sessionId": "...",
+        "version": 12,
+        "theta": 0.0, "standardError": 1.0,
+        "administered": 0,
+        "finished": false, "stopReason": null,
+        "nextItem": {"questionKey": "guid", "group": "5", "information": 0.41}
+    }
+    """
+    payload = request.get_json(silent=True) or {}
+    if not isinstance(payload.get('contentTargets') or {}, dict):
+        return jsonify({"error": "Invalid options", "message": "contentTargets must map groups to shares"}), 400
+    if not isinstance(payload.get('exclude') or [], list):
+        return jsonify({"error": "Invalid options", "message": "exclude must be a list of questionKeys"}), 400
+    try:
+        max_items = payload.get('maxItems')
+        max_items = None if max_items is None else int(max_items)
+        se_target = payload.get('seTarget')
+        se_target = None if se_target is None else float(se_target)
+        version = payload.get('version')
+        version = None if version is None else int(version)
+        session = CAT_ENGINE.start_session(version, max_items, se_target,
+                                           payload.get('contentTargets'), payload.get('exclude') or ())
+    except (TypeError, ValueError) as e:
+        return jsonify({"error": "Invalid options", "message": str(e)}), 400
+    except LookupError as e:
+        return jsonify({"error": "Unknown item bank version", "message": str(e)}), 404
+    except RuntimeError as e:
+        return jsonify({"error": "Too many sessions", "message": str(e)}), 503
+    
+    with session.lock:
+        return jsonify(session.summary()), 201
+
+@app.route('/cat/sessions/<session_id>', methods=['GET', 'DELETE'])
+def cat_session(session_id):
+    """Current state of an adaptive test (GET), or end it (DELETE)"""
+    session = CAT_ENGINE.end(session_id) if request.method == 'DELETE' else CAT_ENGINE.get(session_id)
+    if session is None:
+        return jsonify({"error": "Unknown session", "message": f"No session '{session_id}' (it may have expired)"}), 404
+    with session.lock:
+        return jsonify(session.summary())
+
+@app.route('/cat/sessions/<session_id>/responses', methods=['POST'])
+def answer_cat_item(session_id):
+    """
+    Record the response to the session's pending item and return the next one
+    
+    Expected JSON: {"questionKey": "guid", "isCorrect": 0 or 1}
+    
+    Returns: the session state (as POST /cat/sessions) with the updated θ
+    """
+    payload = request.get_json(silent=True) or {}
+    if 'questionKey' not in payload or payload.get('isCorrect') not in (0, 1, True, False):
+        return jsonify({"error": "Invalid response", "message": "Need questionKey and isCorrect (0/1)"}), 400
+    
+    try:
+        session = CAT_ENGINE.answer(session_id, payload['questionKey'], bool(payload['isCorrect']))
+    except ValueError as e:
+        return jsonify({"error": "Invalid response", "message": str(e)}), 409
+    if session is None:
+        return jsonify({"error": "Unknown session", "message": f"No session '{session_id}' (it may have expired)"}), 404
+    
+    with session.lock:
+        return jsonify(session.summary())
+
+@app.route('/observe', methods=['POST'])
+def observe_responses():
+    """
+    Online update of the stored item and member parameters from new responses
+    
+    Every response is one constant-time step on its question's a/b/c and its member's
+    θ (see OnlineCalibrator), applied in order. The parameter store is updated within
+    ONLINE_FLUSH_SECONDS of the first pending response (or once ONLINE_FLUSH_UPDATES
+    are pending), so warm starts and /score pick the changes up without a refit.
+    
+    Expected JSON:
+    {
+        "data": [
+            {"memberKey": "guid", "questionKey": "guid", "isCorrect": 0 or 1},
+            ...
+        ]
+    }
+    
+    Returns:
+    {
+        "status": "OK",
+        "observed": n,
+        "items": {"questionKey": {"discrimination", "difficulty", "guessing",
+                                  "difficultyStandardError", "updates"}},
+        "members": {"memberKey": {"theta", "standardError", "updates"}}
+    }
+    """
+    payload = request.get_json(silent=True)
+    if not payload or not isinstance(payload.get('data'), list):
+        logging.error("Missing 'data' field")
+        return jsonify({"error": "Missing 'data' field"}), 400
+    
+    observations = []
+    for record in payload['data']:
+        if not isinstance(record, dict) or 'memberKey' not in record or 'questionKey' not in record \
+                or record.get('isCorrect') not in (0, 1, True, False):
             return jsonify({
-                "error": "Insufficient complete data after filtering",
-                "message": f"Only {response_matrix.shape[0]} subjects and {response_matrix.shape[1]} items remaining"
+                "error": "Invalid response",
+                "message": "Every response needs memberKey, questionKey and isCorrect (0/1)"
             }), 400
+        observations.append((record['memberKey'], record['questionKey'], record['isCorrect']))
+    
+    try:
+        items, members = ONLINE.observe(observations)
+    except Exception as e:
+        logging.error(f"ERROR: {traceback.format_exc()}")
+        return jsonify({"error": "Online update failed", "message": str(e)}), 500
+    
+    return jsonify({"status": "OK", "observed": len(observations), "items": items, "members": members})
+
+@app.route('/observe/flush', methods=['POST'])
+def flush_observations():
+    """Write pending online updates to the parameter store now (e.g. before a calibration)"""
+    try:
+        items, members = ONLINE.flush()
+    except Exception as e:
+        logging.error(f"ERROR: {traceback.format_exc()}")
+        return jsonify({"error": "Flush failed", "message": str(e)}), 500
+    
+    return jsonify({"status": "OK", "items": items, "members": members})
+
+def supplied_item_parameters(item_keys, item_params):
+    """
+    Item parameters from a questionParams-style mapping, aligned with item_keys
+    
+    discrimination is the natural 3PL slope a, as reported by /analyze for every engine
+    (and as stored_item_parameters maps the parameter store).
+    
+    Returns:
+        (a, b, c, known) arrays; known marks keys present in item_params
+    
+    Raises:
+        ValueError: if item_params is not a mapping, or an entry lacks discrimination,
+            difficulty or guessing or has a non-numeric value
+    """
+    if not isinstance(item_params, dict):
+        raise ValueError("itemParams must map questionKey to {discrimination, difficulty, guessing}")
+    
+    a = np.ones(len(item_keys))
+    b = np.zeros(len(item_keys))
+    c = np.full(len(item_keys), 0.25)
+    known = np.zeros(len(item_keys), dtype=bool)
+    
+    for idx, key in enumerate(item_keys):
+        params = item_params.get(key)
+        if params:
+            a[idx], b[idx], c[idx] = (item_parameter(key, params, name)
+                                      for name in ('discrimination', 'difficulty', 'guessing'))
+            known[idx] = True
+    
+    return np.clip(a, 0.01, 2.5), np.clip(b, -3, 3), np.clip(c, 0.01, 0.5), known
+
+def item_parameter(key, params, name):
+    """One finite numeric field of an itemParams entry (ValueError naming the key otherwise)"""
+    value = params.get(name) if isinstance(params, dict) else None
+    if isinstance(value, bool) or not isinstance(value, (int, float)) or not np.isfinite(value):
+        raise ValueError(f"itemParams['{key}'] needs a numeric '{name}', got {value!r}")
+    return value
+
+def stored_item_parameters(item_keys):
+    """
+    Item parameters from the parameter store, aligned with item_keys
+    
+    The stored variational parameters are mapped onto the 3PL scale of FullIRT3PL.model:
+    a = exp(a_loc) (median of the LogNormal factor), b = b_loc, c = Beta mean.
+    
+    Returns:
+        (a, b, c, known) arrays; known marks keys found in the store
+    """
+    params, known = PARAM_STORE.load_items(item_keys)
+    a = np.exp(params['a_loc'].astype(np.float64))
+    b = params['b_loc'].astype(np.float64)
+    c = params['c_alpha'] / (params['c_alpha'] + params['c_beta'])
+    
+    return np.clip(a, 0.01, 2.5), np.clip(b, -3, 3), np.clip(c.astype(np.float64), 0.01, 0.5), known
+
+class AnalysisRequestError(ValueError):
+    """Invalid /analyze request; body is the JSON error returned with status (400 by default)"""
+    
+    def __init__(self, body, status=400):
+        super().__init__(body.get("message", body["error"]))
+        self.body = body
+        self.status = status
+
+def read_analysis_request(timer):
+    """
+    Parse, validate and encode an /analyze request body
+    
+    JSON by default; a columnar body (Arrow IPC stream, Parquet or NPZ, chosen by
+    Content-Type, see COLUMNAR_CONTENT_TYPES) is decoded straight into the encoded
+    arrays, with options from the query string.
+    
+    Returns:
+        (responses, options): encoded ResponseSet and dict from parse_analysis_options
+    
+    Raises:
+        AnalysisRequestError: missing data, invalid options or too few responses
+    """
+    if request.mimetype in COLUMNAR_CONTENT_TYPES:
+        return read_columnar_request(timer, COLUMNAR_CONTENT_TYPES[request.mimetype])
+    
+    with timer.stage('parse'):
+        payload = read_json_body()
+    
+    if not payload or 'data' not in payload:
+        logging.error("Missing 'data' field")
+        raise AnalysisRequestError({"error": "Missing 'data' field"})
+    
+    raw_data = payload['data']
+    logging.info(f"Received {len(raw_data)} responses")
+    
+    try:
+        options = parse_analysis_options(payload)
+    except ValueError as e:
+        raise AnalysisRequestError({"error": "Invalid options", "message": str(e)})
+    
+    require_min_responses(len(raw_data))
+    
+    # Intern GUID keys into integer codes (columnar arrays, no per-row Python work later)
+    with timer.stage('encode'):
+        try:
+            responses = ResponseSet.from_records(raw_data, options['groupBy'])
+        except ValueError as e:
+            raise AnalysisRequestError({"error": "Invalid data", "message": str(e)})
+    
+    return responses, options
+
+def read_json_body():
+    """
+    request.get_json(silent=True), with an undecodable or oversized compressed body
+    reported as an AnalysisRequestError instead of a server error
+    """
+    try:
+        return request.get_json(silent=True)
+    except HTTPException as e:
+        raise AnalysisRequestError({"error": e.name, "message": e.description}, status=e.code)
+
+def read_columnar_request(timer, fmt):
+    """
+    Decode an Arrow IPC / Parquet / NPZ body with memberKey, questionKey, isCorrect columns
+    
+    Returns:
+        (responses, options): encoded ResponseSet and dict from parse_analysis_options
+    
+    Raises:
+        AnalysisRequestError: invalid options, an unreadable body, too few responses,
+            or (status 415) pyarrow missing for an Arrow/Parquet body
+    """
+    try:
+        options = parse_analysis_options(None)
+    except ValueError as e:
+        raise AnalysisRequestError({"error": "Invalid options", "message": str(e)})
+    
+    with timer.stage('parse'):
+        try:
+            body = request.get_data(cache=False)
+        except HTTPException as e:
+            raise AnalysisRequestError({"error": e.name, "message": e.description}, status=e.code)
+    
+    with timer.stage('encode'):
+        try:
+            responses = ResponseSet.from_columnar(body, fmt, options['groupBy'])
+        except ImportError as e:
+            raise AnalysisRequestError({"error": "Unsupported Media Type", "message": str(e)}, status=415)
+        except ValueError as e:
+            logging.error(f"Malformed {fmt} body: {e}")
+            raise AnalysisRequestError({"error": f"Malformed {fmt} body", "message": str(e)})
+    
+    logging.info(f"Received {len(responses)} responses as {fmt} ({len(body)} bytes)")
+    require_min_responses(len(responses))
+    return responses, options
+
+def read_stream_request(timer):
+    """
+    Parse and encode an NDJSON /analyze/stream body without materialising it
+    
+    Returns:
+        (responses, options): encoded ResponseSet and dict from parse_analysis_options
+    
+    Raises:
+        AnalysisRequestError: invalid options, a malformed line or too few responses
+    """
+    try:
+        options = parse_analysis_options(None)
+    except ValueError as e:
+        raise AnalysisRequestError({"error": "Invalid options", "message": str(e)})
+    
+    # Parse and encode in one pass over the request stream (buffered: the raw WSGI
+    # stream reads lines in tiny chunks)
+    with timer.stage('encode'):
+        try:
+            responses = ResponseSet.from_ndjson(io.BufferedReader(request.stream, STREAM_BUFFER_SIZE),
+                                                group_by=options['groupBy'])
+        except HTTPException as e:
+            raise AnalysisRequestError({"error": e.name, "message": e.description}, status=e.code)
+        except ValueError as e:
+            logging.error(f"Malformed NDJSON body: {e}")
+            raise AnalysisRequestError({"error": "Malformed NDJSON", "message": str(e)})
+    
+    logging.info(f"Received {len(responses)} responses "
+                 f"({responses.n_members} members, {responses.n_items} questions)")
+    
+    require_min_responses(len(responses))
+    return responses, options
+
+def require_min_responses(count):
+    """Raise AnalysisRequestError when a request has fewer than 50 responses"""
+    if count < 50:
+        logging.warning(f"Insufficient data: {count} responses")
+        raise AnalysisRequestError({
+            "error": "Insufficient data",
+            "message": f"Need at least 50 responses, got {count}"
+        })
+
+def parse_analysis_options(payload):
+    """
+    Read calibration options from the query string, falling back to the JSON body
+    
+    Options:
+        engine: "dense" (imputed matrix, default), "sparse" (observed triplets only)
+            "mml" (marginal maximum likelihood EM on a quadrature grid, no Pyro),
+            "map" (deterministic full-batch L-BFGS posterior mode, MAP abilities, no Pyro) or
+            "fast" (classical test theory preview in one pass; not stored for warm
+            starts or in the item bank)
+        batchSize: subjects per mini-batch SVI step (default: full batch)
+        warmStart: initialise from the stored parameters of previously calibrated
+            questionKeys/memberKeys (default: false; new keys start from the priors;
+            not with engine=fast)
+        maxIter: epoch budget for SVI / EM cycles for MML / L-BFGS iterations for MAP
+            (default: 300 cold, WARM_START_MAX_ITER warm, 100 for MML, 200 for MAP)
+        patience: SVI epochs without improvement of the smoothed loss before the
+            learning rate is lowered / training stops (default: FullIRT3PL's 10)
+        elbo: "trace" (Pyro Trace_ELBO, default) or "analytic" (hand-written ELBO with
+            exact KL terms, no per-step tracing; faster on small banks)
+        cache: reuse / store the result of an identical earlier request (default: true;
+            warm-started calibrations are never cached)
+        subjects: "attempt" (one ability per member attempt, averaged per member; default)
+            or "member" (one ability per member, retakes are extra observations of it;
+            needs a triplet engine: sparse, mml, map or fast)
+        groupBy: name of a per-response field / column (e.g. "part" or "testForm");
+            every group is calibrated independently in the worker pool and the results
+            merged (default: none, one calibration over all responses)
+        profile: run the calibration under cProfile, dump the stats to PROFILE_DIR and
+            list the top functions in metadata.profile (default: false; never cached)
+    
+    Raises:
+        ValueError: if an option has an invalid value
+    """
+    payload = payload or {}
+    
+    def option(name, default=None):
+        value = request.args.get(name)
+        return value if value is not None else payload.get(name, default)
+    
+    engine = option('engine', 'dense')
+    if engine not in IRT_ENGINES:
+        raise ValueError(f"engine must be one of {list(IRT_ENGINES)}, got '{engine}'")
+    
+    batch_size = option('batchSize')
+    if batch_size is not None:
+        batch_size = int(batch_size)
+        if batch_size < 1:
+            raise ValueError(f"batchSize must be a positive integer, got {batch_size}")
+    
+    warm_start = parse_bool(option('warmStart', False))
+    if warm_start and engine == 'fast':
+        raise ValueError("warmStart needs an iterative engine, engine=fast has no starting values")
+    
+    max_iter = option('maxIter')
+    if max_iter is not None:
+        max_iter = int(max_iter)
+        if max_iter < 1:
+            raise ValueError(f"maxIter must be a positive integer, got {max_iter}")
+    elif engine == 'mml':
+        max_iter = 100
+    elif engine == 'map':
+        max_iter = 200
+    elif engine == 'fast':
+        max_iter = None
+    else:
+        max_iter = WARM_START_MAX_ITER if warm_start else 300
+    
+    patience = option('patience')
+    if patience is not None:
+        patience = int(patience)
+        if patience < 1:
+            raise ValueError(f"patience must be a positive integer, got {patience}")
+    
+    elbo = option('elbo', 'trace')
+    if elbo not in SVI_ELBOS:
+        raise ValueError(f"elbo must be one of {list(SVI_ELBOS)}, got '{elbo}'")
+    
+    cache = parse_bool(option('cache', True))
+    
+    subjects = option('subjects', 'attempt')
+    if subjects not in ABILITY_SUBJECTS:
+        raise ValueError(f"subjects must be one of {list(ABILITY_SUBJECTS)}, got '{subjects}'")
+    if subjects == 'member' and engine == 'dense':
+        raise ValueError("subjects=member needs a triplet engine (sparse, mml, map or fast), not dense")
+    
+    group_by = option('groupBy') or None
+    if group_by is not None and group_by in RESPONSE_COLUMNS:
+        raise ValueError(f"groupBy must name an extra field, not one of {list(RESPONSE_COLUMNS)}")
+    
+    profile = parse_bool(option('profile', False))
+    
+    return {'engine': engine, 'batchSize': batch_size, 'warmStart': warm_start, 'maxIter': max_iter,
+            'patience': patience, 'elbo': elbo, 'cache': cache, 'subjects': subjects,
+            'groupBy': group_by, 'profile': profile}
+
+def parse_bool(value):
+    """Interpret a query-string or JSON flag ("true", "1", true, ...)"""
+    if isinstance(value, str):
+        return value.strip().lower() in ('1', 'true', 'yes', 'on')
+    return bool(value)
+
+def load_initial_params(data):
+    """
+    Warm-start values for a calibration from the parameter store
+    
+    Every virtual subject of a member starts from that member's stored ability.
+    
+    Returns:
+        (initial_params, counts): dict of variational parameter arrays aligned with the
+        calibration's items/subjects, and how many items/members were found in the store
+    """
+    item_params, items_found = PARAM_STORE.load_items(data.item_key_list())
+    
+    member_codes, subject_member_pos = np.unique(data.subject_members, return_inverse=True)
+    member_params, members_found = PARAM_STORE.load_members(data.member_keys[member_codes])
+    subject_params = {name: values[subject_member_pos] for name, values in member_params.items()}
+    
+    counts = {'items': int(items_found.sum()), 'members': int(members_found.sum())}
+    return {**item_params, **subject_params}, counts
+
+def save_fitted_params(data, model):
+    """
+    Persist a fitted model's variational parameters per questionKey and memberKey
+    """
+    params = model.variational_params
+    PARAM_STORE.save_items(data.item_key_list(), {
+        name: params[name] for name in ITEM_PARAM_DEFAULTS if name in params
+    })
+    
+    member_keys, theta_loc = data.member_means(params['theta_loc'])
+    _, theta_scale = data.member_means(params['theta_scale'])
+    PARAM_STORE.save_members(member_keys, {'theta_loc': theta_loc, 'theta_scale': theta_scale})
+
+def get_fit_executor():
+    """
+    Lazily start the calibration worker pool (None when FIT_WORKERS is 0)
+    
+    Workers are spawned, not forked, so each starts with a clean torch/Pyro runtime.
+    """
+    global _FIT_EXECUTOR
+    
+    if FIT_WORKERS <= 0:
+        return None
+    
+    with _FIT_EXECUTOR_LOCK:
+        if _FIT_EXECUTOR is None:
+            logging.info(f"Starting calibration worker pool: {FIT_WORKERS} processes x {FIT_WORKER_THREADS} torch threads")
+            _FIT_EXECUTOR = ProcessPoolExecutor(
+                max_workers=FIT_WORKERS,
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=_init_fit_worker,
+                initargs=(FIT_WORKER_THREADS,)
+            )
+        return _FIT_EXECUTOR
+
+def _init_fit_worker(n_threads):
+    """Worker process initializer"""
+    torch.set_num_threads(n_threads)
+
+def get_inline_executor():
+    """Single background thread for asynchronous jobs when the worker pool is disabled"""
+    global _INLINE_EXECUTOR
+    
+    with _FIT_EXECUTOR_LOCK:
+        if _INLINE_EXECUTOR is None:
+            _INLINE_EXECUTOR = ThreadPoolExecutor(max_workers=1, thread_name_prefix='calibration')
+        return _INLINE_EXECUTOR
+
+def _calibration_task(responses, options, timer, progress=None, cache_key=None):
+    """Worker entry point: run one calibration and ship the result back"""
+    profiler = cProfile.Profile() if options['profile'] else None
+    try:
+        if profiler is not None:
+            profiler.enable()
+        if options['groupBy'] is not None:
+            body, status = run_grouped_analysis(responses, options, timer)
+        else:
+            body, status = run_analysis(responses, options, timer, progress)
+    finally:
+        if profiler is not None:
+            profiler.disable()
+        if progress is not None:
+            progress.flush()
+    if cache_key is not None and status == 200:
+        body['metadata']['cache'] = {'hit': False, 'key': cache_key}
+    if profiler is not None and status == 200:
+        body['metadata']['profile'] = dump_profile(profiler)
+    return body, status
+
+def dump_profile(profiler):
+    """
+    Write a finished profiler's stats to PROFILE_DIR (load with pstats / snakeviz)
+    
+    Returns:
+        {"file", "topFunctions": [{"function", "calls", "totalSeconds", "cumulativeSeconds"}]}
+        sorted by cumulative time, or {"error"} if the dump could not be written
+    """
+    stats = pstats.Stats(profiler)
+    path = os.path.join(PROFILE_DIR, f"calibration-{datetime.utcnow():%Y%m%dT%H%M%S%f}-{os.getpid()}.prof")
+    try:
+        os.makedirs(PROFILE_DIR, exist_ok=True)
+        stats.dump_stats(path)
+    except OSError as e:
+        logging.error(f"Could not write profile {path}: {e}")
+        return {"error": str(e)}
+    
+    top = sorted(stats.stats.items(), key=lambda entry: entry[1][3], reverse=True)[:PROFILE_TOP_FUNCTIONS]
+    logging.info(f"Calibration profile written to {path}")
+    return {
+        "file": path,
+        "topFunctions": [{
+            "function": f"{os.path.basename(filename)}:{line}({name})",
+            "calls": calls,
+            "totalSeconds": round(total, 4),
+            "cumulativeSeconds": round(cumulative, 4)
+        } for (filename, line, name), (_, calls, total, cumulative, _) in top]
+    }
+
+def submit_calibration(responses, options, timer, progress=None):
+    """
+    Start run_analysis in the worker pool (or the inline background thread)
+    
+    A result cache hit resolves immediately; a fresh result is cached when it completes.
+    Grouped calibrations are coordinated from the inline thread, which fans the groups
+    out to the worker pool.
+    
+    Returns:
+        Future resolving to (body, status_code)
+    
+    Raises:
+        BrokenProcessPool: a worker has died; the pool is replaced for the next request
+    """
+    started = time.perf_counter()
+    METRICS.fit_started()
+    
+    def record_metrics(done):
+        METRICS.fit_finished()
+        body, status = done.result() if done.exception() is None else ({}, 500)
+        calibration_finished(body, status, options, time.perf_counter() - started, held)
+    
+    executor, held = None, None
+    try:
+        if options['warmStart']:
+            ONLINE.flush()
+        held = ONLINE.hold(responses.item_keys, responses.member_keys)
+        key, cached = lookup_cached_result(responses, options, timer)
+        if cached is not None:
+            future = Future()
+            future.add_done_callback(record_metrics)
+            future.set_result((cached, 200))
+            return future
         
-        # Fill missing values
-        for j in range(response_matrix.shape[1]):
-            item_responses = response_matrix[:, j]
-            valid_responses = item_responses[item_responses >= 0]
-            if len(valid_responses) > 0:
-                mean_response = valid_responses.mean()
-                fill_value = np.round(mean_response)
-                response_matrix[item_responses < 0, j] = fill_value
+        if options['groupBy'] is not None:
+            executor = get_inline_executor()
+        else:
+            executor = get_fit_executor() or get_inline_executor()
+        future = executor.submit(_calibration_task, responses, options, timer, progress, key)
+    except Exception as e:
+        # Nothing will call record_metrics, so release the active-fit gauge here
+        METRICS.fit_finished()
+        calibration_finished({}, 500, options, time.perf_counter() - started, held)
+        if isinstance(e, BrokenProcessPool):
+            reset_fit_executor(executor)
+        raise
+    future.add_done_callback(lambda done: reset_if_broken(executor, done))
+    future.add_done_callback(record_metrics)
+    
+    if key is not None:
+        def cache_result(done):
+            if done.exception() is None:
+                store_cached_result(key, *done.result())
+        future.add_done_callback(cache_result)
+    return future
+
+def reset_if_broken(executor, future):
+    """Done callback: replace the pool when a worker died under this calibration"""
+    if not future.cancelled() and isinstance(future.exception(), BrokenProcessPool):
+        reset_fit_executor(executor)
+
+def execute_calibration(responses, options, timer):
+    """
+    Run run_analysis in the worker pool, or inline (serialized) when the pool is disabled
+    
+    Independent calibrations run in parallel, one per worker process, and never share
+    Pyro state. Inline fits are still isolated by FullIRT3PL's per-fit param store scope.
+    A grouped calibration is coordinated here and only its groups go to the pool.
+    
+    Returns:
+        (body, status_code) from run_analysis / run_grouped_analysis
+    """
+    if options['groupBy'] is not None or get_fit_executor() is None:
+        started = time.perf_counter()
+        body, status, held = {}, 500, None
+        with METRICS.track_active():
+            try:
+                if options['warmStart']:
+                    ONLINE.flush()
+                held = ONLINE.hold(responses.item_keys, responses.member_keys)
+                key, cached = lookup_cached_result(responses, options, timer)
+                if cached is not None:
+                    body, status = cached, 200
+                else:
+                    body, status = _calibration_task(responses, options, timer, cache_key=key)
+                    if key is not None:
+                        store_cached_result(key, body, status)
+            finally:
+                calibration_finished(body, status, options, time.perf_counter() - started, held)
+        return body, status
+    
+    return submit_calibration(responses, options, timer).result()
+
+def calibration_finished(body, status, options, seconds, held=None):
+    """
+    Record a finished calibration in METRICS; a fresh fit rewrote the stored parameters
+    of its questions and members, so their online (/observe) state is dropped
+    
+    Args:
+        held: ONLINE.hold() token taken before the fit started; online updates of its
+            keys were kept out of flushes so they could not overwrite the fit's parameters
+    """
+    METRICS.record_calibration(body, status, options['engine'], seconds)
+    
+    if status == 200 and options['engine'] != 'fast' and not (body['metadata'].get('cache') or {}).get('hit'):
+        ONLINE.discard(body['questionParams'], body['memberAbilities'])
+    if held is not None:
+        ONLINE.release(held)
+
+def _group_task(responses, options):
+    """
+    Worker entry point for one group of a grouped calibration
+    
+    Returns:
+        (body, status, wall_seconds, cpu_seconds) of run_analysis in this process
+    """
+    start, cpu_start = time.perf_counter(), time.process_time()
+    body, status = run_analysis(responses, options, StageTimer(), bank_snapshot=False)
+    return body, status, time.perf_counter() - start, time.process_time() - cpu_start
+
+def lookup_cached_result(responses, options, timer):
+    """
+    Result of an identical earlier calibration, if cached
+    
+    Returns:
+        (key, body): content key (None when the request is not cacheable) and the cached
+        body with metadata.cache marking the hit, or None on a miss
+    """
+    if not (RESULT_CACHE.enabled and options['cache']) or options['warmStart'] or options['profile']:
+        return None, None
+    
+    with timer.stage('cache'):
+        key = result_cache_key(responses, options)
+        try:
+            body = RESULT_CACHE.get(key)
+        except Exception:
+            logging.error(f"Result cache lookup failed: {traceback.format_exc()}")
+            body = None
+    
+    if body is None:
+        logging.info(f"Result cache miss ({key[:12]})")
+        return key, None
+    
+    logging.info(f"Result cache hit ({key[:12]}): returning the stored calibration")
+    body['metadata']['cache'] = {'hit': True, 'key': key}
+    body['metadata']['stageTimings'] = timer.summary()
+    body['metadata']['stageMemory'] = timer.memory_summary()
+    return key, body
+
+def store_cached_result(key, body, status):
+    """Cache a successful result body; cache errors are only logged"""
+    if status != 200:
+        return
+    try:
+        RESULT_CACHE.put(key, body)
+    except Exception:
+        logging.error(f"Could not store result in the cache: {traceback.format_exc()}")
+
+def reset_fit_executor(broken=None):
+    """
+    A worker died (e.g. out of memory); start a fresh pool for the next request
+    
+    With broken given, the pool is only dropped if it is still the current one, so a
+    late report from an old pool never discards its replacement.
+    """
+    global _FIT_EXECUTOR
+    
+    with _FIT_EXECUTOR_LOCK:
+        if _FIT_EXECUTOR is None or (broken is not None and _FIT_EXECUTOR is not broken):
+            return
+        logging.error("Calibration worker pool is broken, restarting it")
+        _FIT_EXECUTOR = None
+
+def run_analysis(responses, options, timer, progress=None, bank_snapshot=True):
+    """
+    Filter, fit and format a calibration for an encoded ResponseSet
+    
+    Args:
+        responses: ResponseSet with the raw (unfiltered) responses
+        options: dict from parse_analysis_options
+        timer: StageTimer collecting per-stage wall times
+        progress: Optional callable(epoch, loss, max_iter) for asynchronous job status
+        bank_snapshot: write the result to the item bank (off for the groups of a
+            grouped calibration, which is snapshotted once after merging)
+    
+    Returns:
+        (body, status_code): JSON-serialisable dict and HTTP status
+    """
+    # ✅ REPEATED MEASURES: each (member, attempt) integer pair is a separate "virtual subject"
+    # Member A doing Q1 three times = 3 different "subjects" in IRT model
+    logging.info(f"Encoded {len(responses)} responses: {responses.n_members} real members, {responses.n_items} questions")
+    
+    # Count responses per question (now ALL responses count)
+    question_counts = responses.item_counts()
+    min_responses_per_question = 3
+    valid_question_mask = question_counts >= min_responses_per_question
+    
+    logging.info(f"Questions with >= {min_responses_per_question} responses: {int(valid_question_mask.sum())}")
+    logging.info(f"Response distribution: min={question_counts.min()}, max={question_counts.max()}, mean={question_counts.mean():.1f}")
+    
+    if not valid_question_mask.any():
+        logging.error("No questions with sufficient data")
+        return ({
+            "error": "No questions with sufficient data",
+            "message": f"Each question needs at least {min_responses_per_question} responses"
+        }, 400)
+    
+    # Virtual subjects + subject/item minimum-count filters
+    with timer.stage('filter'):
+        data = CalibrationData.build(responses, valid_question_mask,
+                                     pool_attempts=options['subjects'] == 'member')
+    
+    logging.info(f"Filtered dataset: {data.total_responses} responses")
+    logging.info(f"Kept {data.n_subjects} {'members' if data.pooled else 'virtual subjects'} "
+                 f"({data.n_attempts} attempts), {data.n_items} items, {len(data.responses)} observed responses")
+    
+    if data.n_subjects < 2 or data.n_items < 2:
+        return ({
+            "error": "Insufficient complete data after filtering",
+            "message": f"Only {data.n_subjects} subjects and {data.n_items} items remaining"
+        }, 400)
+    
+    engine = options['engine']
+    max_iter = options['maxIter']
+    
+    initial_params, warm_counts = None, None
+    if options['warmStart']:
+        with timer.stage('warm_start'):
+            initial_params, warm_counts = load_initial_params(data)
+        logging.info(f"Warm start: {warm_counts['items']}/{data.n_items} items and "
+                     f"{warm_counts['members']} members found in the parameter store")
+    
+    # ELBO implementation and plateau patience of the SVI learning-rate schedule
+    svi_options = {'elbo': options['elbo']}
+    if options['patience']:
+        svi_options['patience'] = options['patience']
+    
+    if engine == 'mml':
+        # Bock–Aitkin EM with θ integrated out, then EAP scoring of every virtual subject
+        logging.info("Starting MML-EM model training...")
+        model = MML3PL(max_iter=max_iter, tolerance=0.001, initial_params=initial_params,
+                       progress_callback=progress)
+        with timer.stage('fit'):
+            model.fit(data.subject_idx, data.item_idx, data.responses, data.n_subjects, data.n_items)
+    elif engine == 'map':
+        # Full-batch L-BFGS on the same posterior with θ integrated out, then MAP θ per subject
+        logging.info("Starting MAP (L-BFGS) model training...")
+        model = MAP3PL(max_iter=max_iter, initial_params=initial_params, progress_callback=progress)
+        with timer.stage('fit'):
+            model.fit(data.subject_idx, data.item_idx, data.responses, data.n_subjects, data.n_items)
+    elif engine == 'fast':
+        # One-pass CTT statistics: a preview while a full calibration runs elsewhere
+        logging.info("Computing fast CTT preview...")
+        model = CTTPreview()
+        with timer.stage('fit'):
+            model.fit(data.subject_idx, data.item_idx, data.responses, data.n_subjects, data.n_items)
+    elif engine == 'sparse':
+        # Long-format (subject, item, response) triplets: no dense matrix, no imputation
+        logging.info("Starting sparse Full IRT model training...")
+        model = FullIRT3PL(max_iter=max_iter, tolerance=0.0003, batch_size=options['batchSize'],
+                           initial_params=initial_params, progress_callback=progress,
+                           **svi_options)
+        with timer.stage('fit'):
+            model.fit_sparse(data.subject_idx, data.item_idx, data.responses, data.n_subjects, data.n_items)
+    else:
+        # Dense matrix with missing cells filled by each item's rounded mean
+        with timer.stage('matrix'):
+            response_matrix = data.to_dense(impute=True)
+        logging.info(f"Final matrix shape: {response_matrix.shape}")
         
-        # Fit Full IRT model
         logging.info("Starting Full IRT model training...")
-        
-        model = FullIRT3PL(max_iter=300, tolerance=0.0001)
-        model.fit(response_matrix)
-        
+        model = FullIRT3PL(max_iter=max_iter, tolerance=0.0003, batch_size=options['batchSize'],
+                           initial_params=initial_params, progress_callback=progress,
+                           **svi_options)
+        with timer.stage('fit'):
+            model.fit(response_matrix)
+    
+    with timer.stage('format'):
         # Extract results
         item_params = model.get_item_parameters()
         subject_abilities = model.get_subject_abilities()
@@ -330,8 +1749,8 @@ def analyze_irt():
         # Format results
         question_params = {}
         
-        for idx, item_id in enumerate(valid_items):
-            n_responses = question_counts.get(item_id, 0)
+        for idx, (item_id, item_code) in enumerate(zip(data.item_key_list(), data.item_codes)):
+            n_responses = question_counts[item_code]
             
             if n_responses >= 50:
                 confidence = "High"
@@ -353,45 +1772,207 @@ def analyze_irt():
                 'quality': quality,
                 'confidenceLevel': confidence,
                 'attemptCount': int(n_responses),
-                'converged': True
+                'converged': bool(model.converged)
             }
         
         # ✅ AGGREGATE abilities back to REAL members (average across attempts)
-        real_member_abilities = {}
-        for idx, virtual_subj in enumerate(valid_subjects):
-            real_member = virtual_to_real_member.get(virtual_subj)
-            if real_member:
-                if real_member not in real_member_abilities:
-                    real_member_abilities[real_member] = []
-                real_member_abilities[real_member].append(subject_abilities[idx])
-        
-        # Average abilities across attempts
-        member_abilities = {
-            str(member): float(np.mean(abilities))
-            for member, abilities in real_member_abilities.items()
-        }
+        member_abilities = data.member_abilities(subject_abilities)
+    
+    metadata = {
+        "totalQuestions": len(question_params),
+        "totalMembers": len(member_abilities),
+        "totalAttempts": data.n_attempts,
+        "subjects": options['subjects'],
+        "abilityParameters": data.n_subjects,
+        "totalResponses": data.total_responses,
+        "timestamp": datetime.utcnow().isoformat(),
+        "modelType": model_type(engine),
+        "engine": engine,
+        "elbo": options['elbo'] if engine in ('dense', 'sparse') else None,
+        "batchSize": options['batchSize'],
+        "warmStart": warm_counts,
+        "iterations": model.iterations,
+        "maxIter": max_iter,
+        "converged": bool(model.converged),
+        "cache": None
+    }
+    
+    # Item x θ information table stored with the snapshot (/bank/information)
+    information = None
+    if bank_snapshot and engine != 'fast':
+        with timer.stage('information'):
+            information = information_table(question_params)
+    
+    # Keep the fitted parameters for later warm starts and a versioned snapshot in the
+    # item bank; a store failure must not lose the fit. Fast previews are not kept.
+    if engine != 'fast':
+        with timer.stage('persist'):
+            try:
+                save_fitted_params(data, model)
+            except Exception:
+                logging.error(f"Could not persist fitted parameters: {traceback.format_exc()}")
+            
+            if bank_snapshot:
+                save_bank_snapshot(question_params, metadata, information)
+    
+    logging.info(f"Complete: {len(question_params)} questions, {len(member_abilities)} real members ({data.n_attempts} attempts)")
+    logging.info(f"Stage timings (s): {timer.summary()}")
+    
+    metadata['stageTimings'] = timer.summary()
+    metadata['stageMemory'] = timer.memory_summary()
+    return ({
+        "status": "OK",
+        "questionParams": question_params,
+        "memberAbilities": member_abilities,
+        "metadata": metadata
+    }, 200)
+
+def model_type(engine):
+    """metadata.modelType of a calibration engine"""
+    if engine == 'fast':
+        return "3PL CTT Approximation (Preview) - Repeated Measures"
+    return "3PL Full IRT (EM Algorithm) - Repeated Measures"
+
+def information_table(question_params):
+    """
+    (theta_grid, question_keys, table): float32 item information of every calibrated
+    question on INFORMATION_GRID, rows in questionParams order
+    """
+    question_keys = list(question_params)
+    a, b, c = (np.array([question_params[key][name] for key in question_keys], dtype=np.float64)
+               for name in ('discrimination', 'difficulty', 'guessing'))
+    return INFORMATION_GRID, question_keys, item_information(a, b, c)
+
+def save_bank_snapshot(question_params, metadata, information=None):
+    """Write an item bank version and record it as metadata.bankVersion (None on failure)"""
+    try:
+        metadata['bankVersion'] = ITEM_BANK.save_snapshot(question_params, metadata, information)
+    except Exception:
+        metadata['bankVersion'] = None
+        logging.error(f"Could not write the item bank snapshot: {traceback.format_exc()}")
+
+def run_grouped_analysis(responses, options, timer):
+    """
+    Calibrate every group (part, test form, ...) independently and merge the results
+    
+    Groups share no questions, so their item parameters are independent problems: they
+    are fitted in parallel in the worker pool (one after another when it is disabled).
+    Members answering several groups get the response-weighted mean of their group
+    abilities.
+    
+    Returns:
+        (body, status_code): the /analyze body, with metadata.groups holding every
+        group's status, size, wall and CPU time and metadata.parallel the overall speedup
+    """
+    with timer.stage('split'):
+        try:
+            groups = responses.split_groups()
+        except ValueError as e:
+            logging.error(f"Cannot split by {options['groupBy']}: {e}")
+            return ({"error": "Invalid groups", "message": str(e)}, 400)
+    
+    executor = get_fit_executor()
+    workers = min(FIT_WORKERS, len(groups)) if executor is not None else 1
+    logging.info(f"Grouped calibration by '{options['groupBy']}': {len(groups)} groups on {workers} worker(s)")
+    
+    # Results are cached / snapshotted once for the whole request, not per group
+    group_options = {**options, 'groupBy': None, 'cache': False}
+    with timer.stage('fit'):
+        start = time.perf_counter()
+        if executor is None:
+            results = [_group_task(group_responses, group_options) for _, group_responses in groups]
+        else:
+            futures = [executor.submit(_group_task, group_responses, group_options)
+                       for _, group_responses in groups]
+            try:
+                results = [future.result() for future in futures]
+            except BrokenProcessPool:
+                reset_fit_executor()
+                raise
+        wall_seconds = time.perf_counter() - start
+    
+    with timer.stage('merge'):
+        question_params, ability_frames, group_summaries = {}, [], []
+        for (group_key, group_responses), (body, status, seconds, cpu_seconds) in zip(groups, results):
+            summary = {"group": group_key, "status": status, "wallSeconds": round(seconds, 3),
+                       "cpuSeconds": round(cpu_seconds, 3)}
+            if status != 200:
+                summary["error"] = body.get("message", body.get("error"))
+                group_summaries.append(summary)
+                continue
+            
+            group_metadata = body['metadata']
+            summary.update({name: group_metadata[name] for name in (
+                'totalQuestions', 'totalMembers', 'totalAttempts', 'totalResponses', 'iterations', 'converged')})
+            summary['fitSeconds'] = group_metadata['stageTimings'].get('fit')
+            group_summaries.append(summary)
+            
+            for key, params in body['questionParams'].items():
+                question_params[key] = {**params, 'group': group_key}
+            
+            counts = pd.Series(np.bincount(group_responses.member_codes, minlength=group_responses.n_members),
+                               index=group_responses.member_keys)
+            abilities = pd.Series(body['memberAbilities'], dtype=np.float64)
+            ability_frames.append(pd.DataFrame({'theta': abilities, 'weight': counts[abilities.index].to_numpy()}))
         
-        logging.info(f"Complete: {len(question_params)} questions, {len(member_abilities)} real members ({len(valid_subjects)} attempts)")
+        if not question_params:
+            return ({
+                "error": "No group could be calibrated",
+                "message": "; ".join(f"{g['group']}: {g.get('error')}" for g in group_summaries),
+                "groups": group_summaries
+            }, 400)
         
-        return jsonify({
-            "status": "OK",
-            "questionParams": question_params,
-            "memberAbilities": member_abilities,
-            "metadata": {
-                "totalQuestions": len(question_params),
-                "totalMembers": len(member_abilities),
-                "totalAttempts": len(valid_subjects),
-                "totalResponses": len(df_filtered),
-                "timestamp": datetime.utcnow().isoformat(),
-                "modelType": "3PL Full IRT (EM Algorithm) - Repeated Measures",
-                "iterations": model.max_iter
-            }
-        })
+        abilities = pd.concat(ability_frames)
+        abilities['weighted'] = abilities['theta'] * abilities['weight']
+        sums = abilities.groupby(level=0, sort=False)[['weighted', 'weight']].sum()
+        member_abilities = {str(key): float(value)
+                            for key, value in (sums['weighted'] / sums['weight']).items()}
+    
+    # Speedup = CPU time the groups needed / wall time they took together (summed
+    # group wall times would overstate it when workers share cores)
+    cpu_seconds = sum(result[3] for result in results)
+    fitted = [g for g in group_summaries if g['status'] == 200]
+    metadata = {
+        "totalQuestions": len(question_params),
+        "totalMembers": len(member_abilities),
+        "totalAttempts": sum(g['totalAttempts'] for g in fitted),
+        "totalResponses": sum(g['totalResponses'] for g in fitted),
+        "timestamp": datetime.utcnow().isoformat(),
+        "modelType": model_type(options['engine']),
+        "engine": options['engine'],
+        "subjects": options['subjects'],
+        "groupBy": options['groupBy'],
+        "groups": group_summaries,
+        "parallel": {
+            "workers": workers,
+            "wallSeconds": round(wall_seconds, 3),
+            "cpuSeconds": round(cpu_seconds, 3),
+            "speedup": round(cpu_seconds / wall_seconds, 2) if wall_seconds > 0 else None
+        },
+        "iterations": max(g['iterations'] for g in fitted),
+        "maxIter": options['maxIter'],
+        "converged": all(g['converged'] for g in fitted),
+        "cache": None
+    }
+    
+    if options['engine'] != 'fast':
+        with timer.stage('information'):
+            information = information_table(question_params)
         
-    except Exception as e:
-        error_trace = traceback.format_exc()
-        logging.error(f"ERROR: {error_trace}")
-        return jsonify({"error": str(e), "trace": error_trace}), 500
+        with timer.stage('persist'):
+            save_bank_snapshot(question_params, metadata, information)
+    
+    logging.info(f"Grouped calibration complete: {len(question_params)} questions in {len(fitted)}/{len(groups)} "
+                 f"groups, {wall_seconds:.2f}s wall for {cpu_seconds:.2f}s of CPU time")
+    
+    metadata['stageTimings'] = timer.summary()
+    metadata['stageMemory'] = timer.memory_summary()
+    return ({
+        "status": "OK",
+        "questionParams": question_params,
+        "memberAbilities": member_abilities,
+        "metadata": metadata
+    }, 200)
 
 def determine_quality(discrimination, guessing, difficulty):
     """
@@ -0,0 +1,195 @@
+import json
+import os
+import sqlite3
+import threading
+from datetime import datetime
+
+import numpy as np
+
+# Per-question fields of a snapshot: questionParams name -> column
+SNAPSHOT_FIELDS = {
+    'difficulty': 'difficulty',
+    'discrimination': 'discrimination',
+    'guessing': 'guessing',
+    'quality': 'quality',
+    'confidenceLevel': 'confidence_level',
+    'attemptCount': 'attempt_count',
+    'converged': 'converged',
+    'group': 'group_key'
+}
+
+# Information tables kept in memory by ItemBank.load_information
+INFORMATION_CACHE_SIZE = 4
+
+# Calibration metadata kept with every version
+VERSION_FIELDS = {
+    'engine': 'engine',
+    'totalQuestions': 'total_questions',
+    'totalMembers': 'total_members',
+    'totalResponses': 'total_responses'
+}
+
+
+class ItemBank:
+    """
+    SQLite history of calibrated item parameters, one immutable snapshot per calibration
+
+    bank_versions holds one row per snapshot; bank_items is keyed by (version,
+    question_key), so reading one version (or the latest) is an index range scan and
+    never touches the rest of the history. bank_information keeps each version's item x θ
+    information table as one float32 blob. One connection per call, like ParameterStore.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._information_lock = threading.Lock()
+        self._information_cache = {}
+        directory = os.path.dirname(path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory, exist_ok=True)
+
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS bank_versions ("
+                "version INTEGER PRIMARY KEY AUTOINCREMENT, created_at TEXT, engine TEXT, "
+                "total_questions INTEGER, total_members INTEGER, total_responses INTEGER, "
+                "metadata TEXT)")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS bank_items ("
+                "version INTEGER NOT NULL, question_key TEXT NOT NULL, difficulty REAL, "
+                "discrimination REAL, guessing REAL, quality TEXT, confidence_level TEXT, "
+                "attempt_count INTEGER, converged INTEGER, group_key TEXT, "
+                "PRIMARY KEY (version, question_key)) WITHOUT ROWID")
+            # Banks created before grouped calibrations have no group column
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(bank_items)")}
+            if 'group_key' not in columns:
+                conn.execute("ALTER TABLE bank_items ADD COLUMN group_key TEXT")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS bank_information ("
+                "version INTEGER PRIMARY KEY, theta_grid BLOB NOT NULL, question_keys TEXT NOT NULL, "
+                "information BLOB NOT NULL)")
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=30)
+
+    def save_snapshot(self, question_params, metadata, information=None):
+        """
+        Write a new version holding every question of one calibration
+
+        Args:
+            question_params: questionParams dict of an /analyze result
+            metadata: its metadata dict (engine, totals, ...)
+            information: Optional (theta_grid, question_keys, table) with the float32
+                item x θ information table of these questions
+
+        Returns:
+            the new version number
+        """
+        columns = list(SNAPSHOT_FIELDS.values())
+        rows = [
+            (str(key), *(params.get(name) for name in SNAPSHOT_FIELDS))
+            for key, params in question_params.items()
+        ]
+
+        with self._connect() as conn:
+            cursor = conn.execute(
+                f"INSERT INTO bank_versions (created_at, {', '.join(VERSION_FIELDS.values())}, metadata) "
+                f"VALUES (?, {', '.join('?' * len(VERSION_FIELDS))}, ?)",
+                (datetime.utcnow().isoformat(), *(metadata.get(name) for name in VERSION_FIELDS),
+                 json.dumps(metadata)))
+            version = cursor.lastrowid
+            conn.executemany(
+                f"INSERT INTO bank_items (version, question_key, {', '.join(columns)}) "
+                f"VALUES (?, ?, {', '.join('?' * len(columns))})",
+                [(version, *row) for row in rows])
+            if information is not None:
+                theta_grid, question_keys, table = information
+                conn.execute(
+                    "INSERT INTO bank_information (version, theta_grid, question_keys, information) "
+                    "VALUES (?, ?, ?, ?)",
+                    (version, np.asarray(theta_grid, dtype=np.float64).tobytes(),
+                     json.dumps([str(key) for key in question_keys]),
+                     np.ascontiguousarray(table, dtype=np.float32).tobytes()))
+
+        return version
+
+    def load_information(self, version):
+        """
+        Item information table of a version, or None if it has none
+
+        Versions are immutable, so the most recently read tables are kept in memory.
+
+        Returns:
+            (theta_grid, question_keys, key_index, table): θ points, question keys in row
+            order, {questionKey: row} and the float32 (n_questions, n_points) table
+        """
+        with self._information_lock:
+            if version in self._information_cache:
+                return self._information_cache[version]
+
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT theta_grid, question_keys, information FROM bank_information WHERE version = ?",
+                (version,)).fetchone()
+        if row is None:
+            return None
+
+        theta_grid = np.frombuffer(row[0], dtype=np.float64)
+        question_keys = json.loads(row[1])
+        table = np.frombuffer(row[2], dtype=np.float32).reshape(len(question_keys), len(theta_grid))
+        information = (theta_grid, question_keys, {key: i for i, key in enumerate(question_keys)}, table)
+
+        with self._information_lock:
+            if len(self._information_cache) >= INFORMATION_CACHE_SIZE:
+                self._information_cache.pop(next(iter(self._information_cache)))
+            self._information_cache[version] = information
+        return information
+
+    def latest_version(self):
+        """Highest version number, or None when the bank is empty"""
+        with self._connect() as conn:
+            return conn.execute("SELECT MAX(version) FROM bank_versions").fetchone()[0]
+
+    def load(self, version):
+        """
+        One snapshot in the /analyze questionParams layout
+
+        Returns:
+            {"version", "createdAt", "engine", ..., "metadata", "questionParams"}, or None
+            if the version does not exist
+        """
+        with self._connect() as conn:
+            header = conn.execute(
+                f"SELECT version, created_at, {', '.join(VERSION_FIELDS.values())}, metadata "
+                f"FROM bank_versions WHERE version = ?", (version,)).fetchone()
+            if header is None:
+                return None
+
+            rows = conn.execute(
+                f"SELECT question_key, {', '.join(SNAPSHOT_FIELDS.values())} "
+                f"FROM bank_items WHERE version = ?", (version,)).fetchall()
+
+        snapshot = self._version_summary(header)
+        snapshot['metadata'] = json.loads(header[-1]) if header[-1] else None
+        snapshot['questionParams'] = {
+            row[0]: {name: value for name, value in zip(SNAPSHOT_FIELDS, row[1:])}
+            for row in rows
+        }
+        for params in snapshot['questionParams'].values():
+            if params['converged'] is not None:
+                params['converged'] = bool(params['converged'])
+        return snapshot
+
+    def versions(self, limit=50):
+        """Newest-first summaries (no item rows) of up to limit versions"""
+        with self._connect() as conn:
+            rows = conn.execute(
+                f"SELECT version, created_at, {', '.join(VERSION_FIELDS.values())}, metadata "
+                f"FROM bank_versions ORDER BY version DESC LIMIT ?", (limit,)).fetchall()
+        return [self._version_summary(row) for row in rows]
+
+    @staticmethod
+    def _version_summary(row):
+        summary = {'version': row[0], 'createdAt': row[1]}
+        summary.update(zip(VERSION_FIELDS, row[2:2 + len(VERSION_FIELDS)]))
+        return summary
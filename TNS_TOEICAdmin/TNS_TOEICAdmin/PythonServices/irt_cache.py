@@ -0,0 +1,166 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+
+import numpy as np
+
+# Bump when the result body or the fitting code changes, so stale entries stop matching
+CACHE_KEY_VERSION = 1
+
+# Options that change the fitted result (warmStart is never cached: it depends on the store)
+CACHE_KEY_OPTIONS = ('engine', 'batchSize', 'maxIter', 'patience', 'elbo', 'subjects', 'groupBy')
+
+
+def result_cache_key(responses, options):
+    """
+    Content hash of a calibration request: the canonicalised dataset plus the options
+
+    The dataset is canonicalised so that row order does not matter, except the order of
+    a member's retakes of the same question (it defines the attempts): keys are ranked
+    by value, rows sorted by (member, question, attempt).
+
+    Args:
+        responses: ResponseSet
+        options: dict from parse_analysis_options
+
+    Returns:
+        hex SHA-256 string
+    """
+    digest = hashlib.sha256()
+    settings = {name: options.get(name) for name in CACHE_KEY_OPTIONS}
+    digest.update(json.dumps({'version': CACHE_KEY_VERSION, 'options': settings}, sort_keys=True).encode())
+
+    member_rank, member_keys = _key_ranks(responses.member_keys)
+    item_rank, item_keys = _key_ranks(responses.item_keys)
+    for keys in (member_keys, item_keys):
+        digest.update(len(keys).to_bytes(8, 'little'))
+        digest.update('\n'.join(keys).encode())
+
+    pair = member_rank[responses.member_codes].astype(np.int64) * max(len(item_keys), 1) + \
+        item_rank[responses.item_codes]
+    attempts = responses.attempt_codes
+    order = np.lexsort((attempts, pair))
+    for column in (pair[order], attempts[order].astype(np.int32), responses.responses[order]):
+        digest.update(np.ascontiguousarray(column).tobytes())
+
+    if responses.group_codes is not None:
+        group_rank, group_keys = _key_ranks(responses.group_keys)
+        digest.update('\n'.join(group_keys).encode())
+        digest.update(np.ascontiguousarray(group_rank[responses.group_codes][order]).tobytes())
+
+    return digest.hexdigest()
+
+
+def _key_ranks(keys):
+    """Sorted keys and the rank of every key code in that order"""
+    order = np.argsort(np.asarray(keys, dtype=object), kind='stable')
+    ranks = np.empty(len(keys), dtype=np.int64)
+    ranks[order] = np.arange(len(keys))
+    return ranks, [str(key) for key in np.asarray(keys, dtype=object)[order]]
+
+
+class ResultCache:
+    """
+    On-disk cache of /analyze result bodies, one JSON file per content key
+
+    Entries are evicted least-recently-used first once their total size exceeds
+    max_bytes (0 disables the cache). Hit and miss counts are kept for /health.
+    """
+
+    def __init__(self, directory, max_bytes):
+        """
+        Args:
+            directory: Folder holding <key>.json entries (created on demand)
+            max_bytes: Size budget for all entries together
+        """
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._entries = None
+
+    @property
+    def enabled(self):
+        return self.max_bytes > 0
+
+    def _path(self, key):
+        return os.path.join(self.directory, f"{key}.json")
+
+    def _index(self):
+        """{key: (size, last_used)} of the entries on disk, scanned once"""
+        if self._entries is None:
+            os.makedirs(self.directory, exist_ok=True)
+            self._entries = {}
+            for name in os.listdir(self.directory):
+                if name.endswith('.json'):
+                    stat = os.stat(os.path.join(self.directory, name))
+                    self._entries[name[:-len('.json')]] = (stat.st_size, stat.st_mtime)
+        return self._entries
+
+    def get(self, key):
+        """
+        Stored body for key, or None (counted as a hit / miss)
+        """
+        with self._lock:
+            entries = self._index()
+            if key in entries:
+                try:
+                    with open(self._path(key), 'rb') as f:
+                        body = json.loads(f.read())
+                except (OSError, ValueError):
+                    logging.warning(f"Dropping unreadable result cache entry {key}")
+                    self._remove(key)
+                else:
+                    now = time.time()
+                    os.utime(self._path(key), (now, now))
+                    entries[key] = (entries[key][0], now)
+                    self.hits += 1
+                    return body
+            self.misses += 1
+            return None
+
+    def put(self, key, body):
+        """Store body under key, then evict least-recently-used entries over budget"""
+        data = json.dumps(body).encode()
+        if len(data) > self.max_bytes:
+            logging.info(f"Result of {len(data)} bytes exceeds the cache budget, not cached")
+            return
+
+        with self._lock:
+            entries = self._index()
+            temporary = f"{self._path(key)}.{os.getpid()}.tmp"
+            with open(temporary, 'wb') as f:
+                f.write(data)
+            os.replace(temporary, self._path(key))
+            entries[key] = (len(data), time.time())
+
+            total = sum(size for size, _ in entries.values())
+            for old_key, (size, _) in sorted(entries.items(), key=lambda entry: entry[1][1]):
+                if total <= self.max_bytes:
+                    break
+                self._remove(old_key)
+                total -= size
+
+    def _remove(self, key):
+        self._entries.pop(key, None)
+        try:
+            os.remove(self._path(key))
+        except FileNotFoundError:
+            pass
+
+    def stats(self):
+        """Hit/miss counts and current size, for /health"""
+        with self._lock:
+            entries = self._index() if self.enabled else {}
+            return {
+                'enabled': self.enabled,
+                'hits': self.hits,
+                'misses': self.misses,
+                'entries': len(entries),
+                'bytes': sum(size for size, _ in entries.values()),
+                'maxBytes': self.max_bytes
+            }
@@ -0,0 +1,417 @@
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+import numpy as np
+from scipy.special import expit
+
+from irt_scoring import INFORMATION_GRID, item_information
+
+# Items examined per step when walking a pre-sorted information order
+_WALK_CHUNK = 32
+
+# Exposure rates are only enforced once this many sessions have used a bank version
+MIN_EXPOSURE_SESSIONS = 20
+
+# Seconds between scans for idle sessions
+PURGE_INTERVAL = 60
+
+# Bank versions kept in memory; least recently used ones no active session needs are dropped
+MAX_LOADED_BANKS = 4
+
+
+class CATBank:
+    """
+    One item bank version prepared for adaptive item selection
+
+    For every θ grid point the items of each content group (part) are pre-sorted by
+    decreasing information, so the most informative eligible item is found by walking
+    the head of one sorted row instead of scanning the bank.
+    """
+
+    def __init__(self, version, question_keys, a, b, c, groups, theta_grid=INFORMATION_GRID,
+                 information=None):
+        """
+        Args:
+            version: item bank version the parameters come from
+            question_keys: questionKey of each item
+            a, b, c: 3PL parameters per item
+            groups: content group (e.g. TOEIC part) per item, None when unknown
+            theta_grid: θ points of the information table
+            information: Optional precomputed (n_items, n_points) table (item_information)
+        """
+        self.version = version
+        self.question_keys = [str(key) for key in question_keys]
+        self.key_index = {key: i for i, key in enumerate(self.question_keys)}
+        self.a, self.b, self.c = (np.asarray(values, dtype=np.float64) for values in (a, b, c))
+        self.groups = [None if group is None else str(group) for group in groups]
+        self.theta_grid = np.asarray(theta_grid, dtype=np.float64)
+        if information is None:
+            information = item_information(self.a, self.b, self.c, self.theta_grid)
+        self.information = information
+
+        # Decreasing-information order of all items / each group's items, per grid point
+        self.order = self._sorted_order(np.arange(len(self.question_keys)))
+        members = {}
+        for i, group in enumerate(self.groups):
+            members.setdefault(group, []).append(i)
+        self.group_order = {group: self._sorted_order(np.array(items)) for group, items in members.items()}
+
+        self.exposure_counts = np.zeros(len(self.question_keys), dtype=np.int64)
+        self.sessions_started = 0
+
+    @classmethod
+    def from_snapshot(cls, snapshot, information=None):
+        """
+        Build from ItemBank.load() output and, if present, ItemBank.load_information()
+        """
+        params = snapshot['questionParams']
+        keys = list(params)
+        a, b, c = (np.array([params[key][name] for key in keys], dtype=np.float64)
+                   for name in ('discrimination', 'difficulty', 'guessing'))
+        groups = [params[key].get('group') for key in keys]
+
+        table, theta_grid = None, INFORMATION_GRID
+        if information is not None:
+            theta_grid, table_keys, key_index, full_table = information
+            table = full_table[[key_index[key] for key in keys]]
+        return cls(snapshot['version'], keys, a, b, c, groups, theta_grid, table)
+
+    def _sorted_order(self, items):
+        """(n_points, len(items)) int32 item indices, most informative first at each θ"""
+        ranks = np.argsort(-self.information[items].T, axis=1, kind='stable')
+        return np.ascontiguousarray(items[ranks], dtype=np.int32)
+
+    def __len__(self):
+        return len(self.question_keys)
+
+    def grid_index(self, theta):
+        """Nearest θ grid point"""
+        return int(np.abs(self.theta_grid - theta).argmin())
+
+    def log_likelihood(self, item, is_correct):
+        """Log-likelihood of one response at every θ grid point"""
+        c = self.c[item]
+        p = c + (1 - c) * expit(self.a[item] * (self.theta_grid - self.b[item]))
+        return np.log(p if is_correct else 1 - p)
+
+
+class CATSession:
+    """
+    State of one adaptive test: administered items and the posterior of θ on the grid
+
+    The posterior starts from the N(0,1) prior and adds one item's log-likelihood per
+    response, so each update is O(grid points) regardless of the test length.
+    """
+
+    def __init__(self, session_id, bank, max_items, se_target, content_targets, exclude):
+        self.id = session_id
+        self.bank = bank
+        self.max_items = max_items
+        self.se_target = se_target
+        self.content_targets = content_targets
+        self.seen = set(exclude)
+        self.responses = []
+        self.group_counts = {}
+        self.log_posterior = -0.5 * bank.theta_grid ** 2
+        self.pending = None
+        self.finished = None
+        self.last_used = time.time()
+        self.lock = threading.Lock()
+
+    @property
+    def posterior(self):
+        weights = np.exp(self.log_posterior - self.log_posterior.max())
+        return weights / weights.sum()
+
+    @property
+    def theta(self):
+        """EAP θ"""
+        return float(self.posterior @ self.bank.theta_grid)
+
+    @property
+    def standard_error(self):
+        """Posterior standard deviation of θ"""
+        posterior = self.posterior
+        mean = posterior @ self.bank.theta_grid
+        return float(np.sqrt(max(posterior @ self.bank.theta_grid ** 2 - mean ** 2, 0.0)))
+
+    def record(self, item, is_correct):
+        self.log_posterior = self.log_posterior + self.bank.log_likelihood(item, is_correct)
+        self.responses.append((item, int(is_correct)))
+        group = self.bank.groups[item]
+        self.group_counts[group] = self.group_counts.get(group, 0) + 1
+
+    def summary(self):
+        """JSON-serialisable state, including the next item to present (if any)"""
+        theta = self.theta
+        summary = {
+            'sessionId': self.id,
+            'version': self.bank.version,
+            'theta': theta,
+            'standardError': self.standard_error,
+            'administered': len(self.responses),
+            'finished': self.finished is not None,
+            'stopReason': self.finished,
+            'nextItem': None
+        }
+        if self.pending is not None:
+            bank = self.bank
+            summary['nextItem'] = {
+                'questionKey': bank.question_keys[self.pending],
+                'group': bank.groups[self.pending],
+                'information': float(bank.information[self.pending, bank.grid_index(theta)])
+            }
+        return summary
+
+
+class CATEngine:
+    """
+    In-memory computerized adaptive testing on the calibrated item bank
+
+    Every session holds a provisional θ (EAP on the information grid) and gets the
+    maximum-information unseen item at that θ, with:
+      - exposure control: randomesque choice among the `randomesque` best eligible
+        items, and items given in more than `max_exposure` of a version's sessions
+        are skipped;
+      - content balancing: with content targets ({part: share}), the next item comes
+        from the part furthest below its target share.
+
+    Banks are loaded once per version from ItemBank and shared by all sessions; at
+    most MAX_LOADED_BANKS versions stay loaded beyond those active sessions still use.
+    Sessions idle for longer than session_ttl are dropped.
+    """
+
+    def __init__(self, item_bank, session_ttl, max_sessions, randomesque=5, max_exposure=0.25, seed=None):
+        """
+        Args:
+            item_bank: ItemBank holding the calibrated versions
+            session_ttl: Seconds of inactivity after which a session is dropped
+            max_sessions: Maximum number of concurrent sessions
+            randomesque: Number of top eligible items the next item is drawn from (1 = pure
+                maximum information)
+            max_exposure: Highest share of a version's sessions an item may appear in
+            seed: Optional seed of the randomesque draws
+        """
+        self.item_bank = item_bank
+        self.session_ttl = session_ttl
+        self.max_sessions = max_sessions
+        self.randomesque = randomesque
+        self.max_exposure = max_exposure
+        self._rng = np.random.default_rng(seed)
+        self._banks = OrderedDict()
+        self._sessions = {}
+        # _lock guards the session and bank tables; item selection only needs the
+        # exposure counts and the rng, which have their own lock
+        self._lock = threading.Lock()
+        self._selection_lock = threading.Lock()
+        self._last_purge = 0.0
+
+    def bank(self, version=None):
+        """
+        CATBank of a version (default: latest), loaded on first use
+
+        Raises:
+            LookupError: if the item bank is empty or the version does not exist
+        """
+        if version is None:
+            version = self.item_bank.latest_version()
+            if version is None:
+                raise LookupError("the item bank is empty")
+
+        with self._lock:
+            bank = self._banks.get(version)
+            if bank is not None:
+                self._banks.move_to_end(version)
+                return bank
+
+        snapshot = self.item_bank.load(version)
+        if snapshot is None:
+            raise LookupError(f"no item bank version {version}")
+        bank = CATBank.from_snapshot(snapshot, self.item_bank.load_information(version))
+
+        with self._lock:
+            bank = self._banks.setdefault(version, bank)
+            self._banks.move_to_end(version)
+            self._evict_banks(keep=version)
+        return bank
+
+    def _evict_banks(self, keep=None):
+        """
+        Drop least recently used versions beyond MAX_LOADED_BANKS (lock held); versions
+        of active sessions and keep (just loaded, its session is not registered yet) stay
+        """
+        if len(self._banks) <= MAX_LOADED_BANKS:
+            return
+        in_use = {session.bank.version for session in self._sessions.values()}
+        in_use.add(keep)
+        for version in [version for version in self._banks if version not in in_use]:
+            if len(self._banks) <= MAX_LOADED_BANKS:
+                break
+            del self._banks[version]
+
+    def start_session(self, version=None, max_items=None, se_target=None, content_targets=None, exclude=()):
+        """
+        Open a session and select its first item
+
+        Args:
+            version: item bank version (default: latest)
+            max_items: stop after this many responses (default: no limit)
+            se_target: stop once the standard error of θ is at most this (default: none)
+            content_targets: Optional {group: target share}; shares are normalised
+            exclude: questionKeys the member must not get (e.g. already seen)
+
+        Returns:
+            CATSession
+
+        Raises:
+            LookupError: unknown version or empty bank
+            ValueError: content targets naming no group of the bank
+            RuntimeError: max_sessions sessions are already active
+        """
+        self.purge_expired()
+        bank = self.bank(version)
+
+        if content_targets:
+            targets = {str(group): float(share) for group, share in content_targets.items()
+                       if str(group) in bank.group_order and float(share) > 0}
+            if not targets:
+                raise ValueError(f"content targets match no group of version {bank.version}")
+            total = sum(targets.values())
+            content_targets = {group: share / total for group, share in targets.items()}
+
+        excluded = [bank.key_index[str(key)] for key in exclude if str(key) in bank.key_index]
+        session = CATSession(uuid.uuid4().hex, bank, max_items, se_target, content_targets or None, excluded)
+
+        with self._lock:
+            if len(self._sessions) >= self.max_sessions:
+                raise RuntimeError(f"{self.max_sessions} adaptive sessions are already active")
+            self._sessions[session.id] = session
+        with self._selection_lock:
+            bank.sessions_started += 1
+
+        with session.lock:
+            self._advance(session)
+        return session
+
+    def get(self, session_id):
+        """Active session by id, or None"""
+        self.purge_expired()
+        now = time.time()
+        with self._lock:
+            session = self._sessions.get(session_id)
+            # Idle past its TTL but not purged yet (purges run every PURGE_INTERVAL)
+            if session is not None and session.last_used < now - self.session_ttl:
+                del self._sessions[session_id]
+                return None
+        if session is not None:
+            session.last_used = now
+        return session
+
+    def answer(self, session_id, question_key, is_correct):
+        """
+        Record the response to the pending item, update θ and select the next item
+
+        Returns:
+            CATSession, or None if the session is unknown / expired
+
+        Raises:
+            ValueError: the session is finished or question_key is not its pending item
+        """
+        session = self.get(session_id)
+        if session is None:
+            return None
+
+        with session.lock:
+            if session.pending is None:
+                raise ValueError("the session is finished")
+            if str(question_key) != session.bank.question_keys[session.pending]:
+                raise ValueError(f"expected a response to questionKey "
+                                 f"'{session.bank.question_keys[session.pending]}', got '{question_key}'")
+            session.record(session.pending, is_correct)
+            session.pending = None
+            self._advance(session)
+        return session
+
+    def end(self, session_id):
+        """Drop a session; returns it, or None if unknown"""
+        with self._lock:
+            return self._sessions.pop(session_id, None)
+
+    def purge_expired(self):
+        """
+        Drop idle sessions, and loaded banks beyond MAX_LOADED_BANKS that only they used
+        (at most once every PURGE_INTERVAL seconds)
+        """
+        now = time.time()
+        if now - self._last_purge < PURGE_INTERVAL:
+            return
+        cutoff = now - self.session_ttl
+        with self._lock:
+            self._last_purge = now
+            for session_id in [sid for sid, s in self._sessions.items() if s.last_used < cutoff]:
+                del self._sessions[session_id]
+            self._evict_banks()
+
+    def stats(self):
+        """Active sessions and loaded bank versions, for /health"""
+        with self._lock:
+            return {
+                'activeSessions': len(self._sessions),
+                'loadedVersions': sorted(self._banks)
+            }
+
+    def _advance(self, session):
+        """Apply the stopping rules, otherwise pick the next item (session lock held)"""
+        if session.max_items is not None and len(session.responses) >= session.max_items:
+            session.finished = 'maxItems'
+        elif session.se_target is not None and session.responses and \
+                session.standard_error <= session.se_target:
+            session.finished = 'seTarget'
+        else:
+            session.pending = self._select(session)
+            if session.pending is None:
+                session.finished = 'bankExhausted'
+            else:
+                session.seen.add(session.pending)
+                with self._selection_lock:
+                    session.bank.exposure_counts[session.pending] += 1
+
+    def _select(self, session):
+        """Next item index: content group first, then randomesque maximum information"""
+        bank = session.bank
+        grid_index = bank.grid_index(session.theta)
+
+        if session.content_targets:
+            administered = max(len(session.responses), 1)
+            deficits = sorted(session.content_targets.items(),
+                              key=lambda target: session.group_counts.get(target[0], 0) / administered - target[1])
+            rows = [bank.group_order[group][grid_index] for group, _ in deficits]
+        else:
+            rows = [bank.order[grid_index]]
+
+        # Over-exposed items are only used when nothing else is left
+        limits = [None]
+        if bank.sessions_started >= MIN_EXPOSURE_SESSIONS:
+            limits.insert(0, self.max_exposure * bank.sessions_started)
+
+        for exposure_limit in limits:
+            for row in rows:
+                candidates = self._eligible_head(row, session.seen, bank.exposure_counts, exposure_limit)
+                if candidates:
+                    with self._selection_lock:
+                        return candidates[int(self._rng.integers(len(candidates)))]
+        return None
+
+    def _eligible_head(self, row, seen, exposure_counts, exposure_limit):
+        """Up to randomesque unseen, not over-exposed items from the head of a sorted row"""
+        candidates = []
+        for start in range(0, len(row), _WALK_CHUNK):
+            chunk = row[start:start + _WALK_CHUNK]
+            if exposure_limit is not None:
+                chunk = chunk[exposure_counts[chunk] < exposure_limit]
+            candidates.extend(item for item in chunk.tolist() if item not in seen)
+            if len(candidates) >= self.randomesque:
+                return candidates[:self.randomesque]
+        return candidates
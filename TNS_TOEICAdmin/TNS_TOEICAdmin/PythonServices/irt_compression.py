@@ -0,0 +1,230 @@
+import io
+import json
+import zlib
+
+from werkzeug.exceptions import BadRequest, RequestEntityTooLarge
+
+# Compressed bytes pulled from the socket per decompression step
+READ_CHUNK_SIZE = 64 * 1024
+
+# Response codings in order of preference (zstd only when zstandard is installed)
+RESPONSE_ENCODINGS = ('zstd', 'gzip')
+
+# Responses smaller than this are sent as they are (the headers would eat the saving)
+MIN_COMPRESS_BYTES = 1024
+
+# Fast levels: bodies are GUID-heavy JSON, where higher levels buy little
+GZIP_LEVEL = 5
+ZSTD_LEVEL = 3
+
+COMPRESSIBLE_MIMETYPES = ('application/json', 'text/plain', 'application/x-ndjson')
+
+
+class ContentDecodingError(BadRequest):
+    """A Content-Encoding'd request body that does not decompress"""
+
+
+class DecodedBodyTooLarge(RequestEntityTooLarge):
+    """A compressed request body that inflates beyond the configured limit"""
+
+
+def _import_zstandard():
+    """zstandard is optional: only zstd request / response bodies need it"""
+    try:
+        import zstandard
+    except ImportError:
+        raise ImportError("zstd needs the zstandard package (pip install zstandard)")
+    return zstandard
+
+
+def zstd_available():
+    try:
+        _import_zstandard()
+    except ImportError:
+        return False
+    return True
+
+
+def supported_encodings():
+    """Content codings this process can decode and encode"""
+    return [encoding for encoding in RESPONSE_ENCODINGS if encoding != 'zstd' or zstd_available()]
+
+
+def _decompressor(encoding):
+    """Incremental decompressor exposing decompress(), eof and unused_data"""
+    if encoding == 'gzip':
+        return zlib.decompressobj(16 + zlib.MAX_WBITS)
+    return _import_zstandard().ZstdDecompressor().decompressobj()
+
+
+class DecodingReader(io.RawIOBase):
+    """
+    File-like view of a gzip / zstd request body, decompressed as it is read
+
+    Concatenated gzip members / zstd frames are decoded one after the other. Counts the
+    compressed (wire) and decoded bytes for /metrics.
+    """
+
+    def __init__(self, raw, encoding, content_length, max_bytes):
+        """
+        Args:
+            raw: WSGI input stream
+            encoding: "gzip" or "zstd"
+            content_length: Compressed body size, or None to read until EOF (chunked)
+            max_bytes: Decoded size above which DecodedBodyTooLarge is raised
+        """
+        self.raw = raw
+        self.encoding = encoding
+        self.remaining = content_length
+        self.max_bytes = max_bytes
+        self.wire_bytes = 0
+        self.decoded_bytes = 0
+        self._decompressor = _decompressor(encoding)
+        self._pending = bytearray()
+        self._finished = False
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        while not self._pending and not self._finished:
+            self._fill()
+        size = min(len(buffer), len(self._pending))
+        buffer[:size] = self._pending[:size]
+        del self._pending[:size]
+        return size
+
+    def _fill(self):
+        """Decompress the next chunk of the raw body into the pending buffer"""
+        to_read = READ_CHUNK_SIZE if self.remaining is None else min(READ_CHUNK_SIZE, self.remaining)
+        chunk = self.raw.read(to_read) if to_read > 0 else b''
+        if not chunk:
+            if self.wire_bytes and not self._decompressor.eof:
+                raise ContentDecodingError(f"Truncated {self.encoding} request body")
+            self._finished = True
+            return
+
+        self.wire_bytes += len(chunk)
+        if self.remaining is not None:
+            self.remaining -= len(chunk)
+
+        while chunk:
+            # A finished gzip member / zstd frame: the next one starts here
+            if self._decompressor.eof:
+                self._decompressor = _decompressor(self.encoding)
+            try:
+                decoded = self._decompressor.decompress(chunk)
+            except Exception as e:
+                raise ContentDecodingError(f"Malformed {self.encoding} request body: {e}")
+            self.decoded_bytes += len(decoded)
+            if self.decoded_bytes > self.max_bytes:
+                raise DecodedBodyTooLarge(
+                    f"Request body inflates beyond {self.max_bytes // 2 ** 20} MB")
+            self._pending += decoded
+            chunk = self._decompressor.unused_data if self._decompressor.eof else b''
+
+
+class DecompressingMiddleware:
+    """
+    WSGI middleware decoding gzip / zstd request bodies (Content-Encoding) on the fly
+
+    The application sees the decoded body as a terminated stream of unknown length, so
+    request.get_json / get_data / stream work unchanged and NDJSON bodies are parsed
+    while they are still being decompressed.
+    """
+
+    def __init__(self, app, max_decoded_bytes, on_decoded=None):
+        """
+        Args:
+            app: WSGI application
+            max_decoded_bytes: Largest decoded body accepted
+            on_decoded: Optional callable(encoding, wire_bytes, decoded_bytes) per request
+        """
+        self.app = app
+        self.max_decoded_bytes = max_decoded_bytes
+        self.on_decoded = on_decoded
+
+    def __call__(self, environ, start_response):
+        encoding = environ.get('HTTP_CONTENT_ENCODING', '').strip().lower()
+        if encoding in ('', 'identity'):
+            return self.app(environ, start_response)
+
+        if encoding == 'x-gzip':
+            encoding = 'gzip'
+        if encoding not in supported_encodings():
+            return self._unsupported(encoding, start_response)
+
+        content_length = environ.get('CONTENT_LENGTH')
+        if content_length:
+            content_length = int(content_length)
+        elif environ.get('wsgi.input_terminated'):
+            content_length = None
+        else:
+            content_length = 0
+
+        reader = DecodingReader(environ['wsgi.input'], encoding, content_length, self.max_decoded_bytes)
+        environ['wsgi.input'] = io.BufferedReader(reader, READ_CHUNK_SIZE)
+        environ['wsgi.input_terminated'] = True
+        environ.pop('CONTENT_LENGTH', None)
+        environ.pop('HTTP_CONTENT_ENCODING', None)
+
+        try:
+            return self.app(environ, start_response)
+        finally:
+            if self.on_decoded is not None and reader.wire_bytes:
+                self.on_decoded(encoding, reader.wire_bytes, reader.decoded_bytes)
+
+    @staticmethod
+    def _unsupported(encoding, start_response):
+        body = json.dumps({
+            "error": "Unsupported Content-Encoding",
+            "message": f"'{encoding}' is not supported; use one of {supported_encodings()}"
+        }).encode()
+        start_response('415 UNSUPPORTED MEDIA TYPE', [
+            ('Content-Type', 'application/json'),
+            ('Content-Length', str(len(body))),
+            ('Accept-Encoding', ', '.join(supported_encodings()))
+        ])
+        return [body]
+
+
+def compress_response(request, response, on_encoded=None):
+    """
+    Compress a buffered JSON / text response with the client's preferred coding
+
+    Streamed, already-encoded, small and non-text responses are returned unchanged.
+
+    Args:
+        request: Flask request (its Accept-Encoding header is negotiated)
+        response: Flask response
+        on_encoded: Optional callable(encoding, wire_bytes, decoded_bytes)
+
+    Returns:
+        the response, compressed in place when negotiated
+    """
+    if response.direct_passthrough or response.is_streamed or \
+            response.mimetype not in COMPRESSIBLE_MIMETYPES:
+        return response
+    response.vary.add('Accept-Encoding')
+
+    if 'Content-Encoding' in response.headers or not (200 <= response.status_code < 300):
+        return response
+    encoding = request.accept_encodings.best_match(supported_encodings())
+    if encoding is None:
+        return response
+
+    data = response.get_data()
+    if len(data) < MIN_COMPRESS_BYTES:
+        return response
+
+    if encoding == 'zstd':
+        compressed = _import_zstandard().ZstdCompressor(level=ZSTD_LEVEL).compress(data)
+    else:
+        compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+        compressed = compressor.compress(data) + compressor.flush()
+
+    response.set_data(compressed)
+    response.headers['Content-Encoding'] = encoding
+    if on_encoded is not None:
+        on_encoded(encoding, len(compressed), len(data))
+    return response
@@ -0,0 +1,635 @@
+import io
+import json
+from array import array
+from itertools import islice
+
+import numpy as np
+import pandas as pd
+
+# NDJSON lines decoded per batch by ResponseSet.from_ndjson
+NDJSON_CHUNK_SIZE = 8192
+
+# Columns of a columnar (Arrow IPC / Parquet / NPZ) response upload
+RESPONSE_COLUMNS = ('memberKey', 'questionKey', 'isCorrect')
+
+# Content-Type of each columnar /analyze body -> format name for ResponseSet.from_columnar
+COLUMNAR_CONTENT_TYPES = {
+    'application/vnd.apache.arrow.stream': 'arrow',
+    'application/vnd.apache.parquet': 'parquet',
+    'application/x-parquet': 'parquet',
+    'application/x-npz': 'npz'
+}
+
+
+class ResponseSet:
+    """
+    Columnar, integer-coded response data for the Full IRT service
+
+    GUID member/question keys are interned once into int32 codes; every later
+    stage (filtering, matrix scatter, ability aggregation) works on NumPy arrays.
+
+    Attributes:
+        member_codes: int32 array (n_obs,) indexing into member_keys
+        item_codes: int32 array (n_obs,) indexing into item_keys
+        responses: int8 array (n_obs,) with values 0/1
+        member_keys: object array of distinct memberKey values (first-seen order)
+        item_keys: object array of distinct questionKey values (first-seen order)
+        group_codes: int32 array (n_obs,) indexing into group_keys, or None when the
+            upload has no grouping column (see split_groups)
+        group_keys: object array of distinct group values, or None
+    """
+
+    def __init__(self, member_codes, item_codes, responses, member_keys, item_keys,
+                 group_codes=None, group_keys=None):
+        self.member_codes = np.asarray(member_codes, dtype=np.int32)
+        self.item_codes = np.asarray(item_codes, dtype=np.int32)
+        self.responses = np.asarray(responses, dtype=np.int8)
+        self.member_keys = np.asarray(member_keys, dtype=object)
+        self.item_keys = np.asarray(item_keys, dtype=object)
+        self.group_codes = None if group_codes is None else np.asarray(group_codes, dtype=np.int32)
+        self.group_keys = None if group_keys is None else np.asarray(group_keys, dtype=object)
+        self._attempt_codes = None
+
+    @classmethod
+    def from_records(cls, records, group_by=None):
+        """
+        Encode a list of {"memberKey", "questionKey", "isCorrect"} dicts
+
+        Args:
+            records: list of response dicts as posted to /analyze
+            group_by: Optional name of a per-response field (e.g. "part") to group by
+
+        Returns:
+            ResponseSet
+
+        Raises:
+            ValueError: if an isCorrect value is not a numeric 0/1, or a record lacks the
+                group_by field
+        """
+        member_codes, member_keys = pd.factorize(
+            pd.Series([r['memberKey'] for r in records], dtype=object).astype(str))
+        item_codes, item_keys = pd.factorize(
+            pd.Series([r['questionKey'] for r in records], dtype=object).astype(str))
+        responses = _check_responses([r['isCorrect'] for r in records])
+
+        group_codes, group_keys = None, None
+        if group_by is not None:
+            try:
+                group_codes, group_keys = pd.factorize(
+                    pd.Series([r[group_by] for r in records], dtype=object).astype(str))
+            except KeyError:
+                raise ValueError(f"every response needs a '{group_by}' field (groupBy)") from None
+
+        return cls(member_codes, item_codes, responses, member_keys, item_keys, group_codes, group_keys)
+
+    @classmethod
+    def from_ndjson(cls, lines, chunk_size=NDJSON_CHUNK_SIZE, group_by=None):
+        """
+        Encode NDJSON responses, one {"memberKey", "questionKey", "isCorrect"} object per line
+
+        Lines are parsed chunk_size at a time and only their integer codes are kept, so
+        memory grows with the encoded arrays and the distinct keys, not with the JSON text.
+
+        Args:
+            lines: iterable of str/bytes lines (e.g. a request stream); blank lines are skipped
+            chunk_size: Lines decoded per batch
+            group_by: Optional name of a per-response field to group by
+
+        Returns:
+            ResponseSet
+
+        Raises:
+            ValueError: on a malformed line, with its 1-based line number
+        """
+        builder = ResponseSetBuilder(group_by)
+        lines = iter(lines)
+        first_line = 1
+
+        while True:
+            chunk = list(islice(lines, chunk_size))
+            if not chunk:
+                break
+            try:
+                builder.extend_json(chunk)
+            except (ValueError, KeyError, TypeError):
+                # Replay the chunk line by line to report the offending line
+                for line_number, line in enumerate(chunk, start=first_line):
+                    if not line.strip():
+                        continue
+                    try:
+                        record = json.loads(line)
+                        builder.add(record['memberKey'], record['questionKey'], record['isCorrect'],
+                                    record[group_by] if group_by is not None else None)
+                    except KeyError as e:
+                        raise ValueError(f"line {line_number}: missing field {e}") from None
+                    except (ValueError, TypeError) as e:
+                        raise ValueError(f"line {line_number}: {e}") from None
+            first_line += len(chunk)
+
+        return builder.build()
+
+    @classmethod
+    def from_columnar(cls, data, fmt, group_by=None):
+        """
+        Decode a columnar upload with memberKey, questionKey and isCorrect columns
+
+        Args:
+            data: body bytes
+            fmt: "arrow" (IPC stream), "parquet" or "npz" (see COLUMNAR_CONTENT_TYPES)
+            group_by: Optional name of an extra column to group by
+
+        Returns:
+            ResponseSet
+
+        Raises:
+            ValueError: unreadable body, missing columns, nulls or non-0/1 isCorrect
+            ImportError: pyarrow is not installed (Arrow / Parquet only)
+        """
+        if fmt == 'npz':
+            return cls.from_npz(data, group_by)
+
+        pa = _import_pyarrow()
+        try:
+            if fmt == 'arrow':
+                table = pa.ipc.open_stream(pa.py_buffer(data)).read_all()
+            else:
+                import pyarrow.parquet as pq
+                # Keys come back dictionary-encoded, so strings are never materialised per row
+                key_columns = [*RESPONSE_COLUMNS[:2], *([group_by] if group_by is not None else [])]
+                table = pq.read_table(pa.BufferReader(data), columns=[*RESPONSE_COLUMNS, *key_columns[2:]],
+                                      read_dictionary=key_columns)
+        except (pa.ArrowInvalid, OSError) as e:
+            raise ValueError(f"unreadable {fmt} body: {e}") from None
+        return cls.from_arrow(table, group_by)
+
+    @classmethod
+    def from_arrow(cls, table, group_by=None):
+        """
+        Encode a pyarrow Table; key columns may be plain or dictionary-encoded
+
+        Buffers are used in place where possible: a dictionary column's indices become
+        the codes directly, plain columns are hashed once by Arrow's dictionary_encode.
+        """
+        columns = [*RESPONSE_COLUMNS, *([group_by] if group_by is not None else [])]
+        missing = [name for name in columns if name not in table.column_names]
+        if missing:
+            raise ValueError(f"missing column(s): {missing}")
+
+        null_columns = [name for name in columns if table.column(name).null_count]
+        if null_columns:
+            raise ValueError(f"null values in column(s): {null_columns}")
+
+        if table.num_rows == 0:
+            empty_groups = [] if group_by is not None else None
+            return cls([], [], [], [], [], empty_groups, empty_groups)
+
+        pa = _import_pyarrow()
+        import pyarrow.compute as pc
+
+        def codes_and_keys(column):
+            if not pa.types.is_dictionary(column.type):
+                column = pc.dictionary_encode(column)
+            # Chunks may carry different dictionaries; combining unifies them
+            combined = column.combine_chunks()
+            keys = combined.dictionary.cast(pa.string()).to_numpy(zero_copy_only=False)
+            return _compact_codes(combined.indices.to_numpy(zero_copy_only=False), keys)
+
+        member_codes, member_keys = codes_and_keys(table.column('memberKey'))
+        item_codes, item_keys = codes_and_keys(table.column('questionKey'))
+
+        is_correct = table.column('isCorrect')
+        if pa.types.is_boolean(is_correct.type):
+            is_correct = is_correct.cast(pa.int8())
+        responses = _check_responses(is_correct.to_numpy())
+
+        group_codes, group_keys = None, None
+        if group_by is not None:
+            group_codes, group_keys = codes_and_keys(table.column(group_by))
+
+        return cls(member_codes, item_codes, responses, member_keys, item_keys, group_codes, group_keys)
+
+    @classmethod
+    def from_npz(cls, data, group_by=None):
+        """
+        Encode an .npz archive of three equal-length arrays named after RESPONSE_COLUMNS
+        (plus a group_by array when given)
+
+        Keys may be integer, unicode or bytes (S, e.g. ASCII GUIDs) arrays; object
+        arrays (pickles) are refused.
+        """
+        columns = [*RESPONSE_COLUMNS, *([group_by] if group_by is not None else [])]
+        # np.load falls back to unpickling anything that is not a zip archive
+        if not data.startswith(b'PK'):
+            raise ValueError("unreadable npz body: not an .npz (zip) archive")
+        try:
+            with np.load(io.BytesIO(data), allow_pickle=False) as archive:
+                missing = [name for name in columns if name not in archive.files]
+                if missing:
+                    raise ValueError(f"missing array(s): {missing}")
+                arrays = [archive[name] for name in columns]
+        except (OSError, EOFError) as e:
+            raise ValueError(f"unreadable npz body: {e}") from None
+
+        if len({len(values) for values in arrays}) > 1:
+            raise ValueError(f"{', '.join(columns)} must have the same length")
+
+        member_codes, member_keys = _factorize_array(arrays[0])
+        item_codes, item_keys = _factorize_array(arrays[1])
+        responses = _check_responses(arrays[2])
+
+        group_codes, group_keys = None, None
+        if group_by is not None:
+            group_codes, group_keys = _factorize_array(arrays[3])
+
+        return cls(member_codes, item_codes, responses, member_keys, item_keys, group_codes, group_keys)
+
+    def __len__(self):
+        return len(self.responses)
+
+    @property
+    def n_members(self):
+        return len(self.member_keys)
+
+    @property
+    def n_items(self):
+        return len(self.item_keys)
+
+    @property
+    def attempt_codes(self):
+        """
+        0-based attempt number of each response within its (member, item) pair
+
+        Equivalent to groupby(['subject_id', 'item_id']).cumcount() in input order.
+        """
+        if self._attempt_codes is None:
+            pair = self.member_codes.astype(np.int64) * self.n_items + self.item_codes
+            order = np.argsort(pair, kind='stable')
+            sorted_pair = pair[order]
+
+            # Position of each row inside its run of identical pairs
+            run_start = np.r_[True, sorted_pair[1:] != sorted_pair[:-1]]
+            run_index = np.flatnonzero(run_start)
+            positions = np.arange(len(pair)) - np.repeat(run_index, np.diff(np.r_[run_index, len(pair)]))
+
+            attempts = np.empty(len(pair), dtype=np.int32)
+            attempts[order] = positions
+            self._attempt_codes = attempts
+        return self._attempt_codes
+
+    def item_counts(self):
+        """Number of responses (including retakes) per item code"""
+        return np.bincount(self.item_codes, minlength=self.n_items)
+
+    def split_groups(self):
+        """
+        One independent ResponseSet per group, with member/item codes re-coded per subset
+
+        Every question must belong to exactly one group, so the groups share no item
+        parameters and can be calibrated separately.
+
+        Returns:
+            list of (group_key, ResponseSet) in group_keys order
+
+        Raises:
+            ValueError: if the set has no group column or a question spans several groups
+        """
+        if self.group_codes is None:
+            raise ValueError("responses were not encoded with a group column")
+
+        n_groups = len(self.group_keys)
+        pairs = np.unique(self.item_codes.astype(np.int64) * n_groups + self.group_codes)
+        pair_items = pairs // n_groups
+        shared = pair_items[1:][pair_items[1:] == pair_items[:-1]]
+        if len(shared):
+            item = shared[0]
+            groups = self.group_keys[pairs[pair_items == item] % n_groups]
+            raise ValueError(f"questionKey '{self.item_keys[item]}' appears in more than one group: "
+                             f"{[str(group) for group in groups]}")
+
+        order = np.argsort(self.group_codes, kind='stable')
+        bounds = np.r_[0, np.cumsum(np.bincount(self.group_codes, minlength=n_groups))]
+
+        subsets = []
+        for group, group_key in enumerate(self.group_keys):
+            rows = order[bounds[group]:bounds[group + 1]]
+            member_codes, member_keys = _compact_codes(self.member_codes[rows], self.member_keys)
+            item_codes, item_keys = _compact_codes(self.item_codes[rows], self.item_keys)
+            subsets.append((str(group_key), ResponseSet(
+                member_codes, item_codes, self.responses[rows], member_keys, item_keys)))
+        return subsets
+
+
+def _import_pyarrow():
+    """pyarrow is optional: only Arrow IPC and Parquet uploads need it"""
+    try:
+        import pyarrow
+    except ImportError:
+        raise ImportError("pyarrow is required for Arrow IPC / Parquet bodies (pip install pyarrow)") from None
+    return pyarrow
+
+
+def _compact_codes(codes, keys):
+    """
+    int32 codes over distinct, used keys: merges duplicate dictionary entries and
+    drops unreferenced ones (both are legal in an Arrow dictionary)
+    """
+    key_codes, unique_keys = pd.factorize(np.asarray(keys, dtype=object))
+    if len(unique_keys) != len(keys):
+        codes = key_codes[codes]
+
+    used = np.bincount(codes, minlength=len(unique_keys)) > 0
+    if not used.all():
+        codes = (np.cumsum(used) - 1)[codes]
+        unique_keys = unique_keys[used]
+
+    return codes.astype(np.int32, copy=False), np.asarray(unique_keys, dtype=object)
+
+
+def _factorize_array(values):
+    """
+    Codes and str keys of an integer, unicode or UTF-8 bytes (S) key array; bytes
+    are hashed as-is and only the distinct keys are decoded
+    """
+    if values.dtype.kind not in 'iuUS':
+        raise ValueError(f"key arrays must be integer or string, got dtype {values.dtype}")
+    codes, uniques = pd.factorize(values)
+    uniques = np.asarray(uniques)
+    if values.dtype.kind == 'S':
+        uniques = np.array([key.decode('utf-8') for key in uniques], dtype=object)
+    return codes, uniques.astype(str).astype(object)
+
+
+def _check_responses(values):
+    """isCorrect column as int8, which must hold only 0/1"""
+    values = np.asarray(values)
+    if values.dtype.kind not in 'biuf' or not np.isin(values, (0, 1)).all():
+        raise ValueError("isCorrect must be 0 or 1")
+    return values.astype(np.int8, copy=False)
+
+
+class ResponseSetBuilder:
+    """
+    Incremental ResponseSet encoder
+
+    Keys are interned into int32 codes as responses arrive (first-seen order, as
+    pd.factorize in from_records) and appended to compact typed buffers.
+    """
+
+    def __init__(self, group_by=None):
+        """
+        Args:
+            group_by: Optional name of a per-response field to group by (see split_groups)
+        """
+        self.group_by = group_by
+        self._member_codes = array('i')
+        self._item_codes = array('i')
+        self._group_codes = array('i')
+        self._responses = array('b')
+        self._member_index = {}
+        self._item_index = {}
+        self._group_index = {}
+
+    def add(self, member_key, item_key, is_correct, group_key=None):
+        """
+        Append one response (group_key is required when the builder groups)
+
+        Raises:
+            ValueError: if is_correct is not a numeric 0/1 (same rule as extend_json)
+        """
+        try:
+            is_correct = int(_check_responses([is_correct])[0])
+        except ValueError:
+            raise ValueError(f"isCorrect must be 0 or 1, got {is_correct!r}") from None
+
+        member_key, item_key = str(member_key), str(item_key)
+        self._member_codes.append(self._member_index.setdefault(member_key, len(self._member_index)))
+        self._item_codes.append(self._item_index.setdefault(item_key, len(self._item_index)))
+        if self.group_by is not None:
+            self._group_codes.append(self._group_index.setdefault(str(group_key), len(self._group_index)))
+        self._responses.append(is_correct)
+
+    def extend_json(self, lines):
+        """
+        Append a batch of NDJSON lines (decoded together, keys interned per batch)
+
+        Nothing is appended unless every line in the batch is valid.
+
+        Raises:
+            ValueError, KeyError, TypeError: if any line is malformed
+        """
+        lines = [line for line in lines if line.strip()]
+        if not lines:
+            return
+        if isinstance(lines[0], str):
+            records = json.loads('[' + ','.join(lines) + ']')
+        else:
+            records = json.loads(b'[' + b','.join(lines) + b']')
+
+        # A line holding "{...},{...}" would otherwise pass as two records
+        if len(records) != len(lines):
+            raise ValueError("expected exactly one JSON object per line")
+
+        responses = _check_responses([r['isCorrect'] for r in records])
+        group_keys = [r[self.group_by] for r in records] if self.group_by is not None else None
+        member_codes = self._intern([r['memberKey'] for r in records], self._member_index)
+        item_codes = self._intern([r['questionKey'] for r in records], self._item_index)
+
+        self._member_codes.frombytes(member_codes.tobytes())
+        self._item_codes.frombytes(item_codes.tobytes())
+        if group_keys is not None:
+            self._group_codes.frombytes(self._intern(group_keys, self._group_index).tobytes())
+        self._responses.frombytes(responses.tobytes())
+
+    @staticmethod
+    def _intern(keys, index):
+        """int32 codes of keys, adding unseen keys to index in first-seen order"""
+        return np.fromiter((index.setdefault(key, len(index)) for key in map(str, keys)),
+                           dtype=np.int32, count=len(keys))
+
+    def __len__(self):
+        return len(self._responses)
+
+    def build(self):
+        """ResponseSet over the responses added so far"""
+        grouped = self.group_by is not None
+        return ResponseSet(
+            np.frombuffer(self._member_codes, dtype=np.int32),
+            np.frombuffer(self._item_codes, dtype=np.int32),
+            np.frombuffer(self._responses, dtype=np.int8),
+            np.array(list(self._member_index), dtype=object),
+            np.array(list(self._item_index), dtype=object),
+            np.frombuffer(self._group_codes, dtype=np.int32) if grouped else None,
+            np.array(list(self._group_index), dtype=object) if grouped else None
+        )
+
+
+class CalibrationData:
+    """
+    Filtered long-format triplets ready for FullIRT3PL
+
+    Subjects are "virtual subjects": one per (member, attempt) integer pair, so a
+    member retaking a question contributes a separate observation row. With
+    pool_attempts, a subject is a real member instead and every attempt is an extra
+    observation of that member's single ability (a member may then answer an item
+    more than once).
+
+    Attributes:
+        subject_idx: int64 array (n_obs,) in [0, n_subjects)
+        item_idx: int64 array (n_obs,) in [0, n_items)
+        responses: float32 array (n_obs,) with values 0/1
+        subject_members: member code of each virtual subject, shape (n_subjects,)
+        item_codes: original item code of each calibrated item, shape (n_items,)
+        n_attempts: number of distinct (member, attempt) pairs in the calibration
+        pooled: True when subjects are real members (pool_attempts)
+    """
+
+    def __init__(self, subject_idx, item_idx, responses, subject_members, item_codes,
+                 member_keys, item_keys, total_responses, n_attempts=None, pooled=False):
+        self.subject_idx = subject_idx
+        self.item_idx = item_idx
+        self.responses = responses
+        self.subject_members = subject_members
+        self.item_codes = item_codes
+        self.member_keys = member_keys
+        self.item_keys = item_keys
+        self.total_responses = total_responses
+        self.n_attempts = len(subject_members) if n_attempts is None else n_attempts
+        self.pooled = pooled
+
+    @classmethod
+    def build(cls, response_set, item_mask, min_subject_fraction=0.1, min_item_fraction=0.05,
+              pool_attempts=False):
+        """
+        Select responses, encode virtual subjects and apply the minimum-count filters
+
+        Args:
+            response_set: ResponseSet
+            item_mask: boolean array (n_items,) of items eligible for calibration
+            min_subject_fraction: a virtual subject needs >= max(2, fraction * n_items) responses
+            min_item_fraction: an item needs >= max(2, fraction * n_subjects) responses
+            pool_attempts: one subject per real member instead of per (member, attempt)
+
+        Returns:
+            CalibrationData
+        """
+        rows = item_mask[response_set.item_codes]
+        member_codes = response_set.member_codes[rows]
+        item_codes = response_set.item_codes[rows]
+        attempts = response_set.attempt_codes[rows]
+        responses = response_set.responses[rows]
+
+        # Virtual subject = (member code, attempt number) packed into one integer
+        stride = np.int64(attempts.max()) + 1 if len(attempts) else 1
+        attempt_pairs = member_codes.astype(np.int64) * stride + attempts
+        if pool_attempts:
+            # One subject per real member: retakes are extra observations of the same θ
+            subject_codes, subject_uniques = pd.factorize(member_codes)
+            subject_members = np.asarray(subject_uniques, dtype=np.int32)
+        else:
+            subject_codes, subject_pairs = pd.factorize(attempt_pairs)
+            subject_members = (subject_pairs // stride).astype(np.int32)
+        item_codes_local, item_uniques = pd.factorize(item_codes)
+        n_subjects, n_items = len(subject_members), len(item_uniques)
+
+        # Filter subjects with minimum responses
+        min_responses = max(2, int(n_items * min_subject_fraction))
+        valid_subject_mask = np.bincount(subject_codes, minlength=n_subjects) >= min_responses
+        keep = valid_subject_mask[subject_codes]
+
+        # Filter items with minimum responses (counted over the surviving subjects)
+        n_valid_subjects = int(valid_subject_mask.sum())
+        min_item_responses = max(2, int(n_valid_subjects * min_item_fraction))
+        valid_item_mask = np.bincount(item_codes_local[keep], minlength=n_items) >= min_item_responses
+        keep &= valid_item_mask[item_codes_local]
+
+        # Re-index the surviving subjects/items to contiguous codes
+        subject_remap = np.cumsum(valid_subject_mask) - 1
+        item_remap = np.cumsum(valid_item_mask) - 1
+
+        return cls(
+            subject_idx=subject_remap[subject_codes[keep]].astype(np.int64),
+            item_idx=item_remap[item_codes_local[keep]].astype(np.int64),
+            responses=responses[keep].astype(np.float32),
+            subject_members=subject_members[valid_subject_mask],
+            item_codes=np.asarray(item_uniques, dtype=np.int32)[valid_item_mask],
+            member_keys=response_set.member_keys,
+            item_keys=response_set.item_keys,
+            total_responses=int(rows.sum()),
+            n_attempts=len(np.unique(attempt_pairs[keep])) if pool_attempts else int(valid_subject_mask.sum()),
+            pooled=pool_attempts
+        )
+
+    @property
+    def n_subjects(self):
+        return len(self.subject_members)
+
+    @property
+    def n_items(self):
+        return len(self.item_codes)
+
+    @property
+    def n_members(self):
+        return len(np.unique(self.subject_members))
+
+    def to_dense(self, impute=True):
+        """
+        Scatter the triplets into a (n_subjects, n_items) float64 matrix
+
+        Args:
+            impute: fill missing cells (-1) with the item's rounded mean response
+
+        Returns:
+            numpy array of shape (n_subjects, n_items)
+
+        Raises:
+            ValueError: for pooled (one subject per member) data
+        """
+        if self.pooled:
+            raise ValueError("pooled subjects can answer an item more than once; use the triplets")
+
+        matrix = np.full((self.n_subjects, self.n_items), -1.0)
+        matrix[self.subject_idx, self.item_idx] = self.responses
+
+        if impute:
+            counts = np.bincount(self.item_idx, minlength=self.n_items)
+            sums = np.bincount(self.item_idx, weights=self.responses, minlength=self.n_items)
+            fill_values = np.round(sums / np.maximum(counts, 1))
+            missing_rows, missing_cols = np.nonzero(matrix < 0)
+            matrix[missing_rows, missing_cols] = fill_values[missing_cols]
+
+        return matrix
+
+    def item_key_list(self):
+        """questionKey of each calibrated item, in item_idx order"""
+        return self.item_keys[self.item_codes]
+
+    def member_means(self, subject_values):
+        """
+        Average a per-virtual-subject quantity back to real members
+
+        Args:
+            subject_values: array (n_subjects,) aligned with subject_idx
+
+        Returns:
+            (member_keys, means): keys of members with at least one subject, and their means
+        """
+        values = np.asarray(subject_values, dtype=np.float64)
+        n_member_codes = len(self.member_keys)
+        counts = np.bincount(self.subject_members, minlength=n_member_codes)
+        sums = np.bincount(self.subject_members, weights=values, minlength=n_member_codes)
+        present = np.flatnonzero(counts)
+
+        return self.member_keys[present], sums[present] / counts[present]
+
+    def member_abilities(self, subject_abilities):
+        """
+        Average virtual-subject abilities back to real members
+
+        Args:
+            subject_abilities: array (n_subjects,) of theta per virtual subject
+
+        Returns:
+            dict of memberKey -> mean theta across that member's attempts
+        """
+        keys, means = self.member_means(subject_abilities)
+        return {str(key): float(value) for key, value in zip(keys, means)}
@@ -0,0 +1,204 @@
+import multiprocessing
+import threading
+import time
+import uuid
+from datetime import datetime
+
+
+class ProgressReporter:
+    """
+    Picklable progress callback handed to a calibration (possibly in a worker process)
+
+    Publishes {epoch, maxIter, loss} into a shared mapping, at most every min_interval
+    seconds, so a status request can report how far the fit has got.
+    """
+
+    def __init__(self, shared, job_id, min_interval=0.5):
+        self.shared = shared
+        self.job_id = job_id
+        self.min_interval = min_interval
+        self._started = None
+        self._last = 0.0
+        self._pending = None
+
+    def __call__(self, epoch, loss, max_iter):
+        now = time.time()
+        if self._started is None:
+            self._started = now
+        self._pending = {
+            'epoch': epoch + 1,
+            'maxIter': max_iter,
+            'loss': float(loss),
+            'startedAt': self._started,
+            'updatedAt': now
+        }
+        if now - self._last >= self.min_interval or epoch + 1 >= max_iter:
+            self.flush()
+
+    def flush(self):
+        """Publish the latest progress (e.g. the final epoch after early convergence)"""
+        if self._pending is not None:
+            self.shared[self.job_id] = self._pending
+            self._last = self._pending['updatedAt']
+            self._pending = None
+
+
+class JobManager:
+    """
+    In-memory registry of asynchronous calibration jobs
+
+    A job wraps the Future of a calibration submitted to the fit executor. Progress comes
+    from ProgressReporter through a shared mapping (a multiprocessing Manager dict when
+    fits run in worker processes). Finished jobs are kept for retention_seconds.
+    """
+
+    def __init__(self, retention_seconds, use_processes):
+        """
+        Args:
+            retention_seconds: How long results stay retrievable after a job finishes
+            use_processes: True when calibrations run in worker processes
+        """
+        self.retention_seconds = retention_seconds
+        self.use_processes = use_processes
+        self._jobs = {}
+        self._lock = threading.Lock()
+        self._manager = None
+        self._progress = None
+
+    def _shared_progress(self):
+        if self._progress is None:
+            if self.use_processes:
+                self._manager = multiprocessing.get_context('spawn').Manager()
+                self._progress = self._manager.dict()
+            else:
+                self._progress = {}
+        return self._progress
+
+    def submit(self, start, description):
+        """
+        Register a job and start it
+
+        Args:
+            start: callable(progress_reporter) -> Future running the calibration
+            description: JSON-serialisable summary stored with the job (engine, sizes, ...)
+
+        Returns:
+            job id (str)
+
+        Raises:
+            whatever start raises; the job is dropped, not left queued
+        """
+        self.purge_expired()
+        job_id = uuid.uuid4().hex
+
+        with self._lock:
+            reporter = ProgressReporter(self._shared_progress(), job_id)
+            job = {
+                'id': job_id,
+                'description': description,
+                'submitted': time.time(),
+                'finished': None,
+                'future': None,
+                'result': None
+            }
+            self._jobs[job_id] = job
+
+        try:
+            future = start(reporter)
+        except Exception:
+            with self._lock:
+                self._jobs.pop(job_id, None)
+            raise
+        job['future'] = future
+        future.add_done_callback(lambda done: self._finish(job_id, done))
+        return job_id
+
+    def _finish(self, job_id, future):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return
+            job['finished'] = time.time()
+            try:
+                job['result'] = future.result()
+            except Exception as e:
+                job['result'] = ({"error": str(e)}, 500)
+
+    def status(self, job_id):
+        """
+        Job state with epoch, current loss (negative ELBO) and ETA, or None if unknown/expired
+        """
+        self.purge_expired()
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return None
+            progress = self._shared_progress().get(job_id)
+
+            if job['finished'] is not None:
+                state = 'completed' if job['result'][1] == 200 else 'failed'
+            elif progress is not None or (job['future'] is not None and job['future'].running()):
+                state = 'running'
+            else:
+                state = 'queued'
+
+            status = {
+                'jobId': job_id,
+                'status': state,
+                'submittedAt': _iso(job['submitted']),
+                'finishedAt': _iso(job['finished']),
+                'request': job['description']
+            }
+
+            if progress is not None:
+                epoch, max_iter = progress['epoch'], progress['maxIter']
+                elapsed = progress['updatedAt'] - progress['startedAt']
+                status['progress'] = {
+                    'epoch': epoch,
+                    'maxIter': max_iter,
+                    'loss': progress['loss'],
+                    'startedAt': _iso(progress['startedAt'])
+                }
+                if state == 'running':
+                    status['etaSeconds'] = round(elapsed / max(epoch, 1) * (max_iter - epoch), 1)
+
+            if job['finished'] is not None:
+                status['expiresAt'] = _iso(job['finished'] + self.retention_seconds)
+                if state == 'failed':
+                    status['error'] = job['result'][0].get('error')
+
+            return status
+
+    def result(self, job_id):
+        """
+        (body, status_code) of a finished job; None if unknown/expired, False if not finished
+        """
+        self.purge_expired()
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return None
+            if job['finished'] is None:
+                return False
+            return job['result']
+
+    def purge_expired(self):
+        """Drop finished jobs older than the retention period"""
+        cutoff = time.time() - self.retention_seconds
+        with self._lock:
+            expired = [job_id for job_id, job in self._jobs.items()
+                       if job['finished'] is not None and job['finished'] < cutoff]
+            for job_id in expired:
+                del self._jobs[job_id]
+                if self._progress is not None:
+                    self._progress.pop(job_id, None)
+
+    def counts(self):
+        """Number of jobs per state, for /health"""
+        with self._lock:
+            finished = sum(1 for job in self._jobs.values() if job['finished'] is not None)
+        return {'active': len(self._jobs) - finished, 'retained': finished}
+
+
+def _iso(timestamp):
+    return datetime.utcfromtimestamp(timestamp).isoformat() if timestamp is not None else None
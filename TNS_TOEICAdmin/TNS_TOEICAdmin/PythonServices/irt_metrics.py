@@ -0,0 +1,229 @@
+import bisect
+import resource
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+# Histogram buckets: stage / request latency (s), peak RSS (MB), SVI epochs / EM cycles /
+# L-BFGS iterations, and dataset sizes (responses, items, members)
+SECONDS_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+MEGABYTES_BUCKETS = (64, 128, 256, 512, 1024, 2048, 4096, 8192, 16384)
+ITERATION_BUCKETS = (5, 10, 20, 50, 100, 200, 300, 500, 1000)
+SIZE_BUCKETS = (100, 1_000, 10_000, 100_000, 1_000_000, 10_000_000)
+
+_PAGE_SIZE = resource.getpagesize()
+
+
+def current_rss_bytes():
+    """Resident set size of this process (Linux /proc; falls back to the peak elsewhere)"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * _PAGE_SIZE
+    except (OSError, IndexError, ValueError):
+        return peak_rss_bytes()
+
+
+def peak_rss_bytes():
+    """Process high-water mark of the resident set size"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+class StageTimer:
+    """
+    Collects wall-clock time and peak memory per named pipeline stage (parse, encode,
+    filter, fit, ...)
+
+    The peak RSS of a stage is exact when the stage raised the process high-water mark,
+    and otherwise the larger of the RSS at its start and end. The timer is picklable,
+    so it travels with a calibration into a worker process and back.
+    """
+
+    def __init__(self):
+        self.timings = {}
+        self.memory = {}
+
+    @contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        rss_start, peak_start = current_rss_bytes(), peak_rss_bytes()
+        try:
+            yield
+        finally:
+            self.timings[name] = self.timings.get(name, 0.0) + time.perf_counter() - start
+            rss_end, peak_end = current_rss_bytes(), peak_rss_bytes()
+            peak = peak_end if peak_end > peak_start else max(rss_start, rss_end)
+            previous = self.memory.get(name, {'peak': 0, 'delta': 0})
+            self.memory[name] = {'peak': max(previous['peak'], peak),
+                                 'delta': previous['delta'] + rss_end - rss_start}
+
+    def summary(self):
+        """Return {stage: seconds} rounded to milliseconds"""
+        return {name: round(seconds, 3) for name, seconds in self.timings.items()}
+
+    def memory_summary(self):
+        """Return {stage: {"peakRssMb", "rssDeltaMb"}}"""
+        return {
+            name: {'peakRssMb': round(values['peak'] / 2 ** 20, 1),
+                   'rssDeltaMb': round(values['delta'] / 2 ** 20, 1)}
+            for name, values in self.memory.items()
+        }
+
+
+class Histogram:
+    """Prometheus histogram with optional labels (cumulative buckets, sum and count)"""
+
+    def __init__(self, name, documentation, buckets, label_names=()):
+        self.name = name
+        self.documentation = documentation
+        self.buckets = tuple(buckets)
+        self.label_names = tuple(label_names)
+        self._series = {}
+
+    def observe(self, value, **labels):
+        key = tuple(str(labels[name]) for name in self.label_names)
+        series = self._series.setdefault(key, [[0] * (len(self.buckets) + 1), 0.0])
+        series[0][bisect.bisect_left(self.buckets, value)] += 1
+        series[1] += value
+
+    def exposition(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        for key, (counts, total) in sorted(self._series.items()):
+            labels = [f'{name}="{value}"' for name, value in zip(self.label_names, key)]
+            cumulative = 0
+            for bound, count in zip((*self.buckets, '+Inf'), counts):
+                cumulative += count
+                bucket_labels = ','.join([*labels, f'le="{bound}"'])
+                lines.append(f"{self.name}_bucket{{{bucket_labels}}} {cumulative}")
+            suffix = f"{{{','.join(labels)}}}" if labels else ''
+            lines.append(f"{self.name}_sum{suffix} {total}")
+            lines.append(f"{self.name}_count{suffix} {cumulative}")
+        return lines
+
+
+class Counter:
+    """Prometheus counter with optional labels"""
+
+    TYPE = 'counter'
+
+    def __init__(self, name, documentation, label_names=()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self._values = {}
+
+    def inc(self, amount=1, **labels):
+        key = tuple(str(labels[name]) for name in self.label_names)
+        self._values[key] = self._values.get(key, 0) + amount
+
+    def exposition(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.TYPE}"]
+        for key, value in sorted(self._values.items()):
+            labels = ','.join(f'{name}="{label}"' for name, label in zip(self.label_names, key))
+            lines.append(f"{self.name}{{{labels}}} {value}" if labels else f"{self.name} {value}")
+        return lines
+
+
+class Gauge(Counter):
+    """Prometheus gauge with optional labels"""
+
+    TYPE = 'gauge'
+
+    def set(self, value, **labels):
+        self._values[tuple(str(labels[name]) for name in self.label_names)] = value
+
+
+class ServiceMetrics:
+    """
+    Calibration metrics of this process, exported in the Prometheus text format (/metrics)
+
+    Calibrations in worker processes are recorded here, in the serving process, from the
+    stage timings and metadata of their result bodies.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.stage_seconds = Histogram(
+            'irt_stage_seconds', 'Wall time of a calibration pipeline stage', SECONDS_BUCKETS, ('stage',))
+        self.stage_peak_rss = Histogram(
+            'irt_stage_peak_rss_megabytes', 'Peak resident memory during a calibration pipeline stage',
+            MEGABYTES_BUCKETS, ('stage',))
+        self.calibration_seconds = Histogram(
+            'irt_calibration_seconds', 'Wall time of a calibration request', SECONDS_BUCKETS, ('engine',))
+        self.iterations = Histogram(
+            'irt_fit_iterations', 'Epochs / EM cycles / L-BFGS iterations used by a fit',
+            ITERATION_BUCKETS, ('engine',))
+        self.responses = Histogram(
+            'irt_dataset_responses', 'Responses in a calibration dataset', SIZE_BUCKETS)
+        self.questions = Histogram(
+            'irt_dataset_questions', 'Questions calibrated', SIZE_BUCKETS)
+        self.members = Histogram(
+            'irt_dataset_members', 'Members with an estimated ability', SIZE_BUCKETS)
+        self.calibrations = Counter(
+            'irt_calibrations_total', 'Finished calibrations by engine and HTTP status', ('engine', 'status'))
+        self.active_fits = Gauge(
+            'irt_active_calibrations', 'Calibrations queued or running')
+        self.active_fits.set(0)
+        self.wire_bytes = Counter(
+            'irt_compressed_body_bytes_total', 'Compressed request / response body bytes on the wire',
+            ('direction', 'encoding'))
+        self.decoded_bytes = Counter(
+            'irt_uncompressed_body_bytes_total', 'Size of the compressed bodies once decoded',
+            ('direction', 'encoding'))
+        self.saved_bytes = Counter(
+            'irt_compression_saved_bytes_total', 'Bytes not sent thanks to Content-Encoding',
+            ('direction', 'encoding'))
+
+    @contextmanager
+    def track_active(self):
+        """Count a calibration as active for the duration of the block"""
+        self.fit_started()
+        try:
+            yield
+        finally:
+            self.fit_finished()
+
+    def fit_started(self):
+        with self._lock:
+            self.active_fits.inc()
+
+    def fit_finished(self):
+        with self._lock:
+            self.active_fits.inc(-1)
+
+    def record_calibration(self, body, status, engine, seconds):
+        """Observe a finished calibration from its (body, status) result"""
+        with self._lock:
+            self.calibrations.inc(engine=engine, status=status)
+            self.calibration_seconds.observe(seconds, engine=engine)
+            metadata = body.get('metadata') if status == 200 else None
+            if not metadata:
+                return
+
+            cache = metadata.get('cache') or {}
+            if not cache.get('hit'):
+                for stage, stage_seconds in (metadata.get('stageTimings') or {}).items():
+                    self.stage_seconds.observe(stage_seconds, stage=stage)
+                for stage, memory in (metadata.get('stageMemory') or {}).items():
+                    self.stage_peak_rss.observe(memory['peakRssMb'], stage=stage)
+                if metadata.get('iterations') is not None:
+                    self.iterations.observe(metadata['iterations'], engine=engine)
+            self.responses.observe(metadata.get('totalResponses') or 0)
+            self.questions.observe(metadata.get('totalQuestions') or 0)
+            self.members.observe(metadata.get('totalMembers') or 0)
+
+    def record_compression(self, direction, encoding, wire_bytes, decoded_bytes):
+        """Count one compressed request ("request") or response ("response") body"""
+        with self._lock:
+            self.wire_bytes.inc(wire_bytes, direction=direction, encoding=encoding)
+            self.decoded_bytes.inc(decoded_bytes, direction=direction, encoding=encoding)
+            self.saved_bytes.inc(decoded_bytes - wire_bytes, direction=direction, encoding=encoding)
+
+    def exposition(self, extra=()):
+        """Prometheus text format of every metric, plus extra metric objects"""
+        with self._lock:
+            metrics = (self.stage_seconds, self.stage_peak_rss, self.calibration_seconds, self.iterations,
+                       self.responses, self.questions, self.members, self.calibrations, self.active_fits,
+                       self.wire_bytes, self.decoded_bytes, self.saved_bytes, *extra)
+            return '\n'.join(line for metric in metrics for line in metric.exposition()) + '\n'
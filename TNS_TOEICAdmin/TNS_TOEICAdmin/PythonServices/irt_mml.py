@@ -0,0 +1,240 @@
+import logging
+
+import numpy as np
+from numpy.polynomial.hermite_e import hermegauss
+from scipy import sparse
+from scipy.optimize import minimize
+from scipy.special import expit, log_expit, logsumexp
+
+
+def quadrature_grid(n_points=21):
+    """
+    Gauss–Hermite nodes and weights for a standard normal ability distribution
+
+    Returns:
+        (nodes, weights) arrays of shape (n_points,), weights summing to 1
+    """
+    nodes, weights = hermegauss(n_points)
+    return nodes, weights / weights.sum()
+
+
+class MML3PL:
+    """
+    3PL IRT calibrated by Marginal Maximum Likelihood (Bock & Aitkin, 1981)
+
+    θ is integrated out on a fixed Gauss–Hermite grid, so the item M-step costs
+    items × quadrature points regardless of how many members answered. Member
+    abilities are scored afterwards by EAP on the same grid. Priors match
+    FullIRT3PL (log a ~ N(0,1), b ~ N(0,1), c ~ Beta(5,17)); the M-step finds
+    the posterior mode in (log a, b, logit c) space. NumPy/SciPy only.
+
+    Based on: Bock, R. D., & Aitkin, M. (1981). Psychometrika, 46(4), 443-459.
+    """
+
+    METHOD = "MML-EM"
+
+    def __init__(self, max_iter=100, tolerance=0.001, n_quadrature=21, initial_params=None,
+                 progress_callback=None):
+        """
+        Args:
+            max_iter: Maximum number of EM cycles
+            tolerance: Stop when no item parameter moves by more than this in a cycle
+            n_quadrature: Number of Gauss–Hermite quadrature points
+            initial_params: Optional dict with a_loc (log a), b_loc, c_alpha and c_beta arrays
+                in FullIRT3PL's variational layout, used as EM starting values (warm start)
+            progress_callback: Optional callable(cycle, objective, max_iter) called after every cycle
+        """
+        self.max_iter = max_iter
+        self.tolerance = tolerance
+        self.n_quadrature = n_quadrature
+        self.initial_params = initial_params
+        self.progress_callback = progress_callback
+        self.variational_params = None
+        self.iterations = 0
+        self.converged = False
+        self.theta = None
+        self.a = None
+        self.b = None
+        self.c = None
+
+    def fit(self, subject_idx, item_idx, responses, n_subjects, n_items):
+        """
+        Calibrate item parameters by EM on long-format triplets, then score θ by EAP
+
+        Args:
+            subject_idx: integer array (n_obs,) with subject indices in [0, n_subjects)
+            item_idx: integer array (n_obs,) with item indices in [0, n_items)
+            responses: array (n_obs,) with values 0/1
+            n_subjects: Number of subjects
+            n_items: Number of items
+
+        Returns:
+            self (fitted model)
+        """
+        nodes, weights = quadrature_grid(self.n_quadrature)
+        log_weights = np.log(weights)
+
+        # Subject x item incidence (answered) and correctness matrices; missing cells stay empty
+        answered = sparse.csr_matrix(
+            (np.ones(len(responses)), (subject_idx, item_idx)), shape=(n_subjects, n_items))
+        correct = sparse.csr_matrix(
+            (np.asarray(responses, dtype=np.float64), (subject_idx, item_idx)), shape=(n_subjects, n_items))
+
+        logging.info(f"Starting {self.METHOD} training: {n_subjects} subjects, {n_items} items, "
+                     f"{len(responses)} responses, {self.n_quadrature} quadrature points")
+
+        # Unconstrained item parameters: log a, b, logit c
+        if self.initial_params:
+            init = self.initial_params
+            params = np.concatenate([init['a_loc'], init['b_loc'],
+                                     np.log(init['c_alpha']) - np.log(init['c_beta'])]).astype(np.float64)
+        else:
+            params = np.concatenate([np.zeros(n_items), np.zeros(n_items), np.full(n_items, np.log(5 / 17))])
+
+        params = self._calibrate(params, answered, correct, nodes, log_weights)
+        log_a, b, logit_c = np.split(params, 3)
+        theta_mean, theta_sd = self._score(params, answered, correct, nodes, log_weights,
+                                           subject_idx, item_idx, responses)
+
+        # Same layout as FullIRT3PL.variational_params; c as a Beta with the prior's concentration
+        c_mean = expit(logit_c)
+        self.variational_params = {
+            'a_loc': log_a,
+            'b_loc': b,
+            'c_alpha': c_mean * 22,
+            'c_beta': (1 - c_mean) * 22,
+            'theta_loc': theta_mean,
+            'theta_scale': theta_sd
+        }
+
+        # Clip parameters to reasonable ranges
+        self.a = np.clip(np.exp(log_a), 0.01, 2.5)
+        self.b = np.clip(b, -3, 3)
+        self.c = np.clip(expit(logit_c), 0.01, 0.5)
+        self.theta = np.clip(theta_mean, -3, 3)
+
+        logging.info(f"{self.METHOD} training completed successfully")
+        logging.info(f"Parameter ranges: a=[{self.a.min():.3f}, {self.a.max():.3f}], "
+                     f"b=[{self.b.min():.3f}, {self.b.max():.3f}], "
+                     f"c=[{self.c.min():.3f}, {self.c.max():.3f}]")
+
+        return self
+
+    def _calibrate(self, params, answered, correct, nodes, log_weights):
+        """
+        Bock–Aitkin EM from the starting item parameters
+
+        Returns:
+            fitted unconstrained item parameters [log a, b, logit c]
+        """
+        answered_t = answered.T.tocsr()
+        correct_t = correct.T.tocsr()
+
+        for cycle in range(self.max_iter):
+            # E-step: posterior over quadrature nodes for every subject
+            posterior = self._posterior(params, answered, correct, nodes, log_weights)
+
+            # Expected number of attempts / correct answers per item at each node
+            expected_n = answered_t @ posterior
+            expected_r = correct_t @ posterior
+
+            # M-step: all items at once (they are independent given the expected counts)
+            result = minimize(self._negative_log_posterior, params, jac=True, method='L-BFGS-B',
+                              args=(expected_r, expected_n, nodes), options={'maxiter': 50})
+            change = np.max(np.abs(result.x - params))
+            params = result.x
+            self.iterations = cycle + 1
+
+            if self.progress_callback:
+                self.progress_callback(cycle, result.fun, self.max_iter)
+
+            if cycle % 10 == 0:
+                logging.info(f"EM cycle {cycle}/{self.max_iter}, "
+                             f"marginal objective: {result.fun:.2f}, max change: {change:.5f}")
+
+            if change < self.tolerance:
+                self.converged = True
+                logging.info(f"Converged at EM cycle {cycle}")
+                break
+
+        return params
+
+    def _score(self, params, answered, correct, nodes, log_weights, subject_idx, item_idx, responses):
+        """
+        EAP abilities (posterior mean and SD) from the final posterior
+
+        Returns:
+            (theta, theta_sd) arrays of shape (n_subjects,)
+        """
+        posterior = self._posterior(params, answered, correct, nodes, log_weights)
+        theta_mean = posterior @ nodes
+        theta_sd = np.sqrt(np.maximum(posterior @ nodes ** 2 - theta_mean ** 2, 0))
+        return theta_mean, theta_sd
+
+    @staticmethod
+    def _posterior(params, answered, correct, nodes, log_weights):
+        """
+        Normalised posterior weights (n_subjects, n_quadrature) of each subject over the grid
+        """
+        log_p, log_q = MML3PL._log_probabilities(params, nodes)
+
+        # log L_s(q) = Σ_answered log(1-P) + Σ_correct [log P - log(1-P)]
+        log_likelihood = answered @ log_q + correct @ (log_p - log_q) + log_weights
+        return np.exp(log_likelihood - logsumexp(log_likelihood, axis=1, keepdims=True))
+
+    @staticmethod
+    def _log_probabilities(params, nodes):
+        """
+        log P and log(1-P) of a correct answer, shape (n_items, n_quadrature)
+        """
+        log_a, b, logit_c = np.split(params, 3)
+        z = np.exp(log_a)[:, None] * (nodes[None, :] - b[:, None])
+        c = expit(logit_c)[:, None]
+
+        # 1-P = (1-c)(1-σ(z)) evaluated in log space to stay finite in the tails
+        log_p = np.log(c + (1 - c) * expit(z))
+        log_q = np.log1p(-c) + log_expit(-z)
+        return log_p, log_q
+
+    @staticmethod
+    def _negative_log_posterior(params, expected_r, expected_n, nodes):
+        """
+        Expected complete-data negative log posterior and its analytic gradient
+        """
+        log_a, b, logit_c = np.split(params, 3)
+        a, c = np.exp(log_a), expit(logit_c)
+        distance = nodes[None, :] - b[:, None]
+        s = expit(a[:, None] * distance)
+        p = c[:, None] + (1 - c[:, None]) * s
+        log_p, log_q = MML3PL._log_probabilities(params, nodes)
+
+        log_lik = np.sum(expected_r * log_p + (expected_n - expected_r) * log_q)
+        log_prior = MML3PL._log_prior(params)
+
+        # Chain rule through P; 1-P = (1-c)(1-s) cancels, so nothing divides by 1-P
+        residual = (expected_r - expected_n * p) / p
+        grad_log_a = np.sum(residual * s * distance, axis=1) * a - log_a
+        grad_b = -np.sum(residual * s, axis=1) * a - b
+        grad_logit_c = np.sum(residual, axis=1) * c + 5 * (1 - c) - 17 * c
+
+        gradient = np.concatenate([grad_log_a, grad_b, grad_logit_c])
+        return -(log_lik + log_prior), -gradient
+
+    @staticmethod
+    def _log_prior(params):
+        """Priors: log a ~ N(0,1), b ~ N(0,1), c ~ Beta(5,17) (with the logit Jacobian)"""
+        log_a, b, logit_c = np.split(params, 3)
+        c = expit(logit_c)
+        return np.sum(-0.5 * log_a ** 2 - 0.5 * b ** 2 + 5 * np.log(c) + 17 * np.log1p(-c))
+
+    def get_item_parameters(self):
+        """Return item parameters as dict"""
+        return {
+            'discrimination': self.a.tolist(),
+            'difficulty': self.b.tolist(),
+            'guessing': self.c.tolist()
+        }
+
+    def get_subject_abilities(self):
+        """Return subject abilities as array"""
+        return self.theta.tolist()
@@ -0,0 +1,323 @@
+from collections import Counter
+import logging
+import math
+import threading
+import time
+
+# Random-walk variance added to θ / b before every update, so estimates keep tracking
+# learning and drift instead of freezing once their standard error is small
+THETA_DRIFT = 0.002
+DIFFICULTY_DRIFT = 0.0001
+
+# Prior standard deviation of b for a stored item; engines that keep no b_scale (mml,
+# map) leave the default 1.0 in the store, which would treat a calibrated b as unknown
+CALIBRATED_DIFFICULTY_SCALE = 0.2
+
+# Stochastic gradient steps on log a and logit c (per response, Fisher-scaled)
+DISCRIMINATION_RATE = 0.02
+GUESSING_RATE = 0.01
+
+# Bounds matching the clipping of the calibration engines (θ up to the information grid)
+LOG_A_BOUNDS = (math.log(0.01), math.log(2.5))
+B_BOUNDS = (-3.0, 3.0)
+C_BOUNDS = (0.01, 0.5)
+THETA_BOUNDS = (-4.0, 4.0)
+
+# Shortest sleep of the background flusher, so a failing store is retried about once a second
+MIN_FLUSH_WAIT = 1.0
+
+
+def _expit(value):
+    return 1.0 / (1.0 + math.exp(-value)) if value >= 0 else math.exp(value) / (1.0 + math.exp(value))
+
+
+def _clip(value, bounds):
+    return min(max(value, bounds[0]), bounds[1])
+
+
+class OnlineCalibrator:
+    """
+    Constant-time updates of stored item and ability parameters from single responses
+
+    Each observation is one approximate Bayesian step on the 3PL likelihood of that
+    response (Elo / Glicko-style): θ and b take a Newton step under their current
+    variance, which then shrinks by the response's Fisher information (plus a small
+    drift), so new items and members move fast and well-measured ones slowly; log a and
+    logit c take a small Fisher-scaled gradient step.
+
+    Parameters are read from the ParameterStore on first use, updated in memory and
+    written back once flush_updates observations are pending (by the observing request)
+    or flush_seconds after the first pending one (by a background thread, started with
+    the first observation, so the deadline holds when traffic stops). A calibration
+    supersedes the online state: its keys are held out of flushes while it runs (hold)
+    and discard() drops their cached entries once it has written its own parameters.
+    """
+
+    def __init__(self, store, flush_seconds, flush_updates, max_cached=200_000):
+        """
+        Args:
+            store: ParameterStore holding the variational parameters
+            flush_seconds: Write pending updates at most this long after the first one
+            flush_updates: ...or as soon as this many observations are pending
+            max_cached: Entries kept in memory after a flush before the clean ones are dropped
+        """
+        self.store = store
+        self.flush_seconds = flush_seconds
+        self.flush_updates = flush_updates
+        self.max_cached = max_cached
+        self.observations = 0
+        self.flushes = 0
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._items = {}
+        self._members = {}
+        self._dirty_items = set()
+        self._dirty_members = set()
+        self._pending = 0
+        self._pending_since = None
+        self._held_items = Counter()
+        self._held_members = Counter()
+        self._stopped = threading.Event()
+        self._flusher = None
+
+    def observe(self, observations):
+        """
+        Apply (member_key, question_key, correct) observations in order
+
+        Returns:
+            (items, members): {question_key: state} and {member_key: state} after the
+            updates, for the keys touched (see item_state / member_state)
+        """
+        observations = [(str(member), str(question), bool(correct)) for member, question, correct in observations]
+
+        with self._lock:
+            self._load_missing({question for _, question, _ in observations},
+                               {member for member, _, _ in observations})
+            for member_key, question_key, correct in observations:
+                self._update(self._items[question_key], self._members[member_key], correct)
+                self._dirty_items.add(question_key)
+                self._dirty_members.add(member_key)
+            self.observations += len(observations)
+            self._pending += len(observations)
+            if self._pending_since is None:
+                self._pending_since = time.time()
+            if self._flusher is None:
+                self._flusher = threading.Thread(target=self._flush_loop, name='online-flush', daemon=True)
+                self._flusher.start()
+
+            items = {key: self.item_state(self._items[key]) for _, key, _ in observations}
+            members = {key: self.member_state(self._members[key]) for key, _, _ in observations}
+            due = self._pending >= self.flush_updates or time.time() - self._pending_since >= self.flush_seconds
+
+        # A failed write keeps the updates pending; the next observation retries it
+        if due:
+            try:
+                self.flush()
+            except Exception as e:
+                logging.error(f"Could not flush online updates: {e}")
+        return items, members
+
+    def _flush_loop(self):
+        """Background thread: flush pending updates once they are flush_seconds old"""
+        while not self._stopped.wait(self._seconds_to_deadline()):
+            with self._lock:
+                due = self._pending_since is not None and \
+                    time.time() - self._pending_since >= self.flush_seconds
+            if due:
+                try:
+                    self.flush()
+                except Exception as e:
+                    logging.error(f"Could not flush online updates: {e}")
+
+    def _seconds_to_deadline(self):
+        """Sleep of the background flusher until the pending updates are due"""
+        with self._lock:
+            if self._pending_since is None:
+                return max(self.flush_seconds, MIN_FLUSH_WAIT)
+            return max(self._pending_since + self.flush_seconds - time.time(), MIN_FLUSH_WAIT)
+
+    def close(self):
+        """Stop the background flusher and write what is still pending"""
+        self._stopped.set()
+        if self._flusher is not None:
+            self._flusher.join()
+        return self.flush()
+
+    def _load_missing(self, question_keys, member_keys):
+        """Read keys not cached yet from the store, one query per table (lock held)"""
+        question_keys = sorted(key for key in question_keys if key not in self._items)
+        member_keys = sorted(key for key in member_keys if key not in self._members)
+
+        if question_keys:
+            items, found = self.store.load_items(question_keys)
+            for idx, key in enumerate(question_keys):
+                b_scale = float(items['b_scale'][idx])
+                if found[idx]:
+                    b_scale = min(b_scale, CALIBRATED_DIFFICULTY_SCALE)
+                c_alpha, c_beta = float(items['c_alpha'][idx]), float(items['c_beta'][idx])
+                # New items start at the prior median a = 1, not the guide's initial a_loc
+                self._items[key] = {
+                    'log_a': _clip(float(items['a_loc'][idx]), LOG_A_BOUNDS) if found[idx] else 0.0,
+                    'a_scale': float(items['a_scale'][idx]),
+                    'b': float(items['b_loc'][idx]),
+                    'b_var': b_scale ** 2,
+                    'c': _clip(c_alpha / (c_alpha + c_beta), C_BOUNDS),
+                    'c_concentration': c_alpha + c_beta,
+                    'updates': 0
+                }
+        if member_keys:
+            members, _ = self.store.load_members(member_keys)
+            for idx, key in enumerate(member_keys):
+                self._members[key] = {
+                    'theta': float(members['theta_loc'][idx]),
+                    'theta_var': float(members['theta_scale'][idx]) ** 2,
+                    'updates': 0
+                }
+
+    @staticmethod
+    def _update(item, member, correct):
+        """One stochastic step for a single response (all gradients at the old values)"""
+        a, b, c, theta = math.exp(item['log_a']), item['b'], item['c'], member['theta']
+        s = _expit(a * (theta - b))
+        p = c + (1 - c) * s
+        # d log L / dP, and dP/dz for z = a(θ - b)
+        residual = ((1.0 if correct else 0.0) - p) / (p * (1 - p))
+        slope = (1 - c) * s * (1 - s)
+
+        # θ and b: Newton step under the (drifted) prior variance, variance shrinks by
+        # the Fisher information of the response
+        information = (slope * a) ** 2 / (p * (1 - p))
+        theta_var = 1.0 / (1.0 / (member['theta_var'] + THETA_DRIFT) + information)
+        b_var = 1.0 / (1.0 / (item['b_var'] + DIFFICULTY_DRIFT) + information)
+        member['theta'] = _clip(theta + theta_var * residual * slope * a, THETA_BOUNDS)
+        member['theta_var'] = theta_var
+        item['b'] = _clip(b - b_var * residual * slope * a, B_BOUNDS)
+        item['b_var'] = b_var
+
+        # log a and logit c: gradient steps scaled by their Fisher information
+        grad_log_a = residual * slope * a * (theta - b)
+        info_log_a = (slope * a * (theta - b)) ** 2 / (p * (1 - p))
+        item['log_a'] = _clip(item['log_a'] + DISCRIMINATION_RATE * grad_log_a / (info_log_a + 1.0),
+                              LOG_A_BOUNDS)
+        grad_logit_c = residual * c * (1 - c) * (1 - s)
+        info_logit_c = (c * (1 - c) * (1 - s)) ** 2 / (p * (1 - p))
+        logit_c = math.log(c / (1 - c)) + GUESSING_RATE * grad_logit_c / (info_logit_c + 1.0)
+        item['c'] = _clip(_expit(logit_c), C_BOUNDS)
+
+        item['updates'] += 1
+        member['updates'] += 1
+
+    @staticmethod
+    def item_state(item):
+        """{"discrimination", "difficulty", "guessing", "difficultyStandardError", "updates"}"""
+        return {
+            'discrimination': math.exp(item['log_a']),
+            'difficulty': item['b'],
+            'guessing': item['c'],
+            'difficultyStandardError': math.sqrt(item['b_var']),
+            'updates': item['updates']
+        }
+
+    @staticmethod
+    def member_state(member):
+        """{"theta", "standardError", "updates"}"""
+        return {
+            'theta': member['theta'],
+            'standardError': math.sqrt(member['theta_var']),
+            'updates': member['updates']
+        }
+
+    def flush(self):
+        """
+        Write every pending update to the parameter store
+
+        Returns:
+            (items, members) written
+        """
+        with self._flush_lock:
+            with self._lock:
+                # Keys under calibration stay pending: the fit's parameters must not be overwritten
+                question_keys = sorted(self._dirty_items.difference(self._held_items))
+                member_keys = sorted(self._dirty_members.difference(self._held_members))
+                items = [dict(self._items[key]) for key in question_keys]
+                members = [dict(self._members[key]) for key in member_keys]
+                self._dirty_items.difference_update(question_keys)
+                self._dirty_members.difference_update(member_keys)
+                self._pending = 0
+                self._pending_since = time.time() if self._dirty_items or self._dirty_members else None
+            if not question_keys and not member_keys:
+                return 0, 0
+
+            try:
+                self.store.save_items(question_keys, {
+                    'a_loc': [item['log_a'] for item in items],
+                    'a_scale': [item['a_scale'] for item in items],
+                    'b_loc': [item['b'] for item in items],
+                    'b_scale': [math.sqrt(item['b_var']) for item in items],
+                    'c_alpha': [item['c'] * item['c_concentration'] for item in items],
+                    'c_beta': [(1 - item['c']) * item['c_concentration'] for item in items]
+                })
+                self.store.save_members(member_keys, {
+                    'theta_loc': [member['theta'] for member in members],
+                    'theta_scale': [math.sqrt(member['theta_var']) for member in members]
+                })
+            except Exception:
+                with self._lock:
+                    self._dirty_items.update(key for key in question_keys if key in self._items)
+                    self._dirty_members.update(key for key in member_keys if key in self._members)
+                    self._pending_since = self._pending_since or time.time()
+                raise
+
+            with self._lock:
+                self.flushes += 1
+                if len(self._items) + len(self._members) > self.max_cached:
+                    self._items = {key: self._items[key] for key in self._dirty_items}
+                    self._members = {key: self._members[key] for key in self._dirty_members}
+
+        logging.info(f"Online updates flushed: {len(question_keys)} items, {len(member_keys)} members")
+        return len(question_keys), len(member_keys)
+
+    def hold(self, question_keys, member_keys):
+        """
+        Keep pending updates of these keys out of flush() while a calibration rewrites them
+
+        Waits for a flush in progress, so none writes these keys once this returns.
+
+        Returns:
+            Token for release()
+        """
+        held = ([str(key) for key in question_keys], [str(key) for key in member_keys])
+        with self._flush_lock, self._lock:
+            self._held_items.update(held[0])
+            self._held_members.update(held[1])
+        return held
+
+    def release(self, held):
+        """End a hold(); call discard() first for the keys the calibration wrote"""
+        question_keys, member_keys = held
+        with self._lock:
+            self._held_items.subtract(question_keys)
+            self._held_members.subtract(member_keys)
+            self._held_items = +self._held_items
+            self._held_members = +self._held_members
+
+    def discard(self, question_keys, member_keys):
+        """Forget cached (and pending) state of keys a calibration has just rewritten"""
+        with self._lock:
+            for key in question_keys:
+                self._items.pop(str(key), None)
+                self._dirty_items.discard(str(key))
+            for key in member_keys:
+                self._members.pop(str(key), None)
+                self._dirty_members.discard(str(key))
+
+    def stats(self):
+        """Observation / flush counts and cached entries, for /health and /metrics"""
+        with self._lock:
+            return {
+                'observations': self.observations,
+                'flushes': self.flushes,
+                'pendingObservations': self._pending,
+                'cachedItems': len(self._items),
+                'cachedMembers': len(self._members)
+            }
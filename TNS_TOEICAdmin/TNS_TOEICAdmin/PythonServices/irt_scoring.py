@@ -0,0 +1,100 @@
+import numpy as np
+from scipy import sparse
+from scipy.special import expit, log_expit, logsumexp
+
+from irt_mml import quadrature_grid
+
+# θ points of the precomputed item / test information tables (see item_information)
+INFORMATION_GRID = np.linspace(-4, 4, 81)
+
+
+def response_log_likelihood(member_idx, item_idx, responses, n_members, a, b, c, theta_grid):
+    """
+    Log-likelihood of every member's responses at every theta grid point
+
+    Uses the 3PL formula of FullIRT3PL.model, P = c + (1-c) / (1 + exp(-a(θ-b))),
+    evaluated once per item x grid point and summed per member with sparse products.
+
+    Returns:
+        array of shape (n_members, len(theta_grid))
+    """
+    z = a[:, None] * (theta_grid[None, :] - b[:, None])
+    log_p = np.log(c[:, None] + (1 - c[:, None]) * expit(z))
+    log_q = np.log1p(-c[:, None]) + log_expit(-z)
+
+    shape = (n_members, len(a))
+    answered = sparse.csr_matrix((np.ones(len(responses)), (member_idx, item_idx)), shape=shape)
+    correct = sparse.csr_matrix((np.asarray(responses, dtype=np.float64), (member_idx, item_idx)), shape=shape)
+
+    return answered @ log_q + correct @ (log_p - log_q)
+
+
+def eap_scores(member_idx, item_idx, responses, n_members, a, b, c, n_quadrature=41):
+    """
+    Expected a posteriori θ for all members at once, with a N(0,1) prior
+
+    Args:
+        member_idx: integer array (n_obs,) in [0, n_members)
+        item_idx: integer array (n_obs,) indexing into a, b, c
+        responses: array (n_obs,) with values 0/1
+        n_members: Number of members
+        a, b, c: frozen item parameters (natural scale)
+        n_quadrature: Gauss–Hermite points
+
+    Returns:
+        (theta, standard_error) arrays of shape (n_members,)
+    """
+    nodes, weights = quadrature_grid(n_quadrature)
+    log_posterior = response_log_likelihood(member_idx, item_idx, responses, n_members, a, b, c, nodes) + np.log(weights)
+    posterior = np.exp(log_posterior - logsumexp(log_posterior, axis=1, keepdims=True))
+
+    theta = posterior @ nodes
+    standard_error = np.sqrt(np.maximum(posterior @ nodes ** 2 - theta ** 2, 0))
+    return theta, standard_error
+
+
+def map_scores(member_idx, item_idx, responses, n_members, a, b, c, max_iter=30, tolerance=1e-4):
+    """
+    Maximum a posteriori θ for all members at once (Fisher scoring, N(0,1) prior)
+
+    Every Newton step is a handful of bincounts over the observations, so all
+    members move together. Starts from the EAP estimate.
+
+    Returns:
+        (theta, standard_error) arrays of shape (n_members,)
+    """
+    theta, _ = eap_scores(member_idx, item_idx, responses, n_members, a, b, c, n_quadrature=21)
+    a_obs, b_obs, c_obs = a[item_idx], b[item_idx], c[item_idx]
+    y = np.asarray(responses, dtype=np.float64)
+
+    for _ in range(max_iter):
+        p = c_obs + (1 - c_obs) * expit(a_obs * (theta[member_idx] - b_obs))
+        p = np.clip(p, 1e-10, 1 - 1e-10)
+        weight = a_obs * (p - c_obs) / (p * (1 - c_obs))
+
+        # d log posterior / dθ and expected information (3PL), prior N(0,1) adds -θ and 1
+        gradient = np.bincount(member_idx, weights=weight * (y - p), minlength=n_members) - theta
+        information = np.bincount(member_idx, weights=weight ** 2 * p * (1 - p), minlength=n_members) + 1
+
+        step = gradient / information
+        theta = np.clip(theta + step, -4, 4)
+        if np.max(np.abs(step)) < tolerance:
+            break
+
+    return theta, 1 / np.sqrt(information)
+
+
+def item_information(a, b, c, theta_grid=INFORMATION_GRID):
+    """
+    3PL Fisher information of every item at every θ grid point
+
+    I(θ) = a² (Q/P) ((P - c) / (1 - c))², with P from FullIRT3PL.model. Test
+    information of any item set is the sum of its rows.
+
+    Returns:
+        float32 array of shape (len(a), len(theta_grid))
+    """
+    a, b, c = (np.asarray(values, dtype=np.float64)[:, None] for values in (a, b, c))
+    p = c + (1 - c) * expit(a * (np.asarray(theta_grid)[None, :] - b))
+    information = a ** 2 * (1 - p) / p * ((p - c) / (1 - c)) ** 2
+    return information.astype(np.float32)
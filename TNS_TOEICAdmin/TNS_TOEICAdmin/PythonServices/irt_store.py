@@ -0,0 +1,127 @@
+import os
+import sqlite3
+from datetime import datetime
+
+import numpy as np
+
+# Variational parameters persisted per question / member, with the guide's initial
+# values (the priors' defaults) used for keys that have never been calibrated
+ITEM_PARAM_DEFAULTS = {
+    'a_loc': 1.0,
+    'a_scale': 1.0,
+    'b_loc': 0.0,
+    'b_scale': 1.0,
+    'c_alpha': 5.0,
+    'c_beta': 17.0
+}
+
+MEMBER_PARAM_DEFAULTS = {
+    'theta_loc': 0.0,
+    'theta_scale': 1.0
+}
+
+# SQLite limits the number of bound variables per statement
+_QUERY_CHUNK = 900
+
+
+class ParameterStore:
+    """
+    SQLite store of the latest fitted variational parameters per questionKey and memberKey
+
+    Every successful calibration upserts its parameters; a warm-started calibration reads
+    them back as initial values. One connection per call keeps it safe to use from
+    Flask worker threads and from separate worker processes.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory, exist_ok=True)
+
+        with self._connect() as conn:
+            conn.execute(self._create_table_sql('item_params', 'question_key', ITEM_PARAM_DEFAULTS))
+            conn.execute(self._create_table_sql('member_params', 'member_key', MEMBER_PARAM_DEFAULTS))
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=30)
+
+    @staticmethod
+    def _create_table_sql(table, key_column, columns):
+        column_sql = ', '.join(f"{name} REAL" for name in columns)
+        return (f"CREATE TABLE IF NOT EXISTS {table} "
+                f"({key_column} TEXT PRIMARY KEY, {column_sql}, updated_at TEXT)")
+
+    def load_items(self, question_keys):
+        """
+        Initial item parameters for the given keys
+
+        Returns:
+            (params, found): dict of name -> float32 array aligned with question_keys,
+            and a boolean array marking keys that were found in the store
+        """
+        return self._load('item_params', 'question_key', ITEM_PARAM_DEFAULTS, question_keys)
+
+    def load_members(self, member_keys):
+        """
+        Initial ability parameters for the given member keys (see load_items)
+        """
+        return self._load('member_params', 'member_key', MEMBER_PARAM_DEFAULTS, member_keys)
+
+    def save_items(self, question_keys, params):
+        """
+        Upsert item parameters; params maps names in ITEM_PARAM_DEFAULTS to arrays
+        aligned with question_keys (a missing name or NaN value is stored as NULL)
+        """
+        self._save('item_params', 'question_key', ITEM_PARAM_DEFAULTS, question_keys, params)
+
+    def save_members(self, member_keys, params):
+        """
+        Upsert member ability parameters (see save_items)
+        """
+        self._save('member_params', 'member_key', MEMBER_PARAM_DEFAULTS, member_keys, params)
+
+    def _load(self, table, key_column, defaults, keys):
+        keys = [str(key) for key in keys]
+        position = {key: idx for idx, key in enumerate(keys)}
+        names = list(defaults)
+        params = {name: np.full(len(keys), value, dtype=np.float32) for name, value in defaults.items()}
+        found = np.zeros(len(keys), dtype=bool)
+
+        with self._connect() as conn:
+            for start in range(0, len(keys), _QUERY_CHUNK):
+                chunk = keys[start:start + _QUERY_CHUNK]
+                placeholders = ', '.join('?' * len(chunk))
+                rows = conn.execute(
+                    f"SELECT {key_column}, {', '.join(names)} FROM {table} "
+                    f"WHERE {key_column} IN ({placeholders})", chunk).fetchall()
+
+                for row in rows:
+                    idx = position[row[0]]
+                    found[idx] = True
+                    for name, value in zip(names, row[1:]):
+                        if value is not None:
+                            params[name][idx] = value
+
+        return params, found
+
+    def _save(self, table, key_column, defaults, keys, params):
+        names = list(defaults)
+        columns = [np.asarray(params[name], dtype=np.float64) if name in params else None for name in names]
+        updated_at = datetime.utcnow().isoformat()
+
+        def value(column, idx):
+            if column is None or np.isnan(column[idx]):
+                return None
+            return float(column[idx])
+
+        rows = [
+            (str(key), *(value(column, idx) for column in columns), updated_at)
+            for idx, key in enumerate(keys)
+        ]
+        placeholders = ', '.join('?' * (len(names) + 2))
+
+        with self._connect() as conn:
+            conn.executemany(
+                f"INSERT OR REPLACE INTO {table} ({key_column}, {', '.join(names)}, updated_at) "
+                f"VALUES ({placeholders})", rows)
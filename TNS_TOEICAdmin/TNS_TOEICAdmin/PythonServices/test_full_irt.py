@@ -1,9 +1,14 @@
 import requests
+import gzip
+import io
 import json
 import random
+import time
 import uuid
 from datetime import datetime
 
+import numpy as np
+
 BASE_URL = "http://localhost:5001"
 
 def print_section(title):
@@ -223,6 +228,427 @@ def test_full_irt_analysis():
         print(f"❌ Error: {e}")
         return False
 
+def test_score_endpoint():
+    """Test 4: Fixed-item scoring with supplied item parameters"""
+    print_section("TEST 4: Fixed-Item Scoring (/score)")
+    
+    fake_data = generate_fake_data(
+        num_members=50,
+        num_questions=20,
+        num_responses=200
+    )
+    
+    # Frozen item parameters supplied in the request (no recalibration)
+    question_keys = {r['questionKey'] for r in fake_data['data']}
+    item_params = {
+        key: {"discrimination": 1.0, "difficulty": 0.0, "guessing": 0.25}
+        for key in question_keys
+    }
+    
+    try:
+        for method in ("eap", "map"):
+            response = requests.post(
+                f"{BASE_URL}/score",
+                json={"data": fake_data['data'], "itemParams": item_params, "method": method},
+                timeout=30
+            )
+            
+            print(f"\n{method.upper()} Status Code: {response.status_code}")
+            
+            if response.status_code != 200:
+                print(json.dumps(response.json(), indent=2))
+                print(f"❌ Scoring FAILED ({method.upper()})")
+                return False
+            
+            result = response.json()
+            abilities = list(result['memberAbilities'].values())
+            print(f"   Members scored: {result['metadata']['totalMembers']}")
+            print(f"   Ability range: [{min(abilities):.3f}, {max(abilities):.3f}]")
+            print(f"   Scoring time: {result['metadata']['stageTimings'].get('score', 0) * 1000:.1f} ms")
+        
+        print("\n✅ Fixed-Item Scoring PASSED")
+        return True
+        
+    except Exception as e:
+        print(f"❌ Error: {e}")
+        return False
+
+def test_async_job():
+    """Test 5: Asynchronous calibration job (submit / status / result)"""
+    print_section("TEST 5: Asynchronous Calibration Job (/analyze/jobs)")
+    
+    fake_data = generate_fake_data(
+        num_members=50,
+        num_questions=20,
+        num_responses=200
+    )
+    
+    try:
+        response = requests.post(f"{BASE_URL}/analyze/jobs", json=fake_data, timeout=30)
+        print(f"Submit Status Code: {response.status_code}")
+        
+        if response.status_code != 202:
+            print(json.dumps(response.json(), indent=2))
+            print("❌ Job submission FAILED")
+            return False
+        
+        job_id = response.json()['jobId']
+        print(f"   Job: {job_id}")
+        
+        # Poll until the fit finishes (same budget as the synchronous test)
+        status = {}
+        for _ in range(120):
+            status = requests.get(f"{BASE_URL}/analyze/jobs/{job_id}", timeout=5).json()
+            progress = status.get('progress') or {}
+            print(f"   {status['status']}: epoch {progress.get('epoch', '-')}/{progress.get('maxIter', '-')}, "
+                  f"ETA {status.get('etaSeconds', '-')} s")
+            if status['status'] in ('completed', 'failed'):
+                break
+            time.sleep(1)
+        
+        result = requests.get(f"{BASE_URL}/analyze/jobs/{job_id}/result", timeout=30)
+        print(f"Result Status Code: {result.status_code}")
+        
+        if status.get('status') == 'completed' and result.status_code == 200:
+            print(f"   Questions calibrated: {result.json()['metadata']['totalQuestions']}")
+            print("\n✅ Asynchronous Job PASSED")
+            return True
+        
+        print(json.dumps(result.json(), indent=2))
+        print("❌ Asynchronous Job FAILED")
+        return False
+        
+    except Exception as e:
+        print(f"❌ Error: {e}")
+        return False
+
+def test_ndjson_stream():
+    """Test 6: NDJSON body on /analyze/stream"""
+    print_section("TEST 6: NDJSON Streaming Analysis (/analyze/stream)")
+    
+    fake_data = generate_fake_data(
+        num_members=50,
+        num_questions=20,
+        num_responses=200
+    )
+    
+    # One response per line, sent as a generator (chunked upload)
+    lines = (json.dumps(record).encode() + b"\n" for record in fake_data['data'])
+    
+    try:
+        response = requests.post(
+            f"{BASE_URL}/analyze/stream?engine=sparse",
+            data=lines,
+            headers={'Content-Type': 'application/x-ndjson'},
+            timeout=120
+        )
+        print(f"Status Code: {response.status_code}")
+        result = response.json()
+        
+        if response.status_code == 200 and result.get('status') == 'OK':
+            print(f"   Responses: {result['metadata']['totalResponses']}, "
+                  f"questions calibrated: {result['metadata']['totalQuestions']}")
+            
+            # isCorrect must be a number: a "1" string is refused with its line number
+            records = [dict(record) for record in fake_data['data']]
+            records[7]['isCorrect'] = str(records[7]['isCorrect'])
+            rejected = requests.post(
+                f"{BASE_URL}/analyze/stream?engine=sparse",
+                data=b"".join(json.dumps(record).encode() + b"\n" for record in records),
+                headers={'Content-Type': 'application/x-ndjson'},
+                timeout=120
+            )
+            print(f"   String isCorrect: {rejected.status_code} {rejected.json().get('message')}")
+            if rejected.status_code != 400:
+                print("❌ NDJSON Streaming FAILED: string isCorrect accepted")
+                return False
+            
+            print("\n✅ NDJSON Streaming PASSED")
+            return True
+        
+        print(json.dumps(result, indent=2))
+        print("❌ NDJSON Streaming FAILED")
+        return False
+        
+    except Exception as e:
+        print(f"❌ Error: {e}")
+        return False
+
+def test_columnar_upload():
+    """Test 7: Columnar (NPZ) body on /analyze"""
+    print_section("TEST 7: Columnar Upload (/analyze, application/x-npz)")
+    
+    fake_data = generate_fake_data(
+        num_members=50,
+        num_questions=20,
+        num_responses=200
+    )
+    records = fake_data['data']
+    
+    buffer = io.BytesIO()
+    np.savez(buffer,
+             memberKey=np.array([r['memberKey'] for r in records]),
+             questionKey=np.array([r['questionKey'] for r in records]),
+             isCorrect=np.array([r['isCorrect'] for r in records], dtype=np.int8))
+    
+    try:
+        response = requests.post(
+            f"{BASE_URL}/analyze?engine=sparse",
+            data=buffer.getvalue(),
+            headers={'Content-Type': 'application/x-npz'},
+            timeout=120
+        )
+        print(f"Status Code: {response.status_code}")
+        result = response.json()
+        
+        if response.status_code == 200 and result.get('status') == 'OK':
+            print(f"   Responses: {result['metadata']['totalResponses']}, "
+                  f"questions calibrated: {result['metadata']['totalQuestions']}")
+            print("\n✅ Columnar Upload PASSED")
+            return True
+        
+        print(json.dumps(result, indent=2))
+        print("❌ Columnar Upload FAILED")
+        return False
+        
+    except Exception as e:
+        print(f"❌ Error: {e}")
+        return False
+
+def test_item_bank():
+    """Test 8: Versioned item bank written by the calibrations above"""
+    print_section("TEST 8: Item Bank Snapshots (/bank/latest, /bank/versions/<n>, /bank/information)")
+    
+    try:
+        response = requests.get(f"{BASE_URL}/bank/latest", timeout=10)
+        print(f"Status Code: {response.status_code}")
+        latest = response.json()
+        
+        if response.status_code != 200:
+            print(json.dumps(latest, indent=2))
+            print("❌ Item Bank FAILED")
+            return False
+        
+        print(f"   Latest version: {latest['version']} ({latest['engine']}, "
+              f"{len(latest['questionParams'])} questions)")
+        
+        same = requests.get(f"{BASE_URL}/bank/versions/{latest['version']}", timeout=10).json()
+        if same['questionParams'] != latest['questionParams']:
+            print("❌ Item Bank FAILED: version lookup differs from latest")
+            return False
+        
+        # Test information curve of a few questions from the precomputed tables
+        keys = list(latest['questionParams'])[:5]
+        curve = requests.post(f"{BASE_URL}/bank/information",
+                              json={"questionKeys": keys, "version": latest['version'], "items": True},
+                              timeout=10).json()
+        peak = int(max(range(len(curve['testInformation'])), key=curve['testInformation'].__getitem__))
+        print(f"   Test information of {curve['questionCount']} questions peaks at "
+              f"θ={curve['thetaGrid'][peak]:.1f} ({curve['testInformation'][peak]:.2f})")
+        
+        # The tables must be the analytic 3PL information of the snapshot's natural-scale
+        # parameters: I(θ) = a² (P - c)² (1 - P) / ((1 - c)² P)
+        theta = np.array(curve['thetaGrid'])
+        worst = 0.0
+        for key in keys:
+            params = latest['questionParams'][key]
+            a, b, c = params['discrimination'], params['difficulty'], params['guessing']
+            p = c + (1 - c) / (1 + np.exp(-a * (theta - b)))
+            expected = a ** 2 * (p - c) ** 2 * (1 - p) / ((1 - c) ** 2 * p)
+            stored = np.array(curve['itemInformation'][key])
+            worst = max(worst, float(np.max(np.abs(stored - expected) / np.maximum(expected, 1e-6))))
+        print(f"   Largest relative deviation from the analytic 3PL information: {worst:.2e}")
+        if worst > 1e-4:
+            print("❌ Item Bank FAILED: information tables do not match the 3PL formula")
+            return False
+        
+        if curve['questionCount'] == len(keys) and len(curve['thetaGrid']) == len(curve['testInformation']):
+            print("\n✅ Item Bank PASSED")
+            return True
+        
+        print("❌ Item Bank FAILED: information curve does not cover the requested questions")
+        return False
+        
+    except Exception as e:
+        print(f"❌ Error: {e}")
+        return False
+
+def test_grouped_calibration():
+    """Test 9: Per-part calibration with groupBy"""
+    print_section("TEST 9: Grouped Calibration (groupBy=part)")
+    
+    fake_data = generate_fake_data(
+        num_members=60,
+        num_questions=30,
+        num_responses=600
+    )
+    
+    # Every question belongs to one of three parts
+    parts = {}
+    for record in fake_data['data']:
+        record['part'] = parts.setdefault(record['questionKey'], len(parts) % 3 + 1)
+    
+    try:
+        response = requests.post(
+            f"{BASE_URL}/analyze?engine=mml&groupBy=part&cache=false",
+            json={"data": fake_data['data']},
+            timeout=120
+        )
+        print(f"Status Code: {response.status_code}")
+        result = response.json()
+        
+        if response.status_code == 200 and result.get('status') == 'OK':
+            for group in result['metadata']['groups']:
+                print(f"   Part {group['group']}: status {group['status']}, "
+                      f"{group.get('totalQuestions', 0)} questions, {group['wallSeconds']}s")
+            print(f"   Parallel: {result['metadata']['parallel']}")
+            
+            wrong_group = [key for key, params in result['questionParams'].items()
+                           if params['group'] != str(parts[key])]
+            if not wrong_group:
+                print("\n✅ Grouped Calibration PASSED")
+                return True
+            print(f"❌ Grouped Calibration FAILED: {len(wrong_group)} questions in the wrong group")
+            return False
+        
+        print(json.dumps(result, indent=2))
+        print("❌ Grouped Calibration FAILED")
+        return False
+        
+    except Exception as e:
+        print(f"❌ Error: {e}")
+        return False
+
+def test_adaptive_session():
+    """Test 10: Adaptive test session on the latest item bank version"""
+    print_section("TEST 10: Adaptive Testing (/cat/sessions)")
+    
+    try:
+        response = requests.post(f"{BASE_URL}/cat/sessions", json={"maxItems": 5}, timeout=10)
+        print(f"Status Code: {response.status_code}")
+        state = response.json()
+        
+        if response.status_code != 201:
+            print(json.dumps(state, indent=2))
+            print("❌ Adaptive Testing FAILED")
+            return False
+        
+        # Answer every item correctly: θ should move up
+        while state['nextItem'] is not None:
+            state = requests.post(
+                f"{BASE_URL}/cat/sessions/{state['sessionId']}/responses",
+                json={"questionKey": state['nextItem']['questionKey'], "isCorrect": 1},
+                timeout=10
+            ).json()
+        
+        print(f"   {state['administered']} items, θ={state['theta']:.2f} "
+              f"(SE {state['standardError']:.2f}), stop: {state['stopReason']}")
+        
+        if state['administered'] == 5 and state['theta'] > 0:
+            print("\n✅ Adaptive Testing PASSED")
+            return True
+        
+        print("❌ Adaptive Testing FAILED")
+        return False
+        
+    except Exception as e:
+        print(f"❌ Error: {e}")
+        return False
+
+def test_metrics_endpoint():
+    """Test 11: Prometheus metrics after the calibrations above"""
+    print_section("TEST 11: Prometheus Metrics (/metrics)")
+    
+    try:
+        response = requests.get(f"{BASE_URL}/metrics", timeout=10)
+        print(f"Status Code: {response.status_code}")
+        
+        series = [line for line in response.text.splitlines() if line and not line.startswith('#')]
+        calibrations = [line for line in series if line.startswith('irt_calibrations_total')]
+        print(f"   {len(series)} series, content type {response.headers.get('Content-Type')}")
+        for line in calibrations:
+            print(f"   {line}")
+        
+        if response.status_code == 200 and calibrations and \
+                any(line.startswith('irt_stage_seconds_count{stage="fit"}') for line in series):
+            print("\n✅ Prometheus Metrics PASSED")
+            return True
+        
+        print("❌ Prometheus Metrics FAILED")
+        return False
+        
+    except Exception as e:
+        print(f"❌ Error: {e}")
+        return False
+
+def test_online_observe():
+    """Test 12: Online parameter updates from single responses"""
+    print_section("TEST 12: Online Updates (/observe)")
+    
+    try:
+        observation = {"memberKey": "online-member", "questionKey": "online-question", "isCorrect": 1}
+        states = []
+        for _ in range(3):
+            response = requests.post(f"{BASE_URL}/observe", json={"data": [observation]}, timeout=10)
+            print(f"Status Code: {response.status_code}")
+            if response.status_code != 200:
+                print(json.dumps(response.json(), indent=2))
+                print("❌ Online Updates FAILED")
+                return False
+            states.append(response.json())
+        
+        thetas = [state['members']['online-member']['theta'] for state in states]
+        difficulties = [state['items']['online-question']['difficulty'] for state in states]
+        print(f"   θ: {[round(theta, 3) for theta in thetas]}")
+        print(f"   b: {[round(b, 3) for b in difficulties]}")
+        
+        flushed = requests.post(f"{BASE_URL}/observe/flush", timeout=10)
+        
+        # Correct answers: the member's θ rises and the question gets easier
+        if flushed.status_code == 200 and thetas == sorted(thetas) and difficulties == sorted(difficulties, reverse=True):
+            print("\n✅ Online Updates PASSED")
+            return True
+        
+        print("❌ Online Updates FAILED")
+        return False
+        
+    except Exception as e:
+        print(f"❌ Error: {e}")
+        return False
+
+def test_compressed_bodies():
+    """Test 13: gzip request body and negotiated gzip response"""
+    print_section("TEST 13: Compressed Bodies (Content-Encoding)")
+    
+    fake_data = generate_fake_data(num_members=50, num_questions=20, num_responses=200)
+    raw = json.dumps(fake_data).encode()
+    body = gzip.compress(raw)
+    print(f"   Request: {len(raw)} bytes JSON, {len(body)} bytes gzip")
+    
+    try:
+        response = requests.post(
+            f"{BASE_URL}/analyze?engine=fast",
+            data=body,
+            headers={"Content-Type": "application/json", "Content-Encoding": "gzip", "Accept-Encoding": "gzip"},
+            timeout=60
+        )
+        
+        print(f"Status Code: {response.status_code}")
+        encoding = response.headers.get("Content-Encoding")
+        print(f"   Response Content-Encoding: {encoding}")
+        
+        # requests decodes the gzip response transparently
+        if response.status_code == 200 and encoding == "gzip" and response.json()['status'] == "OK":
+            print("\n✅ Compressed Bodies PASSED")
+            return True
+        
+        print("❌ Compressed Bodies FAILED")
+        return False
+        
+    except Exception as e:
+        print(f"❌ Error: {e}")
+        return False
+
 def run_all_tests():
     """Run all tests"""
     print("\n" + "="*70)
@@ -240,6 +666,36 @@ def run_all_tests():
     # Test 3: Full IRT Analysis
     results.append(("Full IRT Analysis (EM Algorithm)", test_full_irt_analysis()))
     
+    # Test 4: Fixed-item scoring
+    results.append(("Fixed-Item Scoring", test_score_endpoint()))
+    
+    # Test 5: Asynchronous job
+    results.append(("Asynchronous Calibration Job", test_async_job()))
+    
+    # Test 6: NDJSON streaming
+    results.append(("NDJSON Streaming Analysis", test_ndjson_stream()))
+    
+    # Test 7: Columnar upload
+    results.append(("Columnar Upload (NPZ)", test_columnar_upload()))
+    
+    # Test 8: Item bank snapshots
+    results.append(("Item Bank Snapshots", test_item_bank()))
+    
+    # Test 9: Per-part calibration
+    results.append(("Grouped Calibration", test_grouped_calibration()))
+    
+    # Test 10: Adaptive testing on the item bank
+    results.append(("Adaptive Testing", test_adaptive_session()))
+    
+    # Test 11: Prometheus metrics
+    results.append(("Prometheus Metrics", test_metrics_endpoint()))
+    
+    # Test 12: Online updates
+    results.append(("Online Updates", test_online_observe()))
+    
+    # Test 13: Compressed request / response bodies
+    results.append(("Compressed Bodies", test_compressed_bodies()))
+    
     # Summary
     print_section("TEST SUMMARY")
     
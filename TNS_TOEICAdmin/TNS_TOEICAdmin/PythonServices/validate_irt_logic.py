@@ -1,11 +1,32 @@
 ﻿import requests
 import json
+import sys
+import time
 import numpy as np
 from scipy.stats import pearsonr
 
 
 BASE_URL = "http://localhost:5001"
 
+# Calibration engine sent as ?engine=... (None = service default)
+ENGINE = None
+
+# Wall time of each /analyze call made by the current run
+ANALYZE_TIMINGS = []
+
+def analyze(responses):
+    """POST responses to /analyze with the selected engine and record the round-trip time"""
+    params = {'engine': ENGINE} if ENGINE else None
+    start = time.perf_counter()
+    result = requests.post(
+        f"{BASE_URL}/analyze",
+        params=params,
+        json={'data': responses},
+        timeout=120
+    ).json()
+    ANALYZE_TIMINGS.append(time.perf_counter() - start)
+    return result
+
 def print_section(title):
     print("\n" + "="*70)
     print(f"  {title}")
@@ -64,11 +85,7 @@ def test_1_parameter_recovery():
     print(f"\n📤 Sending {len(responses)} responses...")
     
     try:
-        result = requests.post(
-            f"{BASE_URL}/analyze",
-            json={'data': responses},
-            timeout=120
-        ).json()
+        result = analyze(responses)
         
         if result.get('status') != 'OK':
             print(f"⚠️  Analysis failed: {result.get('error', 'Unknown')}")
@@ -168,11 +185,7 @@ def test_2_ability_ordering():
     print(f"\n📤 Sending {len(responses)} responses...")
     
     try:
-        result = requests.post(
-            f"{BASE_URL}/analyze",
-            json={'data': responses},
-            timeout=120
-        ).json()
+        result = analyze(responses)
         
         if result.get('status') != 'OK':
             print(f"⚠️  Analysis failed")
@@ -252,11 +265,7 @@ def test_3_discrimination_detection():
     print(f"\n📤 Sending {len(responses)} responses...")
     
     try:
-        result = requests.post(
-            f"{BASE_URL}/analyze",
-            json={'data': responses},
-            timeout=120
-        ).json()
+        result = analyze(responses)
         
         if result.get('status') != 'OK':
             print(f"⚠️  Analysis failed")
@@ -334,5 +343,48 @@ def run_validation_suite():
         print(f"   {total - passed} test(s) failed")
         return False
 
+def run_engine_benchmark(engines=('dense', 'sparse', 'mml', 'map')):
+    """
+    Run the three validation datasets against each calibration engine
+    
+    Datasets are seeded, so every engine sees identical responses.
+    """
+    global ENGINE
+    
+    tests = [
+        ("Parameter Recovery", test_1_parameter_recovery),
+        ("Ability Ordering", test_2_ability_ordering),
+        ("Discrimination Detection", test_3_discrimination_detection)
+    ]
+    
+    rows = []
+    for engine in engines:
+        ENGINE = engine
+        for test_name, test_func in tests:
+            ANALYZE_TIMINGS.clear()
+            try:
+                passed = test_func()
+            except Exception as e:
+                print(f"\n❌ ERROR in {test_name} ({engine}): {e}")
+                passed = False
+            elapsed = sum(ANALYZE_TIMINGS)
+            rows.append((engine, test_name, passed, elapsed))
+    ENGINE = None
+    
+    print_section("ENGINE BENCHMARK")
+    print(f"{'Engine':<8} | {'Dataset':<26} | {'Result':<6} | Time (s)")
+    print("-" * 70)
+    for engine, test_name, passed, elapsed in rows:
+        status = "PASS" if passed else "FAIL"
+        print(f"{engine:<8} | {test_name:<26} | {status:<6} | {elapsed:.2f}")
+    
+    return rows
+
 if __name__ == "__main__":
-    run_validation_suite()
\ No newline at end of file
+    # python validate_irt_logic.py [--engine NAME | --benchmark]
+    if '--benchmark' in sys.argv:
+        run_engine_benchmark()
+    else:
+        if '--engine' in sys.argv:
+            ENGINE = sys.argv[sys.argv.index('--engine') + 1]
+        run_validation_suite()
\ No newline at end of file